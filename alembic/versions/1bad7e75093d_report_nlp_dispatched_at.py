@@ -0,0 +1,26 @@
+"""report nlp dispatched at
+
+Время подтверждения приема документа NLP-сервисом (этапы анализа).
+
+Revision ID: 1bad7e75093d
+Revises: 1bf5007a3db4
+Create Date: 2026-10-19 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1bad7e75093d'
+down_revision = '1bf5007a3db4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("audit_reports", sa.Column("nlp_dispatched_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("audit_reports", "nlp_dispatched_at")
@@ -0,0 +1,51 @@
+"""document media pipeline
+
+Этап фоновой обработки файла и ее результаты. Существующие документы
+считаются обработанными: server_default нужен только для заполнения
+NOT NULL колонки и затем снимается (значение по умолчанию задает модель).
+
+Revision ID: 1bf5007a3db4
+Revises: bbeec301cfca
+Create Date: 2026-10-19 09:25:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1bf5007a3db4'
+down_revision = 'bbeec301cfca'
+branch_labels = None
+depends_on = None
+
+
+media_status = sa.Enum(
+    "QUEUED",
+    "OPTIMIZING",
+    "EXTRACTING_METADATA",
+    "GENERATING_THUMBNAIL",
+    "READY",
+    "FAILED",
+    name="mediastatus",
+)
+
+
+def upgrade() -> None:
+    media_status.create(op.get_bind())
+    op.add_column(
+        "documents",
+        sa.Column("media_status", media_status, server_default="READY", nullable=False),
+    )
+    op.alter_column("documents", "media_status", server_default=None)
+    op.add_column("documents", sa.Column("page_count", sa.Integer(), nullable=True))
+    op.add_column("documents", sa.Column("media_metadata", sa.JSON(), nullable=True))
+    op.add_column("documents", sa.Column("thumbnail_filename", sa.String(length=500), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("documents", "thumbnail_filename")
+    op.drop_column("documents", "media_metadata")
+    op.drop_column("documents", "page_count")
+    op.drop_column("documents", "media_status")
+    media_status.drop(op.get_bind())
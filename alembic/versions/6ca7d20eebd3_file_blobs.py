@@ -0,0 +1,35 @@
+"""file blobs
+
+Таблица блобов с подсчетом ссылок. Документы, загруженные раньше, хранят
+собственные файлы и записей блобов не получают.
+
+Revision ID: 6ca7d20eebd3
+Revises: b347f7994a91
+Create Date: 2026-10-19 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6ca7d20eebd3'
+down_revision = 'b347f7994a91'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "file_blobs",
+        sa.Column("file_hash", sa.String(length=64), nullable=False),
+        sa.Column("stored_filename", sa.String(length=500), nullable=False),
+        sa.Column("file_size", sa.Integer(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("file_hash"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("file_blobs")
@@ -0,0 +1,52 @@
+"""unique document hash per user
+
+Перед созданием ограничения uq_documents_user_id_file_hash удаляются
+дубликаты (user_id, file_hash): остается самый ранний документ, отчеты
+дубликатов переносятся на него. Файлы удаленных дубликатов остаются в
+хранилище - миграция работает только с БД.
+
+Revision ID: b347f7994a91
+Revises: b667b57b689e
+Create Date: 2026-10-19 09:05:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b347f7994a91'
+down_revision = 'b667b57b689e'
+branch_labels = None
+depends_on = None
+
+
+# Для каждого документа - самый ранний документ с тем же (user_id, file_hash)
+RANKED_DOCUMENTS = """
+    SELECT id, first_value(id) OVER (
+        PARTITION BY user_id, file_hash ORDER BY created_at, id
+    ) AS keep_id
+    FROM documents
+"""
+
+
+def upgrade() -> None:
+    op.execute(
+        f"""
+        UPDATE audit_reports SET document_id = ranked.keep_id
+        FROM ({RANKED_DOCUMENTS}) AS ranked
+        WHERE audit_reports.document_id = ranked.id AND ranked.id <> ranked.keep_id
+        """
+    )
+    op.execute(
+        f"""
+        DELETE FROM documents USING ({RANKED_DOCUMENTS}) AS ranked
+        WHERE documents.id = ranked.id AND ranked.id <> ranked.keep_id
+        """
+    )
+    op.create_unique_constraint(
+        "uq_documents_user_id_file_hash", "documents", ["user_id", "file_hash"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_documents_user_id_file_hash", "documents", type_="unique")
@@ -0,0 +1,143 @@
+"""initial schema
+
+Исходная схема (users, documents, audit_reports, violations,
+analysis_summaries). Базы, созданные раньше через scripts/init_db.py
+(Base.metadata.create_all), уже содержат эти таблицы - для них ревизия
+ничего не делает, и дальнейшие миграции применяются поверх.
+
+Revision ID: b667b57b689e
+Revises:
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b667b57b689e'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if not context.is_offline_mode() and sa.inspect(op.get_bind()).has_table("users"):
+        return
+
+    op.create_table(
+        "users",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("email", sa.String(length=255), nullable=False),
+        sa.Column("password_hash", sa.String(length=255), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "documents",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("original_filename", sa.String(length=500), nullable=False),
+        sa.Column("stored_filename", sa.String(length=500), nullable=False),
+        sa.Column("file_size", sa.Integer(), nullable=False),
+        sa.Column("mime_type", sa.String(length=100), nullable=False),
+        sa.Column("file_hash", sa.String(length=64), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum("PENDING", "PROCESSING", "COMPLETED", "FAILED", name="documentstatus"),
+            nullable=False,
+        ),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_documents_id", "documents", ["id"])
+    op.create_index("ix_documents_user_id", "documents", ["user_id"])
+    op.create_index("ix_documents_file_hash", "documents", ["file_hash"])
+    op.create_index("ix_documents_status", "documents", ["status"])
+    op.create_index("ix_documents_created_at", "documents", ["created_at"])
+
+    op.create_table(
+        "audit_reports",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("document_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("request_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum("PENDING", "PROCESSING", "COMPLETED", "FAILED", name="auditreportstatus"),
+            nullable=False,
+        ),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("completed_at", sa.DateTime(), nullable=True),
+        sa.Column("error_message", sa.Text(), nullable=True),
+        sa.Column("processing_started_at", sa.DateTime(), nullable=True),
+        sa.Column("processing_duration_seconds", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["document_id"], ["documents.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_audit_reports_id", "audit_reports", ["id"])
+    op.create_index("ix_audit_reports_document_id", "audit_reports", ["document_id"])
+    op.create_index("ix_audit_reports_request_id", "audit_reports", ["request_id"], unique=True)
+    op.create_index("ix_audit_reports_status", "audit_reports", ["status"])
+    op.create_index("ix_audit_reports_created_at", "audit_reports", ["created_at"])
+    op.create_index("ix_audit_reports_completed_at", "audit_reports", ["completed_at"])
+
+    op.create_table(
+        "violations",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("audit_report_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("code", sa.String(length=50), nullable=False),
+        sa.Column("description", sa.String(length=1000), nullable=False),
+        sa.Column(
+            "risk_level",
+            sa.Enum("LOW", "MEDIUM", "HIGH", "CRITICAL", name="risklevel"),
+            nullable=False,
+        ),
+        sa.Column("regulation_reference", sa.String(length=500), nullable=True),
+        sa.Column("context", sa.String(length=2000), nullable=True),
+        sa.Column("offset_start", sa.Integer(), nullable=True),
+        sa.Column("offset_end", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["audit_report_id"], ["audit_reports.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        comment="Нарушения, выявленные при аудите документа",
+    )
+    op.create_index("ix_violations_id", "violations", ["id"])
+    op.create_index("ix_violations_audit_report_id", "violations", ["audit_report_id"])
+    op.create_index("ix_violations_code", "violations", ["code"])
+    op.create_index("ix_violations_risk_level", "violations", ["risk_level"])
+    op.create_index("ix_violations_regulation_reference", "violations", ["regulation_reference"])
+
+    op.create_table(
+        "analysis_summaries",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("audit_report_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("total_risks", sa.Integer(), nullable=False),
+        sa.Column("critical_count", sa.Integer(), nullable=False),
+        sa.Column("high_count", sa.Integer(), nullable=False),
+        sa.Column("medium_count", sa.Integer(), nullable=False),
+        sa.Column("low_count", sa.Integer(), nullable=False),
+        sa.Column("compliance_score", sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(["audit_report_id"], ["audit_reports.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_analysis_summaries_audit_report_id", "analysis_summaries", ["audit_report_id"], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("analysis_summaries")
+    op.drop_table("violations")
+    op.drop_table("audit_reports")
+    op.drop_table("documents")
+    op.drop_table("users")
+    sa.Enum(name="risklevel").drop(op.get_bind(), checkfirst=False)
+    sa.Enum(name="auditreportstatus").drop(op.get_bind(), checkfirst=False)
+    sa.Enum(name="documentstatus").drop(op.get_bind(), checkfirst=False)
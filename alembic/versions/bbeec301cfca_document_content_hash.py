@@ -0,0 +1,30 @@
+"""document content hash
+
+Хеш хранимого содержимого отдельно от хеша загруженного файла: отложенная
+оптимизация меняет блоб, но не ключ дедупликации. Для существующих
+документов содержимое совпадает с загруженным файлом.
+
+Revision ID: bbeec301cfca
+Revises: e342768f2292
+Create Date: 2026-10-19 09:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'bbeec301cfca'
+down_revision = 'e342768f2292'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("documents", sa.Column("content_hash", sa.String(length=64), nullable=True))
+    op.execute("UPDATE documents SET content_hash = file_hash")
+    op.alter_column("documents", "content_hash", nullable=False)
+
+
+def downgrade() -> None:
+    op.drop_column("documents", "content_hash")
@@ -0,0 +1,48 @@
+"""report reuse versions
+
+Версии модели и правил отчета и ссылка на отчет-источник скопированного
+результата.
+
+Revision ID: e342768f2292
+Revises: 6ca7d20eebd3
+Create Date: 2026-10-19 09:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e342768f2292'
+down_revision = '6ca7d20eebd3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("audit_reports", sa.Column("nlp_model_version", sa.String(length=100), nullable=True))
+    op.add_column("audit_reports", sa.Column("ruleset_version", sa.String(length=100), nullable=True))
+    op.add_column(
+        "audit_reports",
+        sa.Column("cloned_from_report_id", postgresql.UUID(as_uuid=True), nullable=True),
+    )
+    op.create_foreign_key(
+        "audit_reports_cloned_from_report_id_fkey",
+        "audit_reports",
+        "audit_reports",
+        ["cloned_from_report_id"],
+        ["id"],
+        ondelete="SET NULL",
+    )
+    op.create_index(
+        "ix_audit_reports_cloned_from_report_id", "audit_reports", ["cloned_from_report_id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_audit_reports_cloned_from_report_id", table_name="audit_reports")
+    op.drop_constraint("audit_reports_cloned_from_report_id_fkey", "audit_reports", type_="foreignkey")
+    op.drop_column("audit_reports", "cloned_from_report_id")
+    op.drop_column("audit_reports", "ruleset_version")
+    op.drop_column("audit_reports", "nlp_model_version")
@@ -5,13 +5,14 @@ import math
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Request
-from fastapi.responses import FileResponse
+from fastapi.responses import RedirectResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.core.database import get_db
 from app.core.dependencies import get_current_user
 from app.models.user import User
-from app.models.document import Document
+from app.models.document import Document, MediaStatus
 from app.schemas.document import (
     DocumentResponse,
     DocumentListResponse,
@@ -20,16 +21,22 @@ from app.schemas.document import (
 )
 from app.services.document import DocumentService
 from app.services.cache import CacheService
+from app.services.events import DocumentDeleted, publish
+from app.services.report import ReportService
+from app.services.storage import get_storage
 from app.utils.file import (
     validate_upload_file,
-    save_file,
+    save_blob,
+    get_blob_filename,
     calculate_file_hash,
     sanitize_filename,
-    get_file_path,
-    delete_file,
 )
+from app.utils.download import build_etag, build_file_response, is_not_modified, not_modified_response
 from app.utils.image_optimizer import optimize_image
+from app.utils.response_cache import cached_json_response
+from app.tasks.media_tasks import start_media_pipeline, OPTIMIZABLE_MIME_TYPES
 from app.core.logging import get_logger
+from app.utils.metrics import documents_uploaded_total
 
 logger = get_logger(__name__)
 
@@ -66,41 +73,34 @@ async def upload_document(
     # Валидация и чтение файла
     file_content, mime_type = await validate_upload_file(file)
 
-    # Оптимизация изображений (если это изображение)
-    if mime_type in ("image/jpeg", "image/png"):
+    # Хеш загруженного файла - ключ дедупликации (до оптимизации)
+    file_hash = await calculate_file_hash(file_content)
+    content_hash = file_hash
+
+    # Оптимизация изображений (в пуле процессов или в фоновом конвейере)
+    use_pipeline = settings.MEDIA_PIPELINE_ENABLED
+    if mime_type in OPTIMIZABLE_MIME_TYPES and not use_pipeline:
         try:
             optimized_content = await optimize_image(file_content)
             if optimized_content and len(optimized_content) < len(file_content):
-                file_content = optimized_content
                 logger.info(
                     "Image optimized during upload",
                     original_size=len(file_content),
                     optimized_size=len(optimized_content),
                 )
+                file_content = optimized_content
+                content_hash = await calculate_file_hash(file_content)
         except Exception as e:
             logger.warning("Error optimizing image, using original", error=str(e))
 
-    # Вычисление хеша
-    file_hash = await calculate_file_hash(file_content)
-
-    # Проверка на дубликаты
-    existing_document = await DocumentService.check_duplicate_by_hash(
-        db, file_hash, current_user.id
-    )
-    if existing_document:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="Документ с таким содержимым уже существует",
-        )
-
     # Очистка имени файла
     sanitized_filename = sanitize_filename(file.filename or "unnamed")
 
-    # Сохранение файла
-    stored_filename, file_path = await save_file(file, file_content)
+    # Содержимое хранится один раз на все документы с одинаковым хешем
+    stored_filename = get_blob_filename(content_hash)
 
     try:
-        # Создание записи в БД
+        # Создание записи в БД (дубликаты отсекаются уникальным ключом)
         document = await DocumentService.create_document(
             db=db,
             user_id=current_user.id,
@@ -109,34 +109,59 @@ async def upload_document(
             file_size=len(file_content),
             mime_type=mime_type,
             file_hash=file_hash,
+            media_status=MediaStatus.QUEUED if use_pipeline else MediaStatus.READY,
+            content_hash=content_hash,
         )
-
-        logger.info(
-            "Document uploaded",
-            document_id=str(document.id),
-            user_id=str(current_user.id),
-            filename=sanitized_filename,
-            file_size=len(file_content),
-            mime_type=mime_type,
-            ip_address=getattr(request.client, "host", "unknown") if request and request.client else "unknown",
+    except Exception as e:
+        logger.error("Error uploading document", error=str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Ошибка при загрузке документа",
         )
 
-        response_data = DocumentResponse.model_validate(document)
-        
-        # Инвалидируем кеш списков документов пользователя
-        await CacheService.delete_pattern(f"documents:user:{current_user.id}:*")
-        
-        return DocumentUploadResponse(**response_data.model_dump(), message="Документ успешно загружен")
+    if document is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Документ с таким содержимым уже существует",
+        )
 
+    try:
+        # Запись блоба на диск (только после того, как запись в БД создана)
+        await save_blob(stored_filename, file_content)
     except Exception as e:
-        # В случае ошибки удаляем сохраненный файл
-        await delete_file(file_path)
+        # Откатываем запись, чтобы не оставлять документ без файла
+        await DocumentService.delete_document(db, document.id, current_user.id)
         logger.error("Error uploading document", error=str(e))
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Ошибка при загрузке документа",
         )
 
+    if use_pipeline:
+        # Оптимизация, метаданные и превью - после ответа, прогресс виден в media_status
+        try:
+            start_media_pipeline(document.id)
+        except Exception as e:
+            logger.warning("Error scheduling media pipeline", document_id=str(document.id), error=str(e))
+
+    documents_uploaded_total.labels(file_type=mime_type).inc()
+    logger.info(
+        "Document uploaded",
+        document_id=str(document.id),
+        user_id=str(current_user.id),
+        filename=sanitized_filename,
+        file_size=len(file_content),
+        mime_type=mime_type,
+        ip_address=getattr(request.client, "host", "unknown") if request and request.client else "unknown",
+    )
+
+    response_data = DocumentResponse.model_validate(document)
+
+    # Инвалидируем кеш списков документов пользователя
+    await CacheService.bump_generation(f"documents:user:{current_user.id}")
+
+    return DocumentUploadResponse(**response_data.model_dump(), message="Документ успешно загружен")
+
 
 @router.get(
     "/",
@@ -151,6 +176,7 @@ async def get_documents(
     page_size: int = 20,
     order_by: str = "created_at",
     order_direction: str = "desc",
+    request: Request = None,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ) -> DocumentListResponse:
@@ -164,11 +190,13 @@ async def get_documents(
         page_size: Размер страницы
         order_by: Поле для сортировки
         order_direction: Направление сортировки (asc/desc)
+        request: HTTP запрос
         current_user: Текущий пользователь
         db: Сессия БД
 
     Returns:
-        Список документов с метаданными пагинации
+        Список документов с метаданными пагинации (из кеша - готовым телом
+        ответа с ETag, 304 при совпадении If-None-Match)
     """
     filters = DocumentFilterParams(
         status=status,
@@ -179,29 +207,31 @@ async def get_documents(
         order_direction=order_direction,
     )
 
-    # Проверяем кеш для стандартных запросов
-    cache_key = f"documents:user:{current_user.id}:page:{page}:size:{page_size}:status:{status}:mime:{mime_type}"
-    if not mime_type:  # Кешируем только простые запросы
-        cached_result = await CacheService.get(cache_key)
-        if cached_result:
-            return DocumentListResponse(**cached_result)
+    # Ответ может строиться в фоне после завершения запроса - не обращаемся к ORM объекту
+    user_id = current_user.id
+
+    async def render(session: AsyncSession) -> DocumentListResponse:
+        documents, total = await DocumentService.get_documents_by_user(session, user_id, filters)
+        pages = math.ceil(total / page_size) if total > 0 else 0
+        return DocumentListResponse(
+            items=[DocumentResponse.model_validate(doc) for doc in documents],
+            total=total,
+            page=page,
+            page_size=page_size,
+            pages=pages,
+        )
 
-    documents, total = await DocumentService.get_documents_by_user(db, current_user.id, filters)
-    pages = math.ceil(total / page_size) if total > 0 else 0
+    # Кешируем только простые запросы
+    if mime_type:
+        return await render(db)
 
-    result = DocumentListResponse(
-        items=[DocumentResponse.model_validate(doc) for doc in documents],
-        total=total,
-        page=page,
-        page_size=page_size,
-        pages=pages,
+    cache_key = await CacheService.versioned_key(
+        f"documents:user:{current_user.id}",
+        f"page:{page}:size:{page_size}:status:{status}:order:{order_by}:{order_direction}",
     )
-
-    # Сохраняем в кеш
-    if not mime_type:
-        await CacheService.set(cache_key, result.model_dump(), ttl=300)  # 5 минут
-
-    return result
+    return await cached_json_response(
+        request, cache_key, render, db, ttl=1800
+    )  # 30 минут: списки сбрасываются событиями, TTL лишь страховка
 
 
 @router.get(
@@ -231,9 +261,9 @@ async def get_document(
     """
     # Проверяем кеш
     cache_key = f"document:{document_id}:user:{current_user.id}"
-    cached_result = await CacheService.get(cache_key)
+    cached_result = await CacheService.get_model(cache_key, DocumentResponse)
     if cached_result:
-        return DocumentResponse(**cached_result)
+        return cached_result
 
     document = await DocumentService.get_document_by_id(db, document_id, current_user.id)
     if not document:
@@ -245,7 +275,7 @@ async def get_document(
     result = DocumentResponse.model_validate(document)
     
     # Сохраняем в кеш
-    await CacheService.set(cache_key, result.model_dump(), ttl=600)  # 10 минут
+    await CacheService.set_model(cache_key, result, ttl=600)  # 10 минут
 
     return result
 
@@ -272,19 +302,10 @@ async def delete_document(
     Raises:
         HTTPException: Если документ не найден или нет прав доступа
     """
-    # Получаем документ для получения пути к файлу
-    document = await DocumentService.get_document_by_id(db, document_id, current_user.id)
-    if not document:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Документ не найден",
-        )
+    # Отчеты удаляются каскадно, их ID нужны для сброса кеша
+    report_ids = await ReportService.get_report_ids(db, document_id)
 
-    # Удаляем файл с диска
-    file_path = get_file_path(document.stored_filename)
-    await delete_file(file_path)
-
-    # Удаляем запись из БД
+    # Удаляем запись из БД (файл удаляется, когда на блоб не остается ссылок)
     deleted = await DocumentService.delete_document(db, document_id, current_user.id)
     if not deleted:
         raise HTTPException(
@@ -292,9 +313,10 @@ async def delete_document(
             detail="Документ не найден",
         )
 
-    # Инвалидируем кеш
-    await CacheService.delete(f"document:{document_id}:user:{current_user.id}")
-    await CacheService.delete_pattern(f"documents:user:{current_user.id}:*")
+    # Кеш документа и его отчетов сбрасывается подписчиками события
+    await publish(
+        DocumentDeleted(user_id=current_user.id, document_id=document_id, report_ids=tuple(report_ids))
+    )
 
     logger.info("Document deleted", document_id=str(document_id), user_id=str(current_user.id))
 
@@ -302,23 +324,28 @@ async def delete_document(
 @router.get(
     "/{document_id}/download",
     summary="Скачивание документа",
-    description="Скачивание файла документа",
+    description="Скачивание файла документа (поддерживаются Range, ETag и условные запросы)",
 )
 async def download_document(
     document_id: UUID,
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
-) -> FileResponse:
+) -> Response:
     """
     Скачивание документа.
 
+    ETag строится из content_hash: содержимое блоба неизменно, поэтому
+    повторные запросы с If-None-Match получают 304 без передачи файла.
+
     Args:
         document_id: ID документа
+        request: HTTP запрос
         current_user: Текущий пользователь
         db: Сессия БД
 
     Returns:
-        Файл для скачивания
+        Файл (целиком или диапазон) либо 304
 
     Raises:
         HTTPException: Если документ не найден или нет прав доступа
@@ -330,19 +357,92 @@ async def download_document(
             detail="Документ не найден",
         )
 
-    file_path = get_file_path(document.stored_filename)
+    storage = get_storage()
+    file_path = storage.local_path(document.stored_filename)
+
+    # Объектное хранилище отдает файл само по подписанной ссылке
+    if file_path is None:
+        return RedirectResponse(
+            storage.presign(document.stored_filename, filename=document.original_filename),
+            status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+        )
+
+    etag = build_etag(document.content_hash)
+    if is_not_modified(request, etag, document.created_at):
+        return not_modified_response(etag, document.created_at)
 
     # Проверка существования файла
-    import os
-    if not os.path.exists(file_path):
+    file_size = await storage.size(document.stored_filename)
+    if file_size is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Файл не найден на сервере",
         )
 
-    return FileResponse(
-        path=file_path,
-        filename=document.original_filename,
+    return build_file_response(
+        request,
+        file_path,
+        file_size,
+        etag,
+        last_modified=document.created_at,
         media_type=document.mime_type,
+        filename=document.original_filename,
     )
 
+
+@router.get(
+    "/{document_id}/thumbnail",
+    summary="Превью документа",
+    description="JPEG превью документа, построенное фоновым конвейером обработки",
+)
+async def get_document_thumbnail(
+    document_id: UUID,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> Response:
+    """
+    Получение превью документа.
+
+    Args:
+        document_id: ID документа
+        request: HTTP запрос
+        current_user: Текущий пользователь
+        db: Сессия БД
+
+    Returns:
+        Превью либо 304
+
+    Raises:
+        HTTPException: Если документ не найден или превью еще не построено
+    """
+    document = await DocumentService.get_document_by_id(db, document_id, current_user.id)
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Документ не найден",
+        )
+    if not document.thumbnail_filename:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Превью документа недоступно",
+        )
+
+    storage = get_storage()
+    file_path = storage.local_path(document.thumbnail_filename)
+    if file_path is None:
+        return RedirectResponse(
+            storage.presign(document.thumbnail_filename),
+            status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+        )
+
+    # Превью определяется содержимым документа
+    etag = build_etag(f"thumb-{document.content_hash}")
+    file_size = await storage.size(document.thumbnail_filename)
+    if file_size is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Превью документа недоступно",
+        )
+
+    return build_file_response(request, file_path, file_size, etag, media_type="image/jpeg")
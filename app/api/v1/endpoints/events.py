@@ -0,0 +1,125 @@
+"""
+Endpoints для потоковых уведомлений (Server-Sent Events).
+"""
+import asyncio
+from typing import AsyncIterator
+from uuid import UUID
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.dependencies import get_current_user, get_stream_user
+from app.models.user import User
+from app.schemas.auth import StreamTokenResponse
+from app.services.notifications import event_hub, format_sse, heartbeat_interval
+from app.core.logging import get_logger
+from app.utils.jwt import create_stream_token
+from app.utils.metrics import active_connections
+
+logger = get_logger(__name__)
+
+router = APIRouter()
+
+# Задержка переподключения клиента EventSource в миллисекундах
+RETRY_MS = 5000
+
+
+async def _event_stream(user_id: UUID) -> AsyncIterator[str]:
+    """
+    Поток событий пользователя с keep-alive комментариями.
+
+    Args:
+        user_id: ID пользователя
+
+    Yields:
+        Блоки SSE
+    """
+    queue = event_hub.subscribe(user_id)
+    active_connections.labels(connection_type="sse").inc()
+    logger.info("Event stream opened", user_id=str(user_id))
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=heartbeat_interval())
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_sse(message)
+    finally:
+        event_hub.unsubscribe(user_id, queue)
+        active_connections.labels(connection_type="sse").dec()
+        logger.info("Event stream closed", user_id=str(user_id))
+
+
+@router.post(
+    "/token",
+    response_model=StreamTokenResponse,
+    summary="Токен подключения к потоку событий",
+    description="Короткоживущий токен для GET /events/stream?token=... из браузерного EventSource",
+)
+async def issue_stream_token(
+    current_user: User = Depends(get_current_user),
+) -> StreamTokenResponse:
+    """
+    Выдача токена подключения к потоку событий.
+
+    EventSource не передает заголовок Authorization, поэтому браузерный
+    клиент получает этот токен и открывает new EventSource(
+    "/api/v1/events/stream?token=..."). Токен проверяется только при
+    подключении: при ошибке соединения клиент запрашивает новый токен
+    и создает EventSource заново.
+
+    Args:
+        current_user: Текущий пользователь
+
+    Returns:
+        Токен и время его жизни в секундах
+    """
+    return StreamTokenResponse(
+        token=create_stream_token({"sub": str(current_user.id)}),
+        expires_in=settings.EVENTS_STREAM_TOKEN_EXPIRE_SECONDS,
+    )
+
+
+@router.get(
+    "/stream",
+    summary="Поток событий пользователя",
+    description=(
+        "Server-Sent Events со сменой статусов отчетов пользователя (событие report_status). "
+        "Аутентификация: заголовок Authorization или параметр token из POST /events/token"
+    ),
+)
+async def stream_events(
+    current_user: User = Depends(get_stream_user),
+    db: AsyncSession = Depends(get_db),
+) -> StreamingResponse:
+    """
+    Поток уведомлений о смене статусов отчетов вместо опроса GET /reports/{id}.
+
+    Соединение живет долго, поэтому сессия БД (та же, что использовала
+    аутентификация) закрывается сразу после проверки пользователя и не
+    удерживает соединение пула на время потока.
+
+    Args:
+        current_user: Текущий пользователь
+        db: Сессия БД
+
+    Returns:
+        Поток text/event-stream
+    """
+    user_id = current_user.id
+    await db.close()
+
+    return StreamingResponse(
+        _event_stream(user_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Отключение буферизации ответа в nginx
+            "X-Accel-Buffering": "no",
+        },
+    )
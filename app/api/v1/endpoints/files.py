@@ -0,0 +1,72 @@
+"""
+Endpoints для скачивания файлов по подписанным ссылкам.
+"""
+from datetime import datetime
+from pathlib import PurePosixPath
+
+import aiofiles.os
+from fastapi import APIRouter, HTTPException, status, Query, Request
+from fastapi.responses import Response
+
+from app.services.storage import get_storage, LocalStorageBackend
+from app.utils.download import build_etag, build_file_response
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+router = APIRouter()
+
+
+@router.get(
+    "/{key:path}",
+    summary="Скачивание файла по подписанной ссылке",
+    description="Отдача файла из локального хранилища по ссылке, выданной StorageBackend.presign",
+)
+async def download_signed_file(
+    key: str,
+    request: Request,
+    expires: int = Query(..., description="Время истечения ссылки (unix time)"),
+    signature: str = Query(..., description="Подпись ссылки"),
+) -> Response:
+    """
+    Скачивание файла по подписанной ссылке (используется NLP-сервисом).
+
+    Поддерживает Range для докачки больших файлов. Имя блоба - это хеш
+    содержимого, поэтому оно же служит ETag.
+
+    Args:
+        key: Ключ файла в хранилище
+        request: HTTP запрос
+        expires: Время истечения ссылки
+        signature: Подпись ссылки
+
+    Returns:
+        Файл
+
+    Raises:
+        HTTPException: Если подпись невалидна или файл не найден
+    """
+    storage = get_storage()
+    if not isinstance(storage, LocalStorageBackend) or not storage.verify_signature(key, expires, signature):
+        logger.warning("Invalid signed file URL", key=key)
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Недействительная или просроченная ссылка",
+        )
+
+    try:
+        stat = await aiofiles.os.stat(storage.local_path(key))
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Файл не найден на сервере",
+        )
+
+    return build_file_response(
+        request,
+        storage.local_path(key),
+        stat.st_size,
+        build_etag(PurePosixPath(key).name),
+        last_modified=datetime.utcfromtimestamp(stat.st_mtime),
+        media_type="application/octet-stream",
+    )
@@ -2,20 +2,22 @@
 Endpoints для взаимодействия с NLP-сервисом.
 """
 from uuid import UUID
-from datetime import datetime
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
 from app.schemas.nlp import NLPCallbackRequest, NLPCallbackResponse
-from app.services.nlp import NLPService
+from app.services.nlp import NLPService, nlp_trace_context_name
 from app.models.audit_report import AuditReport, AuditReportStatus
 from app.models.violation import Violation, RiskLevel
 from app.models.analysis_summary import AnalysisSummary
 from app.models.document import DocumentStatus
 from app.services.document import DocumentService
+from app.services.report import ReportService
 from app.core.logging import get_logger
+from app.utils.metrics import violations_detected_total
+from app.utils.tracing import load_trace_context, trace_span
 
 logger = get_logger(__name__)
 
@@ -77,12 +79,19 @@ async def nlp_callback(
                 detail="Несоответствие document_id",
             )
 
-        if callback_data.status == "success":
-            # Обработка успешного результата
-            await _process_successful_callback(db, audit_report, callback_data)
-        else:
-            # Обработка ошибки
-            await _process_failed_callback(db, audit_report, callback_data)
+        # Обработка продолжает трассу отправки документа на анализ
+        parent = await load_trace_context(nlp_trace_context_name(callback_data.request_id))
+        with trace_span(
+            "nlp callback",
+            parent=parent,
+            attributes={"nlp.request_id": str(callback_data.request_id), "nlp.status": callback_data.status},
+        ):
+            if callback_data.status == "success":
+                # Обработка успешного результата
+                await _process_successful_callback(db, audit_report, callback_data)
+            else:
+                # Обработка ошибки
+                await _process_failed_callback(db, audit_report, callback_data)
 
         logger.info(
             "NLP callback processed",
@@ -164,8 +173,7 @@ async def _process_successful_callback(
     db.add(analysis_summary)
 
     # Обновляем статус отчета
-    audit_report.status = AuditReportStatus.COMPLETED
-    audit_report.completed_at = datetime.utcnow()
+    ReportService.mark_finished(audit_report, AuditReportStatus.COMPLETED)
 
     # Обновляем статус документа
     await DocumentService.update_document_status(
@@ -173,6 +181,12 @@ async def _process_successful_callback(
     )
 
     await db.commit()
+    await ReportService.publish_status_change(db, audit_report)
+
+    for risk_level in RiskLevel:
+        count = sum(1 for v in violations if v.risk_level == risk_level)
+        if count:
+            violations_detected_total.labels(risk_level=risk_level.value).inc(count)
 
     logger.info(
         "Analysis results saved",
@@ -188,9 +202,11 @@ async def _process_failed_callback(
 ) -> None:
     """Обработка неудачного callback."""
     # Обновляем статус отчета
-    audit_report.status = AuditReportStatus.FAILED
-    audit_report.error_message = callback_data.error_message or "Ошибка обработки NLP-сервисом"
-    audit_report.completed_at = datetime.utcnow()
+    ReportService.mark_finished(
+        audit_report,
+        AuditReportStatus.FAILED,
+        callback_data.error_message or "Ошибка обработки NLP-сервисом",
+    )
 
     # Обновляем статус документа
     await DocumentService.update_document_status(
@@ -198,6 +214,7 @@ async def _process_failed_callback(
     )
 
     await db.commit()
+    await ReportService.publish_status_change(db, audit_report)
 
     logger.warning(
         "Analysis failed",
@@ -7,7 +7,7 @@ from datetime import datetime
 from io import BytesIO
 
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from fastapi.responses import Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
@@ -31,8 +31,12 @@ from app.schemas.report import (
 from app.services.report import ReportService
 from app.services.document import DocumentService
 from app.services.cache import CacheService
+from app.services.cache_invalidation import report_view_key
+from app.core.config import settings
 from app.tasks.nlp_tasks import process_document_with_nlp
+from app.utils.download import content_disposition
 from app.utils.pdf_generator import generate_pdf_report
+from app.utils.response_cache import cached_json_response, get_owned_response, store_owned_response
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -93,6 +97,18 @@ async def generate_report(
     request_id = uuid4()
     audit_report = await ReportService.create_audit_report(db, request.document_id, request_id)
 
+    # Переиспользование результата для документа с таким же содержимым
+    if settings.NLP_RESULT_REUSE_ENABLED:
+        source_report = await ReportService.find_reusable_report(db, document.file_hash)
+        if source_report:
+            await ReportService.clone_analysis_results(db, source_report, audit_report)
+            return ReportGenerateResponse(
+                id=audit_report.id,
+                document_id=audit_report.document_id,
+                status=audit_report.status.value,
+                message="Использован результат анализа документа с идентичным содержимым",
+            )
+
     # Запуск Celery задачи
     try:
         task = process_document_with_nlp.delay(str(request.document_id))
@@ -108,6 +124,7 @@ async def generate_report(
         audit_report.status = AuditReportStatus.FAILED
         audit_report.error_message = f"Ошибка запуска задачи: {str(e)}"
         await db.commit()
+        await ReportService.publish_status_change(db, audit_report)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Ошибка при запуске анализа",
@@ -139,6 +156,7 @@ async def get_reports(
     order_direction: str = Query("desc", pattern="^(asc|desc)$", description="Направление сортировки"),
     include_violations: bool = Query(False, description="Включить нарушения в ответ"),
     include_summary: bool = Query(True, description="Включить сводку в ответ"),
+    request: Request = None,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ) -> AuditReportListResponse:
@@ -157,11 +175,13 @@ async def get_reports(
         order_direction: Направление сортировки
         include_violations: Включить нарушения в ответ
         include_summary: Включить сводку в ответ
+        request: HTTP запрос
         current_user: Текущий пользователь
         db: Сессия БД
 
     Returns:
-        Список отчетов с метаданными пагинации
+        Список отчетов с метаданными пагинации (из кеша - готовым телом
+        ответа с ETag, 304 при совпадении If-None-Match)
     """
     filters = ReportFilterParams(
         status=status,
@@ -177,58 +197,73 @@ async def get_reports(
         include_summary=include_summary,
     )
 
-    # Проверяем кеш (только для стандартных запросов без сложных фильтров)
-    cache_key = f"reports:user:{current_user.id}:page:{page}:size:{page_size}:status:{status}"
-    if not risk_level and not document_id and not date_from and not date_to:
-        cached_result = await CacheService.get(cache_key)
-        if cached_result:
-            return AuditReportListResponse(**cached_result)
-
-    reports, total = await ReportService.get_reports_by_user(db, current_user.id, filters)
-    pages = math.ceil(total / page_size) if total > 0 else 0
-
-    # Формируем список элементов с дополнительными данными
-    items = []
-    for report in reports:
-        # Получаем количество нарушений
-        violations_count = len(report.violations) if report.violations else 0
-
-        # Получаем compliance_score из summary
-        compliance_score = None
-        if report.analysis_summary:
-            compliance_score = report.analysis_summary.compliance_score
-
-        # Получаем имя файла документа
-        document_filename = None
-        if report.document:
-            document_filename = report.document.original_filename
-
-        items.append(
-            AuditReportListItem(
-                id=report.id,
-                document_id=report.document_id,
-                status=report.status.value,
-                created_at=report.created_at,
-                completed_at=report.completed_at,
-                compliance_score=compliance_score,
-                violations_count=violations_count,
-                document_filename=document_filename,
+    # Ответ может строиться в фоне после завершения запроса - не обращаемся к ORM объекту
+    user_id = current_user.id
+
+    async def render(session: AsyncSession) -> AuditReportListResponse:
+        reports, total = await ReportService.get_reports_by_user(session, user_id, filters)
+        pages = math.ceil(total / page_size) if total > 0 else 0
+
+        # Без include_violations нарушения не загружены: считаем их одним
+        # запросом, а не ленивой загрузкой для каждого отчета
+        violation_counts = {}
+        if not include_violations:
+            violation_counts = await ReportService.get_violation_counts(
+                session, [report.id for report in reports]
             )
-        )
 
-    result = AuditReportListResponse(
-        items=items,
-        total=total,
-        page=page,
-        page_size=page_size,
-        pages=pages,
-    )
+        # Формируем список элементов с дополнительными данными
+        items = []
+        for report in reports:
+            # Получаем количество нарушений
+            if include_violations:
+                violations_count = len(report.violations)
+            else:
+                violations_count = violation_counts.get(report.id, 0)
+
+            # Получаем compliance_score из summary (загружена только с include_summary)
+            compliance_score = None
+            if include_summary and report.analysis_summary:
+                compliance_score = report.analysis_summary.compliance_score
+
+            # Получаем имя файла документа
+            document_filename = None
+            if report.document:
+                document_filename = report.document.original_filename
+
+            items.append(
+                AuditReportListItem(
+                    id=report.id,
+                    document_id=report.document_id,
+                    status=report.status.value,
+                    created_at=report.created_at,
+                    completed_at=report.completed_at,
+                    compliance_score=compliance_score,
+                    violations_count=violations_count,
+                    document_filename=document_filename,
+                )
+            )
 
-    # Сохраняем в кеш (только для стандартных запросов)
-    if not risk_level and not document_id and not date_from and not date_to:
-        await CacheService.set(cache_key, result.model_dump(), ttl=300)  # 5 минут
+        return AuditReportListResponse(
+            items=items,
+            total=total,
+            page=page,
+            page_size=page_size,
+            pages=pages,
+        )
 
-    return result
+    # Кешируем только стандартные запросы без сложных фильтров
+    if risk_level or document_id or date_from or date_to:
+        return await render(db)
+
+    cache_key = await CacheService.versioned_key(
+        f"reports:user:{current_user.id}",
+        f"page:{page}:size:{page_size}:status:{status}:order:{order_by}:{order_direction}"
+        f":violations:{include_violations}:summary:{include_summary}",
+    )
+    return await cached_json_response(
+        request, cache_key, render, db, ttl=1800
+    )  # 30 минут: списки сбрасываются событиями, TTL лишь страховка
 
 
 @router.post("/{report_id}/invalidate-cache")
@@ -256,8 +291,9 @@ async def invalidate_report_cache(
             detail="Отчет не найден или нет прав доступа",
         )
 
-    # Удаляем кеш отчета и PDF
-    await CacheService.delete(f"reports:user:{current_user.id}:*")
+    # Удаляем кеш отчета, списков отчетов и PDF
+    await CacheService.bump_generation(f"reports:user:{current_user.id}")
+    await CacheService.delete(await report_view_key(current_user.id, report_id))
     await CacheService.delete(f"pdf_report:{report_id}")
     
     return {"message": "Кеш успешно инвалидирован"}
@@ -271,23 +307,36 @@ async def invalidate_report_cache(
 )
 async def get_report(
     report_id: UUID,
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ) -> AuditReportResponse:
     """
     Получение детальной информации об отчете.
 
+    Завершенные отчеты (COMPLETED, FAILED) не меняются: после первого
+    чтения ответ отдается из кеша без обращения к БД. Кеш сбрасывается
+    событиями смены статуса и удаления документа.
+
     Args:
         report_id: ID отчета
+        request: HTTP запрос
         current_user: Текущий пользователь
         db: Сессия БД
 
     Returns:
-        Детальная информация об отчете
+        Детальная информация об отчете (из кеша - готовым телом ответа
+        с ETag, 304 при совпадении If-None-Match)
 
     Raises:
         HTTPException: Если отчет не найден или нет прав доступа
     """
+    # Ключ (с поколением) берется до чтения из БД - см. report_view_key
+    cache_key = await report_view_key(current_user.id, report_id)
+    cached = await get_owned_response(request, cache_key, current_user.id)
+    if cached is not None:
+        return cached
+
     report = await ReportService.get_report_by_id(db, report_id, current_user.id, include_relations=True)
     if not report:
         raise HTTPException(
@@ -295,7 +344,12 @@ async def get_report(
             detail="Отчет не найден или нет прав доступа",
         )
 
-    return AuditReportResponse.model_validate(report)
+    result = AuditReportResponse.model_validate(report)
+    if report.status in (AuditReportStatus.COMPLETED, AuditReportStatus.FAILED):
+        return await store_owned_response(
+            request, cache_key, current_user.id, result, ttl=86400
+        )  # Сутки: отчет неизменен, записи сбрасываются событиями
+    return result
 
 
 @router.get(
@@ -386,34 +440,21 @@ async def export_report_pdf(
             detail="Отчет еще не завершен. Экспорт доступен только для завершенных отчетов.",
         )
 
-    # Проверяем кеш PDF
+    # Формируем имя файла
+    document_name = report.document.original_filename if report.document else "report"
+    filename = f"audit_report_{report_id}_{document_name}.pdf"
+
+    # Проверяем кеш PDF (хранится как есть, без base64)
     cache_key = f"pdf_report:{report_id}"
-    cached_pdf = await CacheService.get(cache_key)
-    
-    if cached_pdf:
-        # PDF в кеше хранится как base64 строка
-        import base64
-        pdf_content = base64.b64decode(cached_pdf["content"])
-        filename = cached_pdf["filename"]
-    else:
+    pdf_content = await CacheService.get_raw(cache_key)
+
+    if pdf_content is None:
         try:
             # Генерируем PDF
             pdf_content = await generate_pdf_report(report)
 
-            # Формируем имя файла
-            document_name = report.document.original_filename if report.document else "report"
-            filename = f"audit_report_{report_id}_{document_name}.pdf"
-
             # Сохраняем в кеш (24 часа для готовых PDF)
-            import base64
-            await CacheService.set(
-                cache_key,
-                {
-                    "content": base64.b64encode(pdf_content).decode(),
-                    "filename": filename,
-                },
-                ttl=86400,  # 24 часа
-            )
+            await CacheService.set_raw(cache_key, pdf_content, ttl=86400)  # 24 часа
         except Exception as e:
             logger.error("Error generating PDF report", report_id=str(report_id), error=str(e))
             raise HTTPException(
@@ -425,7 +466,7 @@ async def export_report_pdf(
         content=pdf_content,
         media_type="application/pdf",
         headers={
-            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Content-Disposition": content_disposition(filename),
         },
     )
 
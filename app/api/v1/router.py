@@ -3,13 +3,16 @@
 """
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import auth, documents, nlp, reports
+from app.api.v1.endpoints import admin, auth, documents, events, files, nlp, reports
 
 api_router = APIRouter()
 
 # Подключение роутеров
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(documents.router, prefix="/documents", tags=["documents"])
+api_router.include_router(events.router, prefix="/events", tags=["events"])
+api_router.include_router(files.router, prefix="/files", tags=["files"])
 api_router.include_router(nlp.router, prefix="/nlp", tags=["nlp"])
 api_router.include_router(reports.router, prefix="/reports", tags=["reports"])
 
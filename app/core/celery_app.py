@@ -4,13 +4,15 @@
 from celery import Celery
 
 from app.core.config import settings
+from app.utils.instrumentation import instrument_celery
+from app.utils.tracing import trace_celery
 
 # Создание экземпляра Celery
 celery_app = Celery(
     "medaudit",
     broker=settings.REDIS_URL,
     backend=settings.REDIS_URL,
-    include=["app.tasks.nlp_tasks"],
+    include=["app.tasks.nlp_tasks", "app.tasks.media_tasks"],
 )
 
 # Конфигурация Celery
@@ -31,6 +33,12 @@ celery_app.conf.update(
     task_max_retries=3,
 )
 
+# Метрики количества и длительности задач
+instrument_celery()
+
+# Трассировка задач (контекст передается в заголовках сообщений)
+trace_celery()
+
 
 
 
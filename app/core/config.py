@@ -37,6 +37,22 @@ class Settings(BaseSettings):
     # Application
     DEBUG: bool = Field(default=True, description="Режим отладки")
     LOG_LEVEL: str = Field(default="INFO", description="Уровень логирования")
+    LOG_JSON_SERIALIZER: str = Field(
+        default="orjson", description="Сериализатор JSON логов (json или orjson)"
+    )
+    LOG_QUEUE_SIZE: int = Field(
+        default=10000, description="Размер очереди записей лога; при переполнении записи отбрасываются"
+    )
+    LOG_INFO_SAMPLE_RATE: float = Field(
+        default=1.0, description="Доля сохраняемых частых INFO событий (LOG_SAMPLED_EVENTS)"
+    )
+    LOG_SAMPLED_EVENTS: str = Field(
+        default=(
+            "File saved,Document created,Document status updated,Document media status updated,"
+            "Sending document to NLP service,Document sent to NLP service successfully"
+        ),
+        description="Частые INFO события, к которым применяется выборка (через запятую)",
+    )
     BACKEND_URL: str = Field(
         default="http://localhost:8000", description="URL бэкенд-приложения"
     )
@@ -48,6 +64,16 @@ class Settings(BaseSettings):
     NLP_SERVICE_API_KEY: str = Field(
         default="", description="API ключ для NLP-сервиса"
     )
+    NLP_MODEL_VERSION: str = Field(
+        default="default", description="Версия NLP-модели (ключ переиспользования результатов)"
+    )
+    NLP_RULESET_VERSION: str = Field(
+        default="default", description="Версия набора правил аудита (ключ переиспользования результатов)"
+    )
+    NLP_RESULT_REUSE_ENABLED: bool = Field(
+        default=True,
+        description="Переиспользовать результаты анализа для документов с одинаковым содержимым",
+    )
 
     # File Storage
     FILE_STORAGE_PATH: str = Field(
@@ -56,11 +82,132 @@ class Settings(BaseSettings):
     MAX_FILE_SIZE: int = Field(
         default=52428800, description="Максимальный размер файла в байтах (50 МБ)"
     )
+    STORAGE_BACKEND: str = Field(
+        default="local", description="Бэкенд хранилища файлов (local или s3)"
+    )
+    STORAGE_PRESIGN_EXPIRE_SECONDS: int = Field(
+        default=3600, description="Время жизни подписанных ссылок на файлы в секундах"
+    )
+    S3_ENDPOINT_URL: str = Field(
+        default="http://localhost:9000", description="URL S3-совместимого хранилища"
+    )
+    S3_BUCKET: str = Field(default="medaudit", description="Имя бакета S3")
+    S3_REGION: str = Field(default="us-east-1", description="Регион S3")
+    S3_ACCESS_KEY: str = Field(default="", description="Ключ доступа S3")
+    S3_SECRET_KEY: str = Field(default="", description="Секретный ключ S3")
     ALLOWED_FILE_TYPES: str = Field(
         default="application/pdf,application/vnd.openxmlformats-officedocument.wordprocessingml.document,image/jpeg,image/png",
         description="Разрешенные типы файлов через запятую",
     )
 
+    # Image optimization
+    IMAGE_OPTIMIZE_MIN_BYTES: int = Field(
+        default=262144, description="Изображения меньше этого размера (байт) не оптимизируются"
+    )
+    IMAGE_OPTIMIZE_WORKERS: int = Field(
+        default=2, description="Количество процессов для оптимизации изображений"
+    )
+
+    # Media pipeline
+    MEDIA_PIPELINE_ENABLED: bool = Field(
+        default=False,
+        description="Обрабатывать загруженные файлы (оптимизация, метаданные, превью) в Celery после ответа",
+    )
+    MEDIA_THUMBNAIL_SIZE: int = Field(
+        default=256, description="Максимальная сторона превью документа в пикселях"
+    )
+    MEDIA_NLP_PREWARM_ENABLED: bool = Field(
+        default=False,
+        description="Запускать NLP-анализ сразу после обработки загруженного файла",
+    )
+
+    # Cache
+    CACHE_LOCAL_ENABLED: bool = Field(
+        default=True, description="Использовать кеш в памяти процесса перед Redis"
+    )
+    CACHE_LOCAL_MAX_ENTRIES: int = Field(
+        default=2048, description="Максимальное количество записей в кеше процесса"
+    )
+    CACHE_LOCAL_TTL_SECONDS: int = Field(
+        default=30, description="Время жизни записи в кеше процесса в секундах"
+    )
+    CACHE_LOCAL_MAX_VALUE_BYTES: int = Field(
+        default=262144, description="Значения больше этого размера не хранятся в кеше процесса"
+    )
+    CACHE_CODEC: str = Field(
+        default="orjson", description="Кодек значений кеша (json, orjson или msgpack)"
+    )
+    CACHE_COMPRESS_MIN_BYTES: int = Field(
+        default=4096, description="Значения кеша от этого размера сжимаются zlib"
+    )
+    CACHE_STALE_TTL_SECONDS: int = Field(
+        default=60,
+        description="Сколько секунд после истечения отдавать устаревший список, обновляя его в фоне",
+    )
+    CACHE_LOCK_TIMEOUT_MS: int = Field(
+        default=5000, description="Время жизни блокировки пересчета значения кеша в миллисекундах"
+    )
+    CACHE_INVALIDATION_CHANNEL: str = Field(
+        default="cache:invalidate", description="Канал Redis pub/sub для инвалидации кеша процессов"
+    )
+
+    # Server-Sent Events
+    EVENTS_HEARTBEAT_SECONDS: int = Field(
+        default=15, description="Интервал keep-alive комментариев в потоке событий в секундах"
+    )
+    EVENTS_STREAM_TOKEN_EXPIRE_SECONDS: int = Field(
+        default=60, description="Время жизни токена подключения к потоку событий в секундах"
+    )
+
+    # Metrics
+    METRICS_QUEUE_SAMPLE_SECONDS: int = Field(
+        default=15, description="Интервал измерения длины очередей Celery в секундах (0 - отключено)"
+    )
+    DB_QUERY_BUDGET: int = Field(
+        default=25, description="Количество SQL запросов на HTTP запрос, выше которого пишется предупреждение"
+    )
+    DB_QUERY_REPEAT_THRESHOLD: int = Field(
+        default=10, description="Повторов одного SQL запроса за HTTP запрос для предупреждения о N+1"
+    )
+    DB_SLOW_QUERY_THRESHOLD_MS: int = Field(
+        default=200, description="Порог медленного SQL запроса в миллисекундах"
+    )
+    DB_SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float = Field(
+        default=0.0,
+        description="Доля медленных SELECT, для которых в лог пишется EXPLAIN (ANALYZE, BUFFERS) (0 - отключено)",
+    )
+    DB_QUERY_LOG_MAX_FINGERPRINTS: int = Field(
+        default=500, description="Максимальное количество отпечатков SQL запросов в отчете процесса"
+    )
+    CELERY_METRICS_PORT: int = Field(
+        default=0, description="Порт HTTP экспорта метрик Celery worker (0 - отключено)"
+    )
+
+    # Tracing
+    TRACING_ENABLED: bool = Field(default=False, description="Трассировка запросов (W3C Trace Context)")
+    TRACING_SERVICE_NAME: str = Field(default="medaudit-backend", description="Имя сервиса в трассах")
+    TRACING_EXPORTER: str = Field(default="otlp", description="Экспорт трасс (otlp или file)")
+    TRACING_OTLP_ENDPOINT: str = Field(
+        default="http://localhost:4318/v1/traces", description="OTLP/HTTP endpoint коллектора трасс"
+    )
+    TRACING_FILE_PATH: str = Field(
+        default="./traces.jsonl", description="Файл для экспорта трасс (TRACING_EXPORTER=file)"
+    )
+    TRACING_SAMPLE_RATE: float = Field(
+        default=1.0, description="Доля новых трасс, которые экспортируются"
+    )
+
+    # Administration
+    ADMIN_EMAILS: str = Field(
+        default="", description="Email пользователей с доступом к /api/v1/admin (через запятую)"
+    )
+    PROFILER_SAMPLE_INTERVAL_MS: int = Field(
+        default=50, description="Интервал выборки стеков профилировщика по умолчанию в миллисекундах"
+    )
+    PROFILER_MAX_SECONDS: int = Field(
+        default=60, description="Максимальная длительность профилирования в секундах"
+    )
+
     # CORS
     CORS_ORIGINS: str = Field(
         default="http://localhost:3000,http://localhost:5173",
@@ -72,6 +219,16 @@ class Settings(BaseSettings):
         """Возвращает список разрешенных источников для CORS."""
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",") if origin.strip()]
 
+    @property
+    def log_sampled_events_list(self) -> List[str]:
+        """Возвращает список INFO событий, к которым применяется выборка."""
+        return [event.strip() for event in self.LOG_SAMPLED_EVENTS.split(",") if event.strip()]
+
+    @property
+    def admin_emails_list(self) -> List[str]:
+        """Возвращает список email администраторов."""
+        return [email.strip().lower() for email in self.ADMIN_EMAILS.split(",") if email.strip()]
+
     @property
     def allowed_file_types_list(self) -> List[str]:
         """Возвращает список разрешенных типов файлов."""
@@ -5,6 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sess
 from sqlalchemy.orm import declarative_base
 
 from app.core.config import settings
+from app.utils.instrumentation import instrument_engine
 
 # Создание асинхронного движка БД
 engine = create_async_engine(
@@ -17,6 +18,7 @@ engine = create_async_engine(
     pool_recycle=3600,  # Переиспользование соединений каждый час
     pool_reset_on_return="commit",  # Сброс транзакций при возврате в пул
 )
+instrument_engine(engine)
 
 # Создание фабрики сессий
 AsyncSessionLocal = async_sessionmaker(
@@ -4,10 +4,11 @@
 from typing import Optional
 from uuid import UUID
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.core.database import get_db
 from app.core.redis import get_redis, Redis
 from app.models.user import User
@@ -19,29 +20,31 @@ logger = get_logger(__name__)
 
 # Схема для извлечения токена из заголовка
 security = HTTPBearer()
+# Необязательный заголовок для endpoints с другими способами аутентификации
+optional_security = HTTPBearer(auto_error=False)
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncSession = Depends(get_db),
-    redis: Redis = Depends(get_redis),
+async def _get_user_from_token(
+    token: str,
+    token_type: str,
+    db: AsyncSession,
+    redis: Redis,
 ) -> User:
     """
-    Получение текущего пользователя из JWT токена.
+    Получение пользователя из JWT токена заданного типа.
 
     Args:
-        credentials: Учетные данные из заголовка Authorization
+        token: JWT токен
+        token_type: Ожидаемый тип токена (access, stream)
         db: Сессия БД
         redis: Клиент Redis
 
     Returns:
-        Текущий пользователь
+        Пользователь
 
     Raises:
         HTTPException: Если токен невалидный или пользователь не найден
     """
-    token = credentials.credentials
-
     # Проверка токена в blacklist
     is_blacklisted = await redis.get(f"blacklist:{token}")
     if is_blacklisted:
@@ -62,7 +65,7 @@ async def get_current_user(
         )
 
     # Проверка типа токена
-    if payload.get("type") != "access":
+    if payload.get("type") != token_type:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Неверный тип токена",
@@ -96,6 +99,65 @@ async def get_current_user(
     return user
 
 
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
+) -> User:
+    """
+    Получение текущего пользователя из JWT токена.
+
+    Args:
+        credentials: Учетные данные из заголовка Authorization
+        db: Сессия БД
+        redis: Клиент Redis
+
+    Returns:
+        Текущий пользователь
+
+    Raises:
+        HTTPException: Если токен невалидный или пользователь не найден
+    """
+    return await _get_user_from_token(credentials.credentials, "access", db, redis)
+
+
+async def get_stream_user(
+    token: Optional[str] = Query(None, description="Токен из POST /events/token"),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
+) -> User:
+    """
+    Получение пользователя потока событий.
+
+    Клиенты с поддержкой заголовков передают access token в Authorization.
+    EventSource в браузере заголовки не передает и использует
+    короткоживущий токен из POST /events/token в параметре token. Access
+    token в URL не принимается, чтобы он не попадал в логи прокси.
+
+    Args:
+        token: Токен потока событий из query-параметра
+        credentials: Учетные данные из заголовка Authorization
+        db: Сессия БД
+        redis: Клиент Redis
+
+    Returns:
+        Текущий пользователь
+
+    Raises:
+        HTTPException: Если учетные данные не переданы или невалидны
+    """
+    if credentials is not None:
+        return await _get_user_from_token(credentials.credentials, "access", db, redis)
+    if token:
+        return await _get_user_from_token(token, "stream", db, redis)
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Не переданы учетные данные",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
 async def get_current_active_user(
     current_user: User = Depends(get_current_user),
 ) -> User:
@@ -118,3 +180,27 @@ async def get_current_active_user(
         )
     return current_user
 
+
+
+async def get_current_admin_user(
+    current_user: User = Depends(get_current_user),
+) -> User:
+    """
+    Получение пользователя с правами администратора (email из ADMIN_EMAILS).
+
+    Args:
+        current_user: Текущий пользователь
+
+    Returns:
+        Администратор
+
+    Raises:
+        HTTPException: Если пользователь не администратор
+    """
+    if current_user.email.lower() not in settings.admin_emails_list:
+        logger.warning("Admin access denied", user_id=str(current_user.id))
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Недостаточно прав",
+        )
+    return current_user
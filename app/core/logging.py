@@ -1,28 +1,135 @@
 """
 Настройка логирования.
+
+Записи не выводятся в потоке, который их создал: QueueHandler кладет
+запись в ограниченную очередь, а QueueListener в отдельном потоке
+рендерит ее (JSON через orjson или json) и пишет в stdout. Поэтому
+медленный stdout не блокирует event loop - при переполнении очереди
+записи отбрасываются, а их количество попадает в лог.
 """
+import atexit
+import json
 import logging
+import queue
+import random
 import sys
-from typing import Any
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Iterable, Optional
 
 import structlog
-from structlog.stdlib import LoggerFactory
+from structlog.stdlib import LoggerFactory, ProcessorFormatter
 
 from app.core.config import settings
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - зависит от окружения
+    orjson = None
+
+
+class EventSampler:
+    """
+    Выборка частых INFO событий.
+
+    Сохраненные события помечаются полем sample_rate, чтобы по логам
+    можно было восстановить исходное количество.
+    """
+
+    def __init__(self, rate: float, events: Iterable[str]):
+        """
+        Инициализация выборки.
+
+        Args:
+            rate: Доля сохраняемых событий
+            events: Сообщения событий, к которым применяется выборка
+        """
+        self.rate = rate
+        self.events = frozenset(events)
+
+    def __call__(self, logger: Any, method_name: str, event_dict: dict) -> dict:
+        if self.rate >= 1 or method_name != "info" or event_dict.get("event") not in self.events:
+            return event_dict
+        if random.random() >= self.rate:
+            raise structlog.DropEvent
+        event_dict["sample_rate"] = self.rate
+        return event_dict
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler с ограниченной очередью, который не блокирует вызывающий код.
+
+    Запись передается в очередь без форматирования: события structlog
+    рендерятся в потоке QueueListener.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if isinstance(record.msg, dict):
+            # Событие structlog: словарь рендерит ProcessorFormatter
+            return record
+        # Запись сторонней библиотеки: подстановка аргументов и traceback
+        return super().prepare(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            try:
+                self.queue.put_nowait(
+                    logging.makeLogRecord(
+                        {
+                            "name": __name__,
+                            "levelno": logging.WARNING,
+                            "levelname": "WARNING",
+                            "msg": f"{dropped} log records dropped: logging queue is full",
+                        }
+                    )
+                )
+            except queue.Full:
+                self.dropped += dropped
+
+
+_listener: Optional[QueueListener] = None
+
+
+def _orjson_dumps(value: Any, **kwargs: Any) -> str:
+    return orjson.dumps(value, default=str).decode()
+
+
+def _renderer() -> Any:
+    """Рендерер событий: консольный в режиме отладки, иначе JSON."""
+    if settings.DEBUG:
+        return structlog.dev.ConsoleRenderer()
+    if settings.LOG_JSON_SERIALIZER == "orjson" and orjson is not None:
+        return structlog.processors.JSONRenderer(serializer=_orjson_dumps)
+    return structlog.processors.JSONRenderer(serializer=json.dumps)
+
 
 def setup_logging() -> None:
     """Настройка структурированного логирования."""
-    # Настройка structlog
+    global _listener
+
+    # Настройка structlog. В потоке вызова выполняются только дешевые
+    # процессоры: фильтр уровня до сбора контекста, выборка и traceback
+    # (его нужно получить, пока исключение обрабатывается)
     structlog.configure(
         processors=[
+            structlog.stdlib.filter_by_level,
+            EventSampler(settings.LOG_INFO_SAMPLE_RATE, settings.log_sampled_events_list),
             structlog.contextvars.merge_contextvars,
             structlog.processors.add_log_level,
             structlog.processors.StackInfoRenderer(),
             structlog.dev.set_exc_info,
             structlog.processors.format_exc_info,
-            structlog.processors.UnicodeDecoder(),
-            structlog.processors.JSONRenderer() if not settings.DEBUG else structlog.dev.ConsoleRenderer(),
+            ProcessorFormatter.wrap_for_formatter,
         ],
         wrapper_class=structlog.stdlib.BoundLogger,
         logger_factory=LoggerFactory(),
@@ -30,19 +137,50 @@ def setup_logging() -> None:
         cache_logger_on_first_use=True,
     )
 
-    # Настройка стандартного логирования
-    logging.basicConfig(
-        format="%(message)s",
-        stream=sys.stdout,
-        level=getattr(logging, settings.LOG_LEVEL.upper()),
+    # Рендеринг и запись в stdout - в потоке QueueListener
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(
+        ProcessorFormatter(
+            processors=[
+                ProcessorFormatter.remove_processors_meta,
+                structlog.processors.UnicodeDecoder(),
+                _renderer(),
+            ],
+            foreign_pre_chain=[structlog.processors.add_log_level],
+        )
     )
 
+    if _listener is not None:
+        _listener.stop()
+    log_queue: queue.Queue = queue.Queue(settings.LOG_QUEUE_SIZE)
+    _listener = QueueListener(log_queue, stream_handler)
+    _listener.start()
+
+    # Настройка стандартного логирования. Место вызова, поток и процесс
+    # в вывод не попадают - их сбор отключен (см. раздел Optimization
+    # Logging HOWTO): поиск кадра вызова - самая дорогая часть записи
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    root = logging.getLogger()
+    root.handlers = [DroppingQueueHandler(log_queue)]
+    root.setLevel(getattr(logging, settings.LOG_LEVEL.upper()))
 
-def get_logger(name: str) -> Any:
-    """Получить логгер с указанным именем."""
-    return structlog.get_logger(name)
 
+def shutdown_logging() -> None:
+    """Вывод оставшихся записей и остановка потока логирования."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        # Записи после остановки пишутся напрямую
+        logging.getLogger().handlers = list(_listener.handlers)
+        _listener = None
 
 
+atexit.register(shutdown_logging)
 
 
+def get_logger(name: str) -> Any:
+    """Получить логгер с указанным именем."""
+    return structlog.get_logger(name)
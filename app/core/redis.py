@@ -1,19 +1,57 @@
 """
 Настройка подключения к Redis.
 """
-import redis.asyncio as redis
+import time
+
 from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
 
 from app.core.config import settings
+from app.utils.metrics import redis_operation_duration_seconds, redis_operations_total
+
+
+def _observe(operation: str, start_time: float) -> None:
+    """Запись количества и длительности операции Redis."""
+    redis_operations_total.labels(operation=operation).inc()
+    redis_operation_duration_seconds.labels(operation=operation).observe(time.perf_counter() - start_time)
+
+
+class InstrumentedPipeline(Pipeline):
+    """Pipeline Redis с метриками (одна операция PIPELINE на execute)."""
+
+    async def execute(self, raise_on_error: bool = True):
+        start_time = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            _observe("PIPELINE", start_time)
+
+
+class InstrumentedRedis(Redis):
+    """Клиент Redis с метриками операций (метка - имя команды)."""
+
+    async def execute_command(self, *args, **options):
+        start_time = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            _observe(str(args[0]).upper(), start_time)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
 
 # Глобальный объект Redis
 redis_client: Redis | None = None
 
+# Клиент без декодирования ответов (бинарные значения кеша)
+redis_binary_client: Redis | None = None
+
 
 async def init_redis() -> Redis:
     """Инициализация подключения к Redis."""
     global redis_client
-    redis_client = await redis.from_url(
+    redis_client = await InstrumentedRedis.from_url(
         settings.REDIS_URL,
         encoding="utf-8",
         decode_responses=True,
@@ -28,14 +66,20 @@ async def get_redis() -> Redis:
     return redis_client
 
 
+async def get_redis_binary() -> Redis:
+    """Получить клиент Redis, возвращающий bytes."""
+    global redis_binary_client
+    if redis_binary_client is None:
+        redis_binary_client = await InstrumentedRedis.from_url(settings.REDIS_URL, decode_responses=False)
+    return redis_binary_client
+
+
 async def close_redis() -> None:
     """Закрыть подключение к Redis."""
-    global redis_client
+    global redis_client, redis_binary_client
     if redis_client:
         await redis_client.close()
         redis_client = None
-
-
-
-
-
+    if redis_binary_client:
+        await redis_binary_client.close()
+        redis_binary_client = None
@@ -7,7 +7,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
-from app.core.logging import setup_logging, get_logger
+from app.core.logging import setup_logging, shutdown_logging, get_logger
 from app.core.redis import init_redis, close_redis
 from app.core.exceptions import (
     APIException,
@@ -20,13 +20,29 @@ from app.middleware.security import SecurityHeadersMiddleware
 from app.middleware.rate_limit import RateLimitMiddleware
 from app.middleware.query_logger import QueryLoggerMiddleware
 from app.middleware.metrics import MetricsMiddleware
-from app.utils.metrics import get_metrics_response
+from app.middleware.tracing import TracingMiddleware
+from app.utils.metrics import cleanup_dead_processes, get_metrics_response, mark_process_dead
+from app.utils.image_optimizer import start_image_executor, shutdown_image_executor
+from app.services.cache import start_invalidation_listener, stop_invalidation_listener
+from app.services.cache_invalidation import register_cache_invalidation
+from app.services.notifications import event_hub, register_status_notifications
+from app.utils.instrumentation import (
+    register_report_metrics,
+    start_queue_size_sampler,
+    stop_queue_size_sampler,
+)
+from app.utils.tracing import shutdown_tracing
 from fastapi.exceptions import RequestValidationError
 
 # Настройка логирования
 setup_logging()
 logger = get_logger(__name__)
 
+# Подписчики доменных событий
+register_cache_invalidation()
+register_status_notifications()
+register_report_metrics()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -35,14 +51,25 @@ async def lifespan(app: FastAPI):
     logger.info("Starting MediAudit API...")
     await init_redis()
     logger.info("Redis initialized")
+    start_invalidation_listener()
+    start_queue_size_sampler()
+    start_image_executor()
+    cleanup_dead_processes()
     logger.info("MediAudit API started successfully")
     
     yield
     
     # Shutdown
     logger.info("Shutting down MediAudit API...")
+    await stop_invalidation_listener()
+    await stop_queue_size_sampler()
+    mark_process_dead()
+    await event_hub.stop()
     await close_redis()
+    shutdown_image_executor()
+    shutdown_tracing()
     logger.info("MediAudit API shut down successfully")
+    shutdown_logging()
 
 
 # Создание приложения FastAPI
@@ -65,6 +92,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Rate limiting (только для production, в dev можно отключить).
+# Middleware, добавленный позже, выполняется раньше: ответ 429 проходит
+# через заголовки безопасности, логирование и метрики
+if not settings.DEBUG:
+    app.add_middleware(RateLimitMiddleware)
+
 # Безопасные HTTP заголовки
 app.add_middleware(SecurityHeadersMiddleware)
 
@@ -74,9 +107,8 @@ app.add_middleware(QueryLoggerMiddleware)
 # Метрики Prometheus
 app.add_middleware(MetricsMiddleware)
 
-# Rate limiting (только для production, в dev можно отключить)
-if not settings.DEBUG:
-    app.add_middleware(RateLimitMiddleware)
+# Трассировка (внешний middleware: спан охватывает все остальные)
+app.add_middleware(TracingMiddleware)
 
 # Обработчики исключений
 app.add_exception_handler(APIException, api_exception_handler)
@@ -2,57 +2,93 @@
 Middleware для сбора метрик Prometheus.
 """
 import time
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Dict, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.utils.metrics import (
     http_requests_total,
     http_request_duration_seconds,
 )
 
+# Метка endpoint для запросов, не совпавших ни с одним маршрутом
+# (сканеры, опечатки, 404) - иначе каждый такой путь создает новый ряд
+UNMATCHED_ENDPOINT = "unmatched"
+
+# Методы вне этого списка объединяются в одну метку
+KNOWN_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+OTHER_METHOD = "OTHER"
+
+
+def route_template(scope: Scope) -> str:
+    """
+    Шаблон маршрута запроса (например, /api/v1/documents/{document_id}).
+
+    Маршрут записывается в scope роутером FastAPI, поэтому значение
+    доступно после маршрутизации - к началу ответа.
 
-class MetricsMiddleware(BaseHTTPMiddleware):
-    """Middleware для сбора HTTP метрик."""
+    Args:
+        scope: ASGI scope запроса
 
-    async def dispatch(self, request: Request, call_next):
+    Returns:
+        Шаблон маршрута или UNMATCHED_ENDPOINT
+    """
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return path if path else UNMATCHED_ENDPOINT
+
+
+class MetricsMiddleware:
+    """ASGI middleware для сбора HTTP метрик."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        # Дочерние метрики по меткам: число комбинаций ограничено
+        # маршрутами, методами и статусами, а labels() каждый раз
+        # берет блокировку и собирает кортеж значений
+        self._counters: Dict[Tuple[str, str, int], object] = {}
+        self._histograms: Dict[Tuple[str, str], object] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Сбор метрик для каждого запроса."""
-        start_time = time.time()
-        
         # Исключаем метрики из метрик
-        if request.url.path == "/metrics":
-            return await call_next(request)
-        
-        response = await call_next(request)
-        
-        duration = time.time() - start_time
-        
-        # Нормализуем путь для метрик (убираем ID)
-        endpoint = request.url.path
-        # Заменяем UUID и числа на плейсхолдеры
-        parts = endpoint.split("/")
-        normalized_parts = []
-        for part in parts:
-            if part and (part.isdigit() or len(part) == 36):  # UUID или число
-                normalized_parts.append("{id}")
-            else:
-                normalized_parts.append(part)
-        normalized_endpoint = "/".join(normalized_parts)
-        
-        # Записываем метрики
-        http_requests_total.labels(
-            method=request.method,
-            endpoint=normalized_endpoint,
-            status_code=response.status_code
-        ).inc()
-        
-        http_request_duration_seconds.labels(
-            method=request.method,
-            endpoint=normalized_endpoint
-        ).observe(duration)
-        
-        return response
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        response_started = False
 
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                self._observe(scope, message["status"], time.perf_counter() - start_time)
+            await send(message)
 
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            # Необработанная ошибка без начатого ответа - клиент получит 500
+            if not response_started:
+                self._observe(scope, 500, time.perf_counter() - start_time)
+            raise
 
+    def _observe(self, scope: Scope, status_code: int, duration: float) -> None:
+        """Запись метрик запроса."""
+        method = scope["method"]
+        if method not in KNOWN_METHODS:
+            method = OTHER_METHOD
+        endpoint = route_template(scope)
 
+        counter = self._counters.get((method, endpoint, status_code))
+        if counter is None:
+            counter = http_requests_total.labels(method=method, endpoint=endpoint, status_code=status_code)
+            self._counters[(method, endpoint, status_code)] = counter
+        counter.inc()
 
+        histogram = self._histograms.get((method, endpoint))
+        if histogram is None:
+            histogram = http_request_duration_seconds.labels(method=method, endpoint=endpoint)
+            self._histograms[(method, endpoint)] = histogram
+        histogram.observe(duration)
@@ -1,50 +1,106 @@
 """
-Middleware для логирования медленных запросов к БД.
+Middleware для логирования медленных запросов и запросов к БД.
 """
 import time
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
 
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
 from app.core.logging import get_logger
+from app.utils.query_profiler import QueryStats, profile_queries
 
 logger = get_logger(__name__)
 
-# Порог для медленных запросов (в секундах)
-SLOW_QUERY_THRESHOLD = 1.0
+# Порог для медленных HTTP запросов (в секундах); медленные SQL
+# запросы логирует app.utils.slow_queries
+SLOW_REQUEST_THRESHOLD = 1.0
+
+# Длина текста SQL запроса в логе
+STATEMENT_LOG_LENGTH = 300
+
 
+class QueryLoggerMiddleware:
+    """
+    ASGI middleware для логирования медленных запросов.
 
-class QueryLoggerMiddleware(BaseHTTPMiddleware):
-    """Middleware для логирования медленных запросов."""
+    Также считает SQL запросы каждого HTTP запроса: в режиме DEBUG
+    отдает их количество и время в заголовках X-DB-Queries и X-DB-Time,
+    а при превышении DB_QUERY_BUDGET или многократном повторе одного
+    запроса (N+1) пишет предупреждение.
+    """
 
-    async def dispatch(self, request: Request, call_next):
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Логирование времени выполнения запросов."""
-        start_time = time.time()
-        
-        response = await call_next(request)
-        
-        duration = time.time() - start_time
-        
-        # Логируем медленные запросы
-        if duration > SLOW_QUERY_THRESHOLD:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+
+        with profile_queries() as stats:
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    # Время до начала ответа: у потоковых ответов (SSE) тело
+                    # передается сколь угодно долго и не считается медленным запросом
+                    duration = time.perf_counter() - start_time
+                    self._log(scope, message["status"], duration)
+
+                    # Добавляем заголовок с временем выполнения
+                    headers = [
+                        *message.get("headers", []),
+                        (b"x-response-time", f"{duration:.3f}s".encode("latin-1")),
+                    ]
+                    if settings.DEBUG:
+                        headers.append((b"x-db-queries", str(stats.count).encode("latin-1")))
+                        headers.append((b"x-db-time", f"{stats.duration * 1000:.1f}ms".encode("latin-1")))
+                    message["headers"] = headers
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                self._check_query_budget(scope, stats)
+
+    @staticmethod
+    def _log(scope: Scope, status_code: int, duration: float) -> None:
+        """Запись времени выполнения запроса в лог."""
+        if duration > SLOW_REQUEST_THRESHOLD:
+            client = scope.get("client")
             logger.warning(
                 "Slow request detected",
-                path=request.url.path,
-                method=request.method,
+                path=scope["path"],
+                method=scope["method"],
                 duration=duration,
-                status_code=response.status_code,
-                client_ip=request.client.host if request.client else "unknown",
+                status_code=status_code,
+                client_ip=client[0] if client else "unknown",
             )
         else:
             logger.debug(
                 "Request processed",
-                path=request.url.path,
-                method=request.method,
+                path=scope["path"],
+                method=scope["method"],
                 duration=duration,
-                status_code=response.status_code,
+                status_code=status_code,
             )
-        
-        # Добавляем заголовок с временем выполнения
-        response.headers["X-Response-Time"] = f"{duration:.3f}s"
-        
-        return response
 
+    @staticmethod
+    def _check_query_budget(scope: Scope, stats: QueryStats) -> None:
+        """Предупреждение о большом количестве или повторах SQL запросов."""
+        statement, repeats = stats.most_repeated()
+        if stats.count <= settings.DB_QUERY_BUDGET and repeats < settings.DB_QUERY_REPEAT_THRESHOLD:
+            return
+        route = scope.get("route")
+        logger.warning(
+            "Possible N+1 queries" if repeats >= settings.DB_QUERY_REPEAT_THRESHOLD else "DB query budget exceeded",
+            path=scope["path"],
+            endpoint=getattr(route, "path", None),
+            method=scope["method"],
+            db_queries=stats.count,
+            db_time=stats.duration,
+            budget=settings.DB_QUERY_BUDGET,
+            most_repeated_statement=(statement or "")[:STATEMENT_LOG_LENGTH],
+            most_repeated_count=repeats,
+        )
@@ -1,10 +1,11 @@
 """
 Middleware для rate limiting.
 """
-import time
-from typing import Dict
-from fastapi import Request, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Tuple
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from app.core.redis import get_redis
 from app.core.logging import get_logger
@@ -12,10 +13,10 @@ from app.core.logging import get_logger
 logger = get_logger(__name__)
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Middleware для ограничения частоты запросов."""
+class RateLimitMiddleware:
+    """ASGI middleware для ограничения частоты запросов."""
 
-    def __init__(self, app, calls: int = 100, period: int = 60):
+    def __init__(self, app: ASGIApp, calls: int = 100, period: int = 60):
         """
         Инициализация rate limiter.
 
@@ -24,43 +25,48 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             calls: Количество разрешенных запросов
             period: Период времени в секундах
         """
-        super().__init__(app)
+        self.app = app
         self.calls = calls
         self.period = period
 
-    async def dispatch(self, request: Request, call_next):
-        """Проверка rate limit перед обработкой запроса."""
-        # Получаем IP адрес клиента
-        client_ip = request.client.host if request.client else "unknown"
-
-        # Получаем путь для определения типа endpoint
-        path = request.url.path
-
-        # Определяем лимиты в зависимости от endpoint
+    def _limits(self, path: str) -> Tuple[int, int]:
+        """Лимиты (запросов, период) в зависимости от endpoint."""
         if path.startswith("/api/v1/auth/login") or path.startswith("/api/v1/auth/register"):
             # Более строгие лимиты для аутентификации
-            calls = 5
-            period = 60
-        elif path.startswith("/api/v1/documents/upload"):
+            return 5, 60
+        if path.startswith("/api/v1/documents/upload"):
             # Лимиты для загрузки файлов
-            calls = 10
-            period = 60
-        elif path.startswith("/api/v1/reports/generate"):
+            return 10, 60
+        if path.startswith("/api/v1/reports/generate"):
             # Лимиты для генерации отчетов
-            calls = 5
-            period = 60
-        else:
-            # Стандартные лимиты
-            calls = self.calls
-            period = self.period
+            return 5, 60
+        # Стандартные лимиты
+        return self.calls, self.period
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Проверка rate limit перед обработкой запроса."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Получаем IP адрес клиента
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+        path = scope["path"]
+        calls, period = self._limits(path)
 
         # Проверяем rate limit
         try:
             redis = await get_redis()
             key = f"rate_limit:{client_ip}:{path}"
-            current = await redis.get(key)
 
-            if current and int(current) >= calls:
+            # Счетчик фиксированного окна: один запрос к Redis,
+            # время жизни выставляется при создании счетчика
+            current = await redis.incr(key)
+            if current == 1:
+                await redis.expire(key, period)
+
+            if current > calls:
                 logger.warning(
                     "Rate limit exceeded",
                     client_ip=client_ip,
@@ -68,28 +74,23 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
                     calls=calls,
                     period=period,
                 )
-                raise HTTPException(
+                ttl = await redis.ttl(key)
+                if ttl < 0:
+                    # Счетчик без времени жизни (сбой между INCR и EXPIRE)
+                    await redis.expire(key, period)
+                    ttl = period
+                response = JSONResponse(
                     status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    detail=f"Превышен лимит запросов. Максимум {calls} запросов за {period} секунд.",
-                    headers={"Retry-After": str(period)},
+                    content={
+                        "detail": f"Превышен лимит запросов. Максимум {calls} запросов за {period} секунд."
+                    },
+                    headers={"Retry-After": str(ttl)},
                 )
+                await response(scope, receive, send)
+                return
 
-            # Увеличиваем счетчик
-            pipe = redis.pipeline()
-            pipe.incr(key)
-            pipe.expire(key, period)
-            await pipe.execute()
-
-        except HTTPException:
-            raise
         except Exception as e:
             logger.error("Error checking rate limit", error=str(e))
             # В случае ошибки Redis продолжаем выполнение
 
-        response = await call_next(request)
-        return response
-
-
-
-
-
+        await self.app(scope, receive, send)
@@ -1,44 +1,52 @@
 """
 Middleware для безопасности.
 """
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response as StarletteResponse
-
-from app.core.logging import get_logger
-
-logger = get_logger(__name__)
-
-
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """Middleware для добавления безопасных HTTP заголовков."""
-
-    async def dispatch(self, request: Request, call_next):
-        """Добавление безопасных заголовков к ответу."""
-        response = await call_next(request)
-
-        # Безопасные заголовки
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
-
-        # Content-Security-Policy (базовая настройка)
-        # В production нужно настроить более строгие правила
-        csp = (
-            "default-src 'self'; "
-            "script-src 'self' 'unsafe-inline'; "
-            "style-src 'self' 'unsafe-inline'; "
-            "img-src 'self' data:; "
-            "font-src 'self'; "
-            "connect-src 'self';"
-        )
-        response.headers["Content-Security-Policy"] = csp
-
-        return response
-
-
-
-
-
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Content-Security-Policy (базовая настройка)
+# В production нужно настроить более строгие правила
+CSP = (
+    "default-src 'self'; "
+    "script-src 'self' 'unsafe-inline'; "
+    "style-src 'self' 'unsafe-inline'; "
+    "img-src 'self' data:; "
+    "font-src 'self'; "
+    "connect-src 'self';"
+)
+
+# Безопасные заголовки (закодированы один раз при импорте)
+SECURITY_HEADERS = [
+    (name.lower().encode("latin-1"), value.encode("latin-1"))
+    for name, value in {
+        "X-Content-Type-Options": "nosniff",
+        "X-Frame-Options": "DENY",
+        "X-XSS-Protection": "1; mode=block",
+        "Referrer-Policy": "strict-origin-when-cross-origin",
+        "Permissions-Policy": "geolocation=(), microphone=(), camera=()",
+        "Content-Security-Policy": CSP,
+    }.items()
+]
+_SECURITY_HEADER_NAMES = {name for name, _ in SECURITY_HEADERS}
+
+
+class SecurityHeadersMiddleware:
+    """ASGI middleware для добавления безопасных HTTP заголовков."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Добавление безопасных заголовков к началу ответа."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = [
+                    header for header in message.get("headers", []) if header[0] not in _SECURITY_HEADER_NAMES
+                ]
+                message["headers"] = headers + SECURITY_HEADERS
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
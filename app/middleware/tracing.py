@@ -0,0 +1,54 @@
+"""
+Middleware для трассировки HTTP запросов.
+"""
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.middleware.metrics import route_template
+from app.utils.tracing import SPAN_KIND_SERVER, parse_traceparent, trace_span
+
+# Служебные endpoints, запросы к которым не трассируются
+UNTRACED_PATHS = ("/health", "/metrics")
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware, создающий спан на каждый HTTP запрос.
+
+    Трасса продолжается из заголовка traceparent запроса. Имя спана -
+    метод и шаблон маршрута, известный к началу ответа.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Выполнение запроса внутри спана."""
+        if scope["type"] != "http" or not settings.TRACING_ENABLED or scope["path"] in UNTRACED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        method = scope["method"]
+        with trace_span(
+            f"{method} {scope['path']}",
+            SPAN_KIND_SERVER,
+            parse_traceparent(traceparent),
+            attributes={"http.method": method, "http.target": scope["path"]},
+        ) as span:
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    route = route_template(scope)
+                    span.name = f"{method} {route}"
+                    span.set_attribute("http.route", route)
+                    span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.set_error(f"HTTP {message['status']}")
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
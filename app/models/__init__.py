@@ -6,6 +6,7 @@ from app.models.document import Document
 from app.models.audit_report import AuditReport
 from app.models.violation import Violation
 from app.models.analysis_summary import AnalysisSummary
+from app.models.file_blob import FileBlob
 
 __all__ = [
     "User",
@@ -13,6 +14,7 @@ __all__ = [
     "AuditReport",
     "Violation",
     "AnalysisSummary",
+    "FileBlob",
 ]
 
 
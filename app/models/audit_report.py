@@ -37,6 +37,16 @@ class AuditReport(Base):
     # Метаданные анализа (опционально)
     processing_started_at = Column(DateTime, nullable=True)
     processing_duration_seconds = Column(Integer, nullable=True)
+    # Подтверждение приема документа NLP-сервисом
+    nlp_dispatched_at = Column(DateTime, nullable=True)
+
+    # Версии модели и правил, на которых получен результат (ключ переиспользования)
+    nlp_model_version = Column(String(100), nullable=True)
+    ruleset_version = Column(String(100), nullable=True)
+    # Отчет-источник, если результат скопирован без обращения к NLP-сервису
+    cloned_from_report_id = Column(
+        UUID(as_uuid=True), ForeignKey("audit_reports.id", ondelete="SET NULL"), nullable=True, index=True
+    )
 
     # Связи
     document = relationship("Document", back_populates="audit_reports")
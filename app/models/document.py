@@ -4,7 +4,7 @@
 from datetime import datetime
 from uuid import uuid4
 
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Enum, UniqueConstraint, JSON
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import enum
@@ -21,6 +21,22 @@ class DocumentStatus(str, enum.Enum):
     FAILED = "failed"
 
 
+class MediaStatus(str, enum.Enum):
+    """Этапы фоновой обработки загруженного файла."""
+
+    QUEUED = "queued"
+    OPTIMIZING = "optimizing"
+    EXTRACTING_METADATA = "extracting_metadata"
+    GENERATING_THUMBNAIL = "generating_thumbnail"
+    READY = "ready"
+    FAILED = "failed"
+
+
+def _default_content_hash(context) -> str:
+    """Хранимое содержимое по умолчанию совпадает с загруженным файлом."""
+    return context.get_current_parameters()["file_hash"]
+
+
 class Document(Base):
     """Модель документа."""
 
@@ -32,15 +48,31 @@ class Document(Base):
     stored_filename = Column(String(500), nullable=False)
     file_size = Column(Integer, nullable=False)
     mime_type = Column(String(100), nullable=False)
-    file_hash = Column(String(64), nullable=False, index=True)  # SHA-256
+    file_hash = Column(String(64), nullable=False, index=True)  # SHA-256 загруженного файла
+    # SHA-256 хранимого содержимого (ключ блоба), отличается от file_hash после оптимизации
+    content_hash = Column(String(64), default=_default_content_hash, nullable=False)
     status = Column(Enum(DocumentStatus), default=DocumentStatus.PENDING, nullable=False, index=True)
+    media_status = Column(Enum(MediaStatus), default=MediaStatus.READY, nullable=False)
+    page_count = Column(Integer, nullable=True)
+    media_metadata = Column(JSON, nullable=True)
+    thumbnail_filename = Column(String(500), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
+    # Уникальность содержимого в рамках пользователя (дедупликация через ON CONFLICT)
+    __table_args__ = (
+        UniqueConstraint("user_id", "file_hash", name="uq_documents_user_id_file_hash"),
+    )
+
     # Связи
     user = relationship("User", backref="documents")
     audit_reports = relationship("AuditReport", back_populates="document", cascade="all, delete-orphan")
 
+    @property
+    def has_thumbnail(self) -> bool:
+        """Построено ли превью документа."""
+        return self.thumbnail_filename is not None
+
     def __repr__(self) -> str:
         return f"<Document(id={self.id}, filename={self.original_filename}, status={self.status})>"
 
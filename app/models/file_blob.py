@@ -0,0 +1,23 @@
+"""
+Модель файлового блоба (content-addressed хранилище).
+"""
+from datetime import datetime
+
+from sqlalchemy import Column, String, Integer, DateTime
+
+from app.core.database import Base
+
+
+class FileBlob(Base):
+    """Модель блоба: один файл на диске для всех документов с одинаковым содержимым."""
+
+    __tablename__ = "file_blobs"
+
+    file_hash = Column(String(64), primary_key=True)  # SHA-256
+    stored_filename = Column(String(500), nullable=False)
+    file_size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<FileBlob(file_hash={self.file_hash}, ref_count={self.ref_count})>"
@@ -0,0 +1,26 @@
+"""
+Pydantic схемы для административных endpoints.
+"""
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class SlowQueryItem(BaseModel):
+    """Агрегат SQL запросов с одним отпечатком."""
+
+    fingerprint: str = Field(..., description="Текст запроса без литералов и параметров")
+    calls: int = Field(..., description="Количество выполнений")
+    total_time_ms: float = Field(..., description="Суммарное время в миллисекундах")
+    mean_time_ms: float = Field(..., description="Среднее время в миллисекундах")
+    max_time_ms: float = Field(..., description="Максимальное время в миллисекундах")
+    slow_calls: int = Field(..., description="Количество выполнений дольше порога")
+    sample_plan: Optional[str] = Field(None, description="План последнего проанализированного выполнения")
+
+
+class SlowQueryReport(BaseModel):
+    """Отчет о SQL запросах процесса."""
+
+    pid: int = Field(..., description="PID процесса, собравшего статистику")
+    threshold_ms: int = Field(..., description="Порог медленного запроса в миллисекундах")
+    items: List[SlowQueryItem]
@@ -42,6 +42,13 @@ class TokenResponse(BaseModel):
     token_type: str = Field(default="bearer", description="Тип токена")
 
 
+class StreamTokenResponse(BaseModel):
+    """Схема ответа с токеном подключения к потоку событий."""
+
+    token: str = Field(..., description="Токен для параметра token в GET /events/stream")
+    expires_in: int = Field(..., description="Время жизни токена в секундах")
+
+
 class TokenRefresh(BaseModel):
     """Схема для обновления токена."""
 
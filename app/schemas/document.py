@@ -3,7 +3,7 @@ Pydantic схемы для документов.
 """
 from datetime import datetime
 from uuid import UUID
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 
 from pydantic import BaseModel, Field
 
@@ -33,6 +33,10 @@ class DocumentResponse(DocumentBase):
     mime_type: str
     file_hash: str
     status: str
+    media_status: str = Field(default="ready", description="Этап фоновой обработки файла")
+    page_count: Optional[int] = Field(None, description="Количество страниц")
+    media_metadata: Optional[Dict[str, Any]] = Field(None, description="Метаданные файла")
+    has_thumbnail: bool = Field(default=False, description="Доступно ли превью")
     created_at: datetime
     updated_at: datetime
 
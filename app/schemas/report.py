@@ -78,6 +78,10 @@ class AuditReportResponse(BaseModel):
     error_message: Optional[str] = None
     processing_started_at: Optional[datetime] = None
     processing_duration_seconds: Optional[int] = None
+    nlp_dispatched_at: Optional[datetime] = None
+    nlp_model_version: Optional[str] = None
+    ruleset_version: Optional[str] = None
+    cloned_from_report_id: Optional[UUID] = None
 
     # Связанные данные
     document: Optional[DocumentInfoResponse] = None
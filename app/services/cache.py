@@ -1,14 +1,128 @@
 """
 Сервис для кеширования данных.
+
+Кеш двухуровневый: перед Redis стоит LRU кеш в памяти процесса с
+ограниченным временем жизни записей. Удаления публикуются в канал Redis
+pub/sub, и каждый процесс API сбрасывает у себя соответствующие записи.
 """
-from typing import Optional, Any
-from datetime import timedelta
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from typing import Optional, Any, Awaitable, Callable, Dict, Set, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
 
-from app.core.redis import get_redis
+from app.core.config import settings
+from app.core.redis import get_redis, get_redis_binary
 from app.core.logging import get_logger
+from app.utils import cache_codec
+from app.utils.metrics import cache_requests_total
 
 logger = get_logger(__name__)
 
+ModelT = TypeVar("ModelT", bound=BaseModel)
+T = TypeVar("T")
+
+# Кодек значений кеша
+_codec = cache_codec.get_codec(settings.CACHE_CODEC)
+
+# Префикс счетчиков поколений (инвалидация групп ключей без перебора)
+GENERATION_PREFIX = "cache:gen:"
+
+# Блокировки пересчета значений (single-flight между процессами)
+LOCK_PREFIX = "cache:lock:"
+LOCK_POLL_INTERVAL = 0.05
+
+# Снятие блокировки только ее владельцем
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Время свежести значения перед его содержимым (stale-while-revalidate)
+_STAMP_SEPARATOR = b"|"
+
+# Вычисления, выполняющиеся в процессе, по ключу кеша
+_inflight: Dict[str, asyncio.Future] = {}
+
+# Фоновые обновления устаревших значений (ссылки, чтобы задачи не собрал GC)
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _split_stamp(data: bytes) -> Tuple[float, bytes]:
+    """Разделение времени свежести и значения (без отметки значение считается устаревшим)."""
+    stamp, _, value = data.partition(_STAMP_SEPARATOR)
+    try:
+        return float(stamp), value
+    except ValueError:
+        return 0.0, data
+
+
+class LocalCache:
+    """LRU кеш в памяти процесса с ограничением размера и времени жизни записей."""
+
+    def __init__(self, max_entries: int, ttl: int):
+        """
+        Инициализация кеша.
+
+        Args:
+            max_entries: Максимальное количество записей
+            ttl: Максимальное время жизни записи в секундах
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Значение по ключу или None, если записи нет или она устарела."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        """Сохранение значения (время жизни не больше собственного TTL кеша)."""
+        ttl = min(ttl, self.ttl) if ttl is not None else self.ttl
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        """Удаление записи."""
+        self._entries.pop(key, None)
+
+    def delete_pattern(self, pattern: str) -> int:
+        """Удаление записей по glob-паттерну (как в Redis KEYS)."""
+        keys = [key for key in self._entries if fnmatchcase(key, pattern)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        """Очистка кеша."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Кеш процесса (первый уровень)
+local_cache = LocalCache(
+    max_entries=settings.CACHE_LOCAL_MAX_ENTRIES,
+    ttl=settings.CACHE_LOCAL_TTL_SECONDS,
+)
+
 
 class CacheService:
     """Сервис для работы с кешем."""
@@ -24,15 +138,13 @@ class CacheService:
         Returns:
             Значение или None
         """
-        try:
-            redis = await get_redis()
-            value = await redis.get(key)
-            if value:
-                import json
-                return json.loads(value)
+        data = await CacheService._get_bytes(key)
+        if data is None:
             return None
+        try:
+            return cache_codec.decode(data)
         except Exception as e:
-            logger.warning("Error getting from cache", key=key, error=str(e))
+            logger.warning("Error decoding cache value", key=key, error=str(e))
             return None
 
     @staticmethod
@@ -49,14 +161,126 @@ class CacheService:
             True если успешно сохранено
         """
         try:
-            redis = await get_redis()
-            import json
-            serialized = json.dumps(value)
-            await redis.setex(key, ttl, serialized)
-            return True
+            data = cache_codec.encode(value, _codec, settings.CACHE_COMPRESS_MIN_BYTES)
+        except Exception as e:
+            logger.warning("Error encoding cache value", key=key, error=str(e))
+            return False
+        return await CacheService._set_bytes(key, data, ttl)
+
+    @staticmethod
+    async def get_raw(key: str) -> Optional[bytes]:
+        """
+        Получение готовых байт из кеша (без десериализации).
+
+        Args:
+            key: Ключ кеша
+
+        Returns:
+            Байты, сохраненные через set_raw, или None
+        """
+        data = await CacheService._get_bytes(key)
+        if data is None:
+            return None
+        codec, payload = cache_codec.unpack(data)
+        return payload if codec is cache_codec.RAW_CODEC else None
+
+    @staticmethod
+    async def set_raw(key: str, data: bytes, ttl: int = 3600) -> bool:
+        """
+        Сохранение готовых байт в кеш (например, файла или тела ответа).
+
+        Args:
+            key: Ключ кеша
+            data: Байты для сохранения
+            ttl: Время жизни в секундах
+
+        Returns:
+            True если успешно сохранено
+        """
+        envelope = cache_codec.encode(data, cache_codec.RAW_CODEC, settings.CACHE_COMPRESS_MIN_BYTES)
+        return await CacheService._set_bytes(key, envelope, ttl)
+
+    @staticmethod
+    async def get_model(key: str, model: Type[ModelT]) -> Optional[ModelT]:
+        """
+        Получение pydantic модели из кеша.
+
+        JSON разбирается и валидируется pydantic-core за один проход,
+        без промежуточного словаря.
+
+        Args:
+            key: Ключ кеша
+            model: Класс модели
+
+        Returns:
+            Экземпляр модели или None
+        """
+        data = await CacheService.get_raw(key)
+        if data is None:
+            return None
+        try:
+            return model.model_validate_json(data)
+        except ValueError as e:
+            logger.warning("Error decoding cached model", key=key, error=str(e))
+            return None
+
+    @staticmethod
+    async def set_model(key: str, value: BaseModel, ttl: int = 3600) -> bool:
+        """
+        Сохранение pydantic модели в кеш (в виде JSON, собранного pydantic-core).
+
+        Args:
+            key: Ключ кеша
+            value: Экземпляр модели
+            ttl: Время жизни в секундах
+
+        Returns:
+            True если успешно сохранено
+        """
+        return await CacheService.set_raw(key, value.model_dump_json().encode(), ttl)
+
+    @staticmethod
+    async def _get_bytes(key: str) -> Optional[bytes]:
+        """Чтение конверта значения: кеш процесса, затем Redis."""
+        if settings.CACHE_LOCAL_ENABLED:
+            data = local_cache.get(key)
+            if data is not None:
+                cache_requests_total.labels(tier="local", result="hit").inc()
+                return data
+            cache_requests_total.labels(tier="local", result="miss").inc()
+
+        try:
+            redis = await get_redis_binary()
+            data = await redis.get(key)
+        except Exception as e:
+            logger.warning("Error getting from cache", key=key, error=str(e))
+            return None
+
+        if not data:
+            cache_requests_total.labels(tier="redis", result="miss").inc()
+            return None
+
+        cache_requests_total.labels(tier="redis", result="hit").inc()
+        CacheService._set_local(key, data)
+        return data
+
+    @staticmethod
+    async def _set_bytes(key: str, data: bytes, ttl: int) -> bool:
+        """Запись конверта значения в Redis и кеш процесса."""
+        try:
+            redis = await get_redis_binary()
+            await redis.setex(key, ttl, data)
         except Exception as e:
             logger.warning("Error setting cache", key=key, error=str(e))
             return False
+        CacheService._set_local(key, data, ttl)
+        return True
+
+    @staticmethod
+    def _set_local(key: str, data: bytes, ttl: Optional[int] = None) -> None:
+        """Запись в кеш процесса (большие значения хранятся только в Redis)."""
+        if settings.CACHE_LOCAL_ENABLED and len(data) <= settings.CACHE_LOCAL_MAX_VALUE_BYTES:
+            local_cache.set(key, data, ttl)
 
     @staticmethod
     async def delete(key: str) -> bool:
@@ -69,9 +293,11 @@ class CacheService:
         Returns:
             True если успешно удалено
         """
+        local_cache.delete(key)
         try:
             redis = await get_redis()
             await redis.delete(key)
+            await CacheService._publish_invalidation({"key": key})
             return True
         except Exception as e:
             logger.warning("Error deleting from cache", key=key, error=str(e))
@@ -82,24 +308,324 @@ class CacheService:
         """
         Удаление всех ключей по паттерну.
 
+        Ключи перебираются через SCAN, не блокируя Redis; для частой
+        инвалидации следует использовать bump_generation.
+
         Args:
             pattern: Паттерн для поиска ключей
 
         Returns:
             Количество удаленных ключей
         """
+        local_cache.delete_pattern(pattern)
         try:
             redis = await get_redis()
-            keys = await redis.keys(pattern)
+            keys = [key async for key in redis.scan_iter(match=pattern, count=500)]
             if keys:
-                await redis.delete(*keys)
-                return len(keys)
-            return 0
+                await redis.unlink(*keys)
+            await CacheService._publish_invalidation({"pattern": pattern})
+            return len(keys)
         except Exception as e:
             logger.warning("Error deleting pattern from cache", pattern=pattern, error=str(e))
             return 0
 
+    @staticmethod
+    async def get_generation(namespace: str) -> int:
+        """
+        Текущее поколение пространства ключей.
+
+        Поколение входит в ключи кеша списков (см. versioned_key), поэтому
+        для инвалидации всех списков достаточно увеличить счетчик, не
+        перебирая ключи. Устаревшие записи удаляются Redis по TTL.
+
+        Args:
+            namespace: Пространство ключей (например, documents:user:<id>)
+
+        Returns:
+            Номер поколения (0, если счетчик еще не создан)
+        """
+        key = f"{GENERATION_PREFIX}{namespace}"
+        if settings.CACHE_LOCAL_ENABLED:
+            generation = local_cache.get(key)
+            if generation is not None:
+                return int(generation)
+
+        try:
+            redis = await get_redis()
+            generation = await redis.get(key) or "0"
+        except Exception as e:
+            logger.warning("Error getting cache generation", namespace=namespace, error=str(e))
+            return 0
+
+        if settings.CACHE_LOCAL_ENABLED:
+            local_cache.set(key, generation)
+        return int(generation)
+
+    @staticmethod
+    async def bump_generation(namespace: str) -> bool:
+        """
+        Инвалидация всех ключей пространства за O(1) (INCR счетчика поколения).
+
+        Args:
+            namespace: Пространство ключей
+
+        Returns:
+            True если успешно
+        """
+        key = f"{GENERATION_PREFIX}{namespace}"
+        local_cache.delete(key)
+        try:
+            redis = await get_redis()
+            await redis.incr(key)
+            await CacheService._publish_invalidation({"key": key})
+            return True
+        except Exception as e:
+            logger.warning("Error bumping cache generation", namespace=namespace, error=str(e))
+            return False
+
+    @staticmethod
+    async def versioned_key(namespace: str, suffix: str) -> str:
+        """
+        Ключ кеша с текущим поколением пространства.
+
+        Args:
+            namespace: Пространство ключей
+            suffix: Параметры запроса
+
+        Returns:
+            Ключ вида <namespace>:v<generation>:<suffix>
+        """
+        generation = await CacheService.get_generation(namespace)
+        return f"{namespace}:v{generation}:{suffix}"
+
+    @staticmethod
+    async def single_flight(key: str, compute: Callable[[], Awaitable[T]]) -> T:
+        """
+        Выполнение compute не более одного раза одновременно для ключа в процессе.
+
+        Параллельные вызовы с тем же ключом ждут результат первого. Если
+        первый вызов отменен (клиент отключился), ожидающие вычисляют сами.
 
+        Args:
+            key: Ключ кеша
+            compute: Функция вычисления значения
+
+        Returns:
+            Результат compute
+        """
+        inflight = _inflight.get(key)
+        if inflight is not None:
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        _inflight[key] = future
+        try:
+            result = await compute()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # Исключение получат ожидающие, предупреждение не нужно
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if _inflight.get(key) is future:
+                del _inflight[key]
+
+    @staticmethod
+    async def get_or_compute_raw(
+        key: str,
+        compute: Callable[[], Awaitable[bytes]],
+        ttl: int,
+        stale_ttl: int = 0,
+        refresh: Optional[Callable[[], Awaitable[bytes]]] = None,
+    ) -> bytes:
+        """
+        Чтение значения с защитой от одновременного пересчета (thundering herd).
+
+        При промахе значение вычисляет один вызов на процесс (single_flight)
+        и один процесс на кластер (короткая блокировка в Redis); остальные
+        ждут его результат. В течение stale_ttl после истечения ttl отдается
+        устаревшее значение, а пересчет выполняется в фоне (stale-while-revalidate).
+
+        Args:
+            key: Ключ кеша
+            compute: Вычисление значения в контексте текущего запроса
+            ttl: Время свежести значения в секундах
+            stale_ttl: Время, в течение которого допустимо отдавать устаревшее значение
+            refresh: Вычисление для фонового обновления (не должно использовать
+                ресурсы запроса, например его сессию БД); по умолчанию compute
+
+        Returns:
+            Значение
+        """
+        cached = await CacheService.get_raw(key)
+        if cached is not None:
+            fresh_until, value = _split_stamp(cached)
+            if time.time() < fresh_until:
+                return value
+            if stale_ttl > 0:
+                CacheService._revalidate_in_background(key, refresh or compute, ttl, stale_ttl)
+                return value
+
+        return await CacheService.single_flight(
+            key, lambda: CacheService._compute_locked(key, compute, ttl, stale_ttl)
+        )
+
+    @staticmethod
+    async def _compute_locked(
+        key: str,
+        compute: Callable[[], Awaitable[bytes]],
+        ttl: int,
+        stale_ttl: int,
+    ) -> bytes:
+        """Вычисление значения под блокировкой Redis (один пересчет на кластер)."""
+        lock_key = f"{LOCK_PREFIX}{key}"
+        token = uuid.uuid4().hex
+        try:
+            redis = await get_redis_binary()
+            acquired = await redis.set(lock_key, token, nx=True, px=settings.CACHE_LOCK_TIMEOUT_MS)
+        except Exception as e:
+            logger.warning("Error acquiring cache lock", key=key, error=str(e))
+            redis, acquired = None, True
+
+        if not acquired:
+            # Значение пересчитывает другой процесс - ждем его результат
+            value = await CacheService._wait_for_fresh(redis, key)
+            if value is not None:
+                return value
 
+        try:
+            value = await compute()
+            stamped = f"{time.time() + ttl:.3f}".encode() + _STAMP_SEPARATOR + value
+            await CacheService.set_raw(key, stamped, ttl=ttl + stale_ttl)
+            return value
+        finally:
+            if acquired and redis is not None:
+                try:
+                    await redis.eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+                except Exception as e:
+                    logger.warning("Error releasing cache lock", key=key, error=str(e))
+
+    @staticmethod
+    async def _wait_for_fresh(redis, key: str) -> Optional[bytes]:
+        """Ожидание свежего значения, которое вычисляет владелец блокировки."""
+        deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT_MS / 1000
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            try:
+                data = await redis.get(key)
+            except Exception:
+                return None
+            if not data:
+                continue
+            codec, payload = cache_codec.unpack(data)
+            if codec is not cache_codec.RAW_CODEC:
+                continue
+            fresh_until, value = _split_stamp(payload)
+            if time.time() < fresh_until:
+                CacheService._set_local(key, data)
+                return value
+        return None
+
+    @staticmethod
+    def _revalidate_in_background(
+        key: str,
+        refresh: Callable[[], Awaitable[bytes]],
+        ttl: int,
+        stale_ttl: int,
+    ) -> None:
+        """Фоновое обновление устаревшего значения (одно на ключ в процессе)."""
+        if key in _inflight:
+            return
+
+        async def revalidate() -> None:
+            try:
+                await CacheService.single_flight(
+                    key, lambda: CacheService._compute_locked(key, refresh, ttl, stale_ttl)
+                )
+            except Exception as e:
+                logger.warning("Error revalidating cache", key=key, error=str(e))
+
+        task = asyncio.create_task(revalidate())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    @staticmethod
+    async def _publish_invalidation(message: dict) -> None:
+        """Оповещение остальных процессов об удалении ключей."""
+        if not settings.CACHE_LOCAL_ENABLED:
+            return
+        redis = await get_redis()
+        await redis.publish(settings.CACHE_INVALIDATION_CHANNEL, json.dumps(message))
+
+
+def apply_invalidation(message: str) -> None:
+    """
+    Применение сообщения об инвалидации к кешу процесса.
+
+    Args:
+        message: JSON вида {"key": ...} или {"pattern": ...}
+    """
+    data = json.loads(message)
+    if "key" in data:
+        local_cache.delete(data["key"])
+    elif "pattern" in data:
+        local_cache.delete_pattern(data["pattern"])
 
 
+async def listen_for_invalidations() -> None:
+    """
+    Подписка на канал инвалидации (выполняется фоновой задачей процесса API).
+
+    При потере соединения кеш процесса очищается целиком, так как
+    сообщения за время разрыва могли быть пропущены.
+    """
+    while True:
+        pubsub = None
+        try:
+            redis = await get_redis()
+            pubsub = redis.pubsub()
+            await pubsub.subscribe(settings.CACHE_INVALIDATION_CHANNEL)
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    apply_invalidation(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Cache invalidation listener error", error=str(e))
+            local_cache.clear()
+            await asyncio.sleep(1)
+        finally:
+            if pubsub is not None:
+                await pubsub.close()
+
+
+_listener_task: Optional[asyncio.Task] = None
+
+
+def start_invalidation_listener() -> None:
+    """Запуск подписки на инвалидацию кеша процесса."""
+    global _listener_task
+    if settings.CACHE_LOCAL_ENABLED and _listener_task is None:
+        _listener_task = asyncio.create_task(listen_for_invalidations())
+
+
+async def stop_invalidation_listener() -> None:
+    """Остановка подписки на инвалидацию кеша процесса."""
+    global _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
+    local_cache.clear()
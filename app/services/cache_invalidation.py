@@ -0,0 +1,72 @@
+"""
+Инвалидация кеша по доменным событиям.
+"""
+from uuid import UUID
+
+from app.services.cache import CacheService
+from app.services.events import DocumentDeleted, ReportStatusChanged, subscribe
+
+
+def report_views_namespace(user_id: UUID) -> str:
+    """Пространство ключей кеша детальных ответов отчетов пользователя."""
+    return f"report_views:user:{user_id}"
+
+
+async def report_view_key(user_id: UUID, report_id: UUID) -> str:
+    """
+    Ключ кеша детального ответа отчета.
+
+    Ключ включает поколение пространства отчетов пользователя. Запрос
+    получает ключ до чтения отчета из БД, поэтому ответ, сохраненный после
+    параллельного удаления документа, попадает в старое поколение и уже
+    не читается.
+
+    Args:
+        user_id: ID владельца отчета
+        report_id: ID отчета
+
+    Returns:
+        Ключ кеша
+    """
+    return await CacheService.versioned_key(report_views_namespace(user_id), f"report:{report_id}")
+
+
+async def _evict_document(event) -> None:
+    """Сброс карточки документа и списков документов пользователя."""
+    await CacheService.delete(f"document:{event.document_id}:user:{event.user_id}")
+    await CacheService.bump_generation(f"documents:user:{event.user_id}")
+
+
+async def on_report_status_changed(event: ReportStatusChanged) -> None:
+    """
+    Сброс кеша отчета и связанного документа.
+
+    Args:
+        event: Событие смены статуса отчета
+    """
+    await CacheService.bump_generation(f"reports:user:{event.user_id}")
+    await CacheService.delete(await report_view_key(event.user_id, event.report_id))
+    await CacheService.delete(f"pdf_report:{event.report_id}")
+    await _evict_document(event)
+
+
+async def on_document_deleted(event: DocumentDeleted) -> None:
+    """
+    Сброс кеша удаленного документа и его отчетов.
+
+    Args:
+        event: Событие удаления документа
+    """
+    await _evict_document(event)
+    await CacheService.bump_generation(f"reports:user:{event.user_id}")
+    # Новое поколение отсекает и ответы, сохраненные запросами,
+    # прочитавшими отчет до удаления
+    await CacheService.bump_generation(report_views_namespace(event.user_id))
+    for report_id in event.report_ids:
+        await CacheService.delete(f"pdf_report:{report_id}")
+
+
+def register_cache_invalidation() -> None:
+    """Подписка инвалидации кеша на доменные события."""
+    subscribe(ReportStatusChanged, on_report_status_changed)
+    subscribe(DocumentDeleted, on_document_deleted)
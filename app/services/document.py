@@ -2,14 +2,17 @@
 Сервис для работы с документами.
 """
 from uuid import UUID
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Dict, Any
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, or_
+from sqlalchemy import select, func, or_, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import selectinload
 
-from app.models.document import Document, DocumentStatus
+from app.models.document import Document, DocumentStatus, MediaStatus
+from app.models.file_blob import FileBlob
 from app.schemas.document import DocumentFilterParams
+from app.utils.file import delete_file, get_blob_filename, get_thumbnail_filename, save_blob
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -27,10 +30,18 @@ class DocumentService:
         file_size: int,
         mime_type: str,
         file_hash: str,
-    ) -> Document:
+        media_status: MediaStatus = MediaStatus.READY,
+        content_hash: Optional[str] = None,
+    ) -> Optional[Document]:
         """
         Создание записи о документе в БД.
 
+        Вставка выполняется через INSERT ... ON CONFLICT DO NOTHING по
+        уникальному ключу (user_id, file_hash), поэтому проверка дубликатов
+        не требует отдельного SELECT и не подвержена гонке при параллельных
+        загрузках одного и того же файла. В той же транзакции увеличивается
+        счетчик ссылок на блоб с содержимым файла.
+
         Args:
             db: Сессия БД
             user_id: ID пользователя
@@ -38,24 +49,44 @@ class DocumentService:
             stored_filename: Имя сохраненного файла
             file_size: Размер файла
             mime_type: MIME-тип файла
-            file_hash: SHA-256 хеш файла
+            file_hash: SHA-256 хеш загруженного файла (ключ дедупликации)
+            media_status: Начальный этап фоновой обработки файла
+            content_hash: SHA-256 хеш сохраненного содержимого, если оно
+                отличается от загруженного (например, после оптимизации)
 
         Returns:
-            Созданный документ
+            Созданный документ или None, если документ с таким хешем
+            у пользователя уже существует
         """
-        document = Document(
-            user_id=user_id,
-            original_filename=original_filename,
-            stored_filename=stored_filename,
-            file_size=file_size,
-            mime_type=mime_type,
-            file_hash=file_hash,
-            status=DocumentStatus.PENDING,
+        content_hash = content_hash or file_hash
+        stmt = (
+            DocumentService._insert(db, Document)
+            .values(
+                user_id=user_id,
+                original_filename=original_filename,
+                stored_filename=stored_filename,
+                file_size=file_size,
+                mime_type=mime_type,
+                file_hash=file_hash,
+                content_hash=content_hash,
+                status=DocumentStatus.PENDING,
+                media_status=media_status,
+            )
+            .on_conflict_do_nothing(index_elements=[Document.user_id, Document.file_hash])
+            .returning(Document)
         )
 
-        db.add(document)
+        result = await db.execute(stmt)
+        document = result.scalar_one_or_none()
+
+        if document is None:
+            await db.commit()
+            logger.info("Duplicate document rejected", user_id=str(user_id), file_hash=file_hash)
+            return None
+
+        await DocumentService._acquire_blob(db, content_hash, stored_filename, file_size)
         await db.commit()
-        await db.refresh(document)
+
         logger.info("Document created", document_id=str(document.id), user_id=str(user_id))
         return document
 
@@ -139,71 +170,240 @@ class DocumentService:
         return list(documents), total
 
     @staticmethod
-    async def check_duplicate_by_hash(
+    async def delete_document(
         db: AsyncSession,
-        file_hash: str,
+        document_id: UUID,
         user_id: UUID,
-    ) -> Optional[Document]:
+    ) -> bool:
         """
-        Проверка наличия документа с таким же хешем у пользователя.
+        Удаление документа.
 
         Args:
             db: Сессия БД
-            file_hash: SHA-256 хеш файла
+            document_id: ID документа
             user_id: ID пользователя
 
         Returns:
-            Существующий документ или None
+            True если документ удален, False если не найден
         """
+        document = await DocumentService.get_document_by_id(db, document_id, user_id)
+        if not document:
+            return False
+
+        await db.delete(document)
+        purge = await DocumentService._release_blob(db, document.content_hash, document.stored_filename)
+        await db.commit()
+        if purge:
+            await DocumentService._purge_blob(db, document.content_hash, document.stored_filename)
+        logger.info("Document deleted", document_id=str(document_id), user_id=str(user_id))
+        return True
+
+    @staticmethod
+    async def replace_document_content(
+        db: AsyncSession,
+        document: Document,
+        content_hash: str,
+        stored_filename: str,
+        file_content: bytes,
+    ) -> None:
+        """
+        Замена содержимого документа (например, после отложенной оптимизации).
+
+        Как и при загрузке, ссылка на новый блоб фиксируется в БД до записи
+        файла: параллельный _purge_blob того же содержимого либо уже удалил
+        файл и строку (и save_blob запишет файл заново), либо не найдет блоб
+        с нулевым счетчиком. Документ переключается на новый блоб только
+        после записи файла; если запись не удалась, ссылка освобождается и
+        документ остается со старым содержимым.
+
+        file_hash не меняется: повторная загрузка того же файла по-прежнему
+        распознается как дубликат, а результаты анализа переиспользуются по
+        исходным байтам.
+
+        Args:
+            db: Сессия БД
+            document: Документ
+            content_hash: SHA-256 хеш нового содержимого
+            stored_filename: Имя блоба с новым содержимым
+            file_content: Новое содержимое
+        """
+        await DocumentService._acquire_blob(db, content_hash, stored_filename, len(file_content))
+        await db.commit()
+        try:
+            await save_blob(stored_filename, file_content)
+        except Exception:
+            purge = await DocumentService._release_blob(db, content_hash, stored_filename)
+            await db.commit()
+            if purge:
+                await DocumentService._purge_blob(db, content_hash, stored_filename)
+            raise
+
+        old_hash, old_stored_filename = document.content_hash, document.stored_filename
+        document.content_hash = content_hash
+        document.stored_filename = stored_filename
+        document.file_size = len(file_content)
+        document.thumbnail_filename = None
+        purge = await DocumentService._release_blob(db, old_hash, old_stored_filename)
+        await db.commit()
+        if purge:
+            await DocumentService._purge_blob(db, old_hash, old_stored_filename)
+
+        logger.info(
+            "Document content replaced",
+            document_id=str(document.id),
+            old_content_hash=old_hash,
+            content_hash=content_hash,
+        )
+
+    @staticmethod
+    def _insert(db: AsyncSession, model):
+        """INSERT с поддержкой ON CONFLICT для диалекта текущей БД."""
+        if db.get_bind().dialect.name == "sqlite":
+            return sqlite.insert(model)
+        return postgresql.insert(model)
+
+    @staticmethod
+    async def _acquire_blob(
+        db: AsyncSession,
+        file_hash: str,
+        stored_filename: str,
+        file_size: int,
+    ) -> None:
+        """
+        Увеличение счетчика ссылок на блоб (создание записи при первой ссылке).
+
+        Args:
+            db: Сессия БД
+            file_hash: SHA-256 хеш файла
+            stored_filename: Имя блоба
+            file_size: Размер файла
+        """
+        stmt = DocumentService._insert(db, FileBlob).values(
+            file_hash=file_hash,
+            stored_filename=stored_filename,
+            file_size=file_size,
+            ref_count=1,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[FileBlob.file_hash],
+            set_={"ref_count": stmt.excluded.ref_count + FileBlob.ref_count},
+        )
+        await db.execute(stmt)
+
+    @staticmethod
+    async def _release_blob(db: AsyncSession, file_hash: str, stored_filename: str) -> bool:
+        """
+        Уменьшение счетчика ссылок на блоб.
+
+        Файлы здесь не удаляются: если транзакция откатится, документы
+        должны по-прежнему указывать на существующее содержимое. Освободивший
+        последнюю ссылку вызывает _purge_blob после коммита.
+
+        Args:
+            db: Сессия БД
+            file_hash: SHA-256 хеш файла
+            stored_filename: Имя сохраненного файла документа
+
+        Returns:
+            True, если после коммита нужно вызвать _purge_blob
+        """
+        if stored_filename != get_blob_filename(file_hash):
+            # Документ загружен до появления блобов - файл принадлежит только ему
+            return True
+
         result = await db.execute(
-            select(Document).where(
-                and_(
-                    Document.file_hash == file_hash,
-                    Document.user_id == user_id,
-                )
-            )
+            select(FileBlob)
+            .where(FileBlob.file_hash == file_hash)
+            .with_for_update()
         )
-        return result.scalar_one_or_none()
+        blob = result.scalar_one_or_none()
+        if blob is None:
+            return False
+
+        blob.ref_count -= 1
+        return blob.ref_count <= 0
 
     @staticmethod
-    async def delete_document(
+    async def _purge_blob(db: AsyncSession, file_hash: str, stored_filename: str) -> None:
+        """
+        Удаление файлов блоба, на который больше не ссылается ни один документ.
+
+        Вызывается после коммита, освободившего последнюю ссылку. Строка
+        блоба с нулевым счетчиком блокируется на время удаления файлов,
+        поэтому параллельная загрузка того же содержимого либо уже вернула
+        ссылку (и файлы остаются), либо дождется коммита и запишет файл заново.
+
+        Args:
+            db: Сессия БД
+            file_hash: SHA-256 хеш файла
+            stored_filename: Имя сохраненного файла документа
+        """
+        if stored_filename != get_blob_filename(file_hash):
+            await delete_file(stored_filename)
+            return
+
+        result = await db.execute(
+            select(FileBlob)
+            .where(FileBlob.file_hash == file_hash, FileBlob.ref_count <= 0)
+            .with_for_update()
+        )
+        blob = result.scalar_one_or_none()
+        if blob is None:
+            return
+
+        await delete_file(blob.stored_filename)
+        await delete_file(get_thumbnail_filename(file_hash))
+        await db.delete(blob)
+        await db.commit()
+
+    @staticmethod
+    async def update_document_status(
         db: AsyncSession,
         document_id: UUID,
-        user_id: UUID,
+        status: DocumentStatus,
     ) -> bool:
         """
-        Удаление документа.
+        Обновление статуса документа одним UPDATE (без SELECT и refresh).
+
+        Загруженный в сессию документ получает новый статус через
+        синхронизацию сессии.
 
         Args:
             db: Сессия БД
             document_id: ID документа
-            user_id: ID пользователя
+            status: Новый статус
 
         Returns:
-            True если документ удален, False если не найден
+            True, если документ найден
         """
-        document = await DocumentService.get_document_by_id(db, document_id, user_id)
-        if not document:
-            return False
-
-        await db.delete(document)
+        result = await db.execute(
+            update(Document).where(Document.id == document_id).values(status=status)
+        )
         await db.commit()
-        logger.info("Document deleted", document_id=str(document_id), user_id=str(user_id))
+        if not result.rowcount:
+            return False
+        logger.info("Document status updated", document_id=str(document_id), status=status.value)
         return True
 
     @staticmethod
-    async def update_document_status(
+    async def update_media_status(
         db: AsyncSession,
         document_id: UUID,
-        status: DocumentStatus,
+        media_status: MediaStatus,
+        page_count: Optional[int] = None,
+        media_metadata: Optional[Dict[str, Any]] = None,
+        thumbnail_filename: Optional[str] = None,
     ) -> Optional[Document]:
         """
-        Обновление статуса документа.
+        Обновление этапа фоновой обработки файла и ее результатов.
 
         Args:
             db: Сессия БД
             document_id: ID документа
-            status: Новый статус
+            media_status: Новый этап обработки
+            page_count: Количество страниц (None - не изменять)
+            media_metadata: Метаданные файла (None - не изменять)
+            thumbnail_filename: Имя превью в хранилище (None - не изменять)
 
         Returns:
             Обновленный документ или None
@@ -212,13 +412,14 @@ class DocumentService:
         if not document:
             return None
 
-        document.status = status
+        document.media_status = media_status
+        if page_count is not None:
+            document.page_count = page_count
+        if media_metadata is not None:
+            document.media_metadata = media_metadata
+        if thumbnail_filename is not None:
+            document.thumbnail_filename = thumbnail_filename
         await db.commit()
         await db.refresh(document)
-        logger.info("Document status updated", document_id=str(document_id), status=status.value)
+        logger.info("Document media status updated", document_id=str(document_id), media_status=media_status.value)
         return document
-
-
-
-
-
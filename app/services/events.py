@@ -0,0 +1,82 @@
+"""
+Доменные события и их диспетчеризация внутри процесса.
+
+Публикаторы (callback NLP-сервиса, Celery задачи, endpoints) сообщают о
+смене состояния, не зная, кто на нее реагирует; подписчики (инвалидация
+кеша и т.п.) регистрируются отдельно.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Type, TypeVar
+from uuid import UUID
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class DomainEvent:
+    """Базовый класс доменного события."""
+
+    user_id: UUID
+    occurred_at: datetime = field(default_factory=datetime.utcnow, kw_only=True)
+
+
+@dataclass(frozen=True)
+class ReportStatusChanged(DomainEvent):
+    """Отчет создан или сменил статус (вместе с ним меняется статус документа)."""
+
+    report_id: UUID
+    document_id: UUID
+    status: str
+    error_message: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class DocumentDeleted(DomainEvent):
+    """Документ удален вместе с его отчетами."""
+
+    document_id: UUID
+    report_ids: Tuple[UUID, ...] = ()
+
+
+EventT = TypeVar("EventT", bound=DomainEvent)
+EventHandler = Callable[[EventT], Awaitable[None]]
+
+_handlers: Dict[Type[DomainEvent], List[EventHandler]] = {}
+
+
+def subscribe(event_type: Type[EventT], handler: EventHandler) -> None:
+    """
+    Подписка обработчика на тип события (повторная подписка игнорируется).
+
+    Args:
+        event_type: Класс события
+        handler: Асинхронный обработчик
+    """
+    handlers = _handlers.setdefault(event_type, [])
+    if handler not in handlers:
+        handlers.append(handler)
+
+
+async def publish(event: DomainEvent) -> None:
+    """
+    Публикация события всем подписчикам.
+
+    Ошибки подписчиков логируются и не прерывают публикатора: событие
+    публикуется после коммита, и откатывать уже сохраненное состояние нельзя.
+
+    Args:
+        event: Событие
+    """
+    for handler in _handlers.get(type(event), []):
+        try:
+            await handler(event)
+        except Exception as e:
+            logger.warning(
+                "Error handling domain event",
+                event_type=type(event).__name__,
+                handler=getattr(handler, "__name__", repr(handler)),
+                error=str(e),
+            )
@@ -9,10 +9,17 @@ from datetime import datetime
 from app.core.config import settings
 from app.core.logging import get_logger
 from app.schemas.nlp import NLPRequest, NLPCallbackRequest
+from app.services.storage import get_storage
+from app.utils.tracing import SPAN_KIND_CLIENT, inject_traceparent, save_trace_context, trace_span
 
 logger = get_logger(__name__)
 
 
+def nlp_trace_context_name(request_id: UUID) -> str:
+    """Имя сохраненного контекста трассы отправки документа на анализ."""
+    return f"nlp:{request_id}"
+
+
 class NLPService:
     """Сервис для взаимодействия с NLP-сервисом."""
 
@@ -57,30 +64,39 @@ class NLPService:
         url = f"{settings.NLP_SERVICE_URL}/api/analyze"
 
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                logger.info(
-                    "Sending document to NLP service",
-                    request_id=str(request_id),
-                    document_id=str(document_id),
-                    url=url,
-                )
-
-                response = await client.post(
-                    url,
-                    json=request_data.model_dump(),
-                    headers=headers,
-                )
-
-                response.raise_for_status()
-                result = response.json()
-
-                logger.info(
-                    "Document sent to NLP service successfully",
-                    request_id=str(request_id),
-                    status_code=response.status_code,
-                )
-
-                return result
+            with trace_span(
+                "POST /api/analyze",
+                SPAN_KIND_CLIENT,
+                attributes={"http.method": "POST", "http.url": url, "nlp.request_id": str(request_id)},
+            ):
+                # Трасса продолжается в NLP-сервисе и в callback по request_id
+                inject_traceparent(headers)
+                await save_trace_context(nlp_trace_context_name(request_id))
+
+                async with httpx.AsyncClient(timeout=30.0) as client:
+                    logger.info(
+                        "Sending document to NLP service",
+                        request_id=str(request_id),
+                        document_id=str(document_id),
+                        url=url,
+                    )
+
+                    response = await client.post(
+                        url,
+                        json=request_data.model_dump(),
+                        headers=headers,
+                    )
+
+                    response.raise_for_status()
+                    result = response.json()
+
+                    logger.info(
+                        "Document sent to NLP service successfully",
+                        request_id=str(request_id),
+                        status_code=response.status_code,
+                    )
+
+                    return result
 
         except httpx.TimeoutException as e:
             logger.error(
@@ -140,19 +156,14 @@ class NLPService:
         """
         Построение URL файла для отправки в NLP-сервис.
 
+        NLP-сервис скачивает файл по подписанной ссылке напрямую из
+        хранилища, минуя endpoint /download и API-поды.
+
         Args:
             document_id: ID документа
             stored_filename: Имя сохраненного файла
 
         Returns:
-            URL файла
+            Подписанный URL файла
         """
-        # В production это должен быть URL к файлу в объектном хранилище (S3 и т.д.)
-        # Пока используем локальный URL
-        base_url = settings.BACKEND_URL.rstrip("/")
-        return f"{base_url}/api/v1/documents/{document_id}/download"
-
-
-
-
-
+        return get_storage().presign(stored_filename)
@@ -0,0 +1,165 @@
+"""
+Уведомления клиентов о смене статуса отчетов через Redis pub/sub.
+
+Публикаторы (API и Celery воркеры) отправляют сообщение в канал
+пользователя events:user:<id>. В каждом процессе API одна подписка на все
+каналы раздает сообщения открытым потокам (SSE) соответствующего пользователя.
+"""
+import asyncio
+import json
+from typing import Dict, Optional, Set
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.core.logging import get_logger
+from app.services.events import ReportStatusChanged, subscribe
+
+logger = get_logger(__name__)
+
+# Префикс каналов пользователей
+CHANNEL_PREFIX = "events:user:"
+
+# Максимальное количество неотправленных сообщений на поток
+QUEUE_SIZE = 100
+
+
+async def publish_user_event(user_id: UUID, event_type: str, payload: dict) -> None:
+    """
+    Отправка сообщения в канал пользователя.
+
+    Args:
+        user_id: ID пользователя
+        event_type: Тип события (имя события SSE)
+        payload: Данные события
+    """
+    redis = await get_redis()
+    message = json.dumps({"type": event_type, **payload}, default=str)
+    await redis.publish(f"{CHANNEL_PREFIX}{user_id}", message)
+
+
+async def on_report_status_changed(event: ReportStatusChanged) -> None:
+    """
+    Уведомление пользователя о смене статуса отчета.
+
+    Args:
+        event: Событие смены статуса отчета
+    """
+    await publish_user_event(
+        event.user_id,
+        "report_status",
+        {
+            "report_id": event.report_id,
+            "document_id": event.document_id,
+            "status": event.status,
+            "error_message": event.error_message,
+            "occurred_at": event.occurred_at.isoformat(),
+        },
+    )
+
+
+def register_status_notifications() -> None:
+    """Подписка уведомлений клиентов на доменные события."""
+    subscribe(ReportStatusChanged, on_report_status_changed)
+
+
+class EventHub:
+    """Раздача сообщений из Redis открытым потокам пользователей процесса."""
+
+    def __init__(self):
+        self._queues: Dict[str, Set[asyncio.Queue]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, user_id: UUID) -> asyncio.Queue:
+        """
+        Регистрация потока пользователя.
+
+        Args:
+            user_id: ID пользователя
+
+        Returns:
+            Очередь сообщений (JSON строки)
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen())
+        queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._queues.setdefault(str(user_id), set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: UUID, queue: asyncio.Queue) -> None:
+        """
+        Отключение потока пользователя.
+
+        Args:
+            user_id: ID пользователя
+            queue: Очередь потока
+        """
+        queues = self._queues.get(str(user_id))
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._queues[str(user_id)]
+
+    def dispatch(self, channel: str, message: str) -> None:
+        """Передача сообщения из канала потокам пользователя."""
+        user_id = channel[len(CHANNEL_PREFIX):]
+        for queue in self._queues.get(user_id, ()):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Клиент не успевает читать - он получит актуальный статус при переподключении
+                logger.warning("Event stream queue is full, dropping message", user_id=user_id)
+
+    async def _listen(self) -> None:
+        """Подписка на каналы всех пользователей с переподключением."""
+        while True:
+            pubsub = None
+            try:
+                redis = await get_redis()
+                pubsub = redis.pubsub()
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                async for message in pubsub.listen():
+                    if message.get("type") == "pmessage":
+                        self.dispatch(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Event hub listener error", error=str(e))
+                await asyncio.sleep(1)
+            finally:
+                if pubsub is not None:
+                    await pubsub.close()
+
+    async def stop(self) -> None:
+        """Остановка подписки."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Глобальный экземпляр для процесса API
+event_hub = EventHub()
+
+
+def format_sse(message: str) -> str:
+    """
+    Форматирование сообщения как события Server-Sent Events.
+
+    Args:
+        message: JSON сообщения с полем type
+
+    Returns:
+        Блок SSE
+    """
+    event_type = json.loads(message).get("type", "message")
+    return f"event: {event_type}\ndata: {message}\n\n"
+
+
+def heartbeat_interval() -> float:
+    """Интервал комментариев keep-alive в потоке (для прокси и балансировщиков)."""
+    return float(settings.EVENTS_HEARTBEAT_SECONDS)
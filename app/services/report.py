@@ -2,19 +2,28 @@
 Сервис для работы с отчетами об аудите.
 """
 from uuid import UUID
-from typing import Optional, List, Tuple
+from typing import Dict, Optional, List, Tuple
 from datetime import datetime
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, or_, desc, asc
+from sqlalchemy import select, func, and_, or_, desc, asc, insert
 from sqlalchemy.orm import selectinload, joinedload
 
 from app.models.audit_report import AuditReport, AuditReportStatus
 from app.models.violation import Violation, RiskLevel
 from app.models.analysis_summary import AnalysisSummary
-from app.models.document import Document
+from app.models.document import Document, DocumentStatus
 from app.schemas.report import ReportFilterParams, ViolationFilterParams
+from app.services.document import DocumentService
+from app.services.events import ReportStatusChanged, publish
+from app.core.config import settings
 from app.core.logging import get_logger
+from app.utils.metrics import (
+    analysis_dispatch_seconds,
+    analysis_nlp_turnaround_seconds,
+    analysis_queue_wait_seconds,
+    analysis_total_duration_seconds,
+)
 
 logger = get_logger(__name__)
 
@@ -43,14 +52,222 @@ class ReportService:
             document_id=document_id,
             request_id=request_id,
             status=AuditReportStatus.PENDING,
+            nlp_model_version=settings.NLP_MODEL_VERSION,
+            ruleset_version=settings.NLP_RULESET_VERSION,
         )
 
         db.add(audit_report)
         await db.commit()
         await db.refresh(audit_report)
         logger.info("Audit report created", audit_report_id=str(audit_report.id), document_id=str(document_id))
+        await ReportService.publish_status_change(db, audit_report)
         return audit_report
 
+    @staticmethod
+    async def publish_status_change(db: AsyncSession, audit_report: AuditReport) -> None:
+        """
+        Публикация события смены статуса отчета.
+
+        Вызывается после коммита, чтобы подписчики (инвалидация кеша,
+        уведомления клиентов) видели уже сохраненное состояние.
+
+        Args:
+            db: Сессия БД
+            audit_report: Отчет с новым статусом
+        """
+        user_id = await db.scalar(
+            select(Document.user_id).where(Document.id == audit_report.document_id)
+        )
+        if user_id is None:
+            return
+
+        await publish(
+            ReportStatusChanged(
+                user_id=user_id,
+                report_id=audit_report.id,
+                document_id=audit_report.document_id,
+                status=audit_report.status.value,
+                error_message=audit_report.error_message,
+            )
+        )
+
+    @staticmethod
+    def mark_processing_started(audit_report: AuditReport) -> None:
+        """
+        Отметка начала обработки задачей и учет ожидания в очереди.
+
+        Повторные попытки задачи время начала не меняют: ожидание
+        считается от запроса анализа до первого запуска.
+
+        Args:
+            audit_report: Отчет (изменения сохраняет вызывающий код)
+        """
+        if audit_report.processing_started_at is not None:
+            return
+        now = datetime.utcnow()
+        audit_report.processing_started_at = now
+        analysis_queue_wait_seconds.observe(max((now - audit_report.created_at).total_seconds(), 0.0))
+
+    @staticmethod
+    def mark_dispatched(audit_report: AuditReport) -> None:
+        """
+        Отметка подтверждения приема документа NLP-сервисом.
+
+        Args:
+            audit_report: Отчет (изменения сохраняет вызывающий код)
+        """
+        now = datetime.utcnow()
+        audit_report.nlp_dispatched_at = now
+        if audit_report.processing_started_at is not None:
+            analysis_dispatch_seconds.observe(
+                max((now - audit_report.processing_started_at).total_seconds(), 0.0)
+            )
+
+    @staticmethod
+    def mark_finished(
+        audit_report: AuditReport,
+        status: AuditReportStatus,
+        error_message: Optional[str] = None,
+    ) -> None:
+        """
+        Завершение обработки: итоговый статус, время и длительность этапов.
+
+        processing_duration_seconds - время от начала задачи до итогового
+        статуса.
+
+        Args:
+            audit_report: Отчет (изменения сохраняет вызывающий код)
+            status: COMPLETED или FAILED
+            error_message: Сообщение об ошибке
+        """
+        now = datetime.utcnow()
+        audit_report.status = status
+        audit_report.completed_at = now
+        if error_message is not None:
+            audit_report.error_message = error_message
+        if audit_report.processing_started_at is not None:
+            audit_report.processing_duration_seconds = round(
+                max((now - audit_report.processing_started_at).total_seconds(), 0.0)
+            )
+        if audit_report.nlp_dispatched_at is not None:
+            analysis_nlp_turnaround_seconds.labels(status=status.value).observe(
+                max((now - audit_report.nlp_dispatched_at).total_seconds(), 0.0)
+            )
+        if audit_report.created_at is not None:
+            analysis_total_duration_seconds.labels(status=status.value).observe(
+                max((now - audit_report.created_at).total_seconds(), 0.0)
+            )
+
+    @staticmethod
+    async def find_reusable_report(
+        db: AsyncSession,
+        file_hash: str,
+    ) -> Optional[AuditReport]:
+        """
+        Поиск завершенного отчета для документа с таким же содержимым.
+
+        Результат считается переиспользуемым, только если он получен на
+        текущих версиях NLP-модели и набора правил.
+
+        Args:
+            db: Сессия БД
+            file_hash: SHA-256 хеш файла
+
+        Returns:
+            Последний подходящий отчет или None
+        """
+        result = await db.execute(
+            select(AuditReport)
+            .join(Document)
+            .where(
+                and_(
+                    Document.file_hash == file_hash,
+                    AuditReport.status == AuditReportStatus.COMPLETED,
+                    AuditReport.nlp_model_version == settings.NLP_MODEL_VERSION,
+                    AuditReport.ruleset_version == settings.NLP_RULESET_VERSION,
+                )
+            )
+            .options(
+                selectinload(AuditReport.violations),
+                selectinload(AuditReport.analysis_summary),
+            )
+            .order_by(AuditReport.completed_at.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def clone_analysis_results(
+        db: AsyncSession,
+        source_report: AuditReport,
+        target_report: AuditReport,
+    ) -> AuditReport:
+        """
+        Копирование результатов анализа из другого отчета без обращения к NLP-сервису.
+
+        Args:
+            db: Сессия БД
+            source_report: Завершенный отчет-источник (с загруженными нарушениями и сводкой)
+            target_report: Новый отчет
+
+        Returns:
+            Заполненный отчет
+        """
+        if source_report.violations:
+            await db.execute(
+                insert(Violation),
+                [
+                    {
+                        "audit_report_id": target_report.id,
+                        "code": v.code,
+                        "description": v.description,
+                        "risk_level": v.risk_level,
+                        "regulation_reference": v.regulation_reference,
+                        "context": v.context,
+                        "offset_start": v.offset_start,
+                        "offset_end": v.offset_end,
+                    }
+                    for v in source_report.violations
+                ],
+            )
+
+        summary = source_report.analysis_summary
+        if summary:
+            db.add(
+                AnalysisSummary(
+                    audit_report_id=target_report.id,
+                    total_risks=summary.total_risks,
+                    critical_count=summary.critical_count,
+                    high_count=summary.high_count,
+                    medium_count=summary.medium_count,
+                    low_count=summary.low_count,
+                    compliance_score=summary.compliance_score,
+                )
+            )
+
+        now = datetime.utcnow()
+        target_report.status = AuditReportStatus.COMPLETED
+        target_report.cloned_from_report_id = source_report.id
+        target_report.nlp_model_version = source_report.nlp_model_version
+        target_report.ruleset_version = source_report.ruleset_version
+        target_report.processing_started_at = now
+        target_report.completed_at = now
+        target_report.processing_duration_seconds = 0
+
+        await DocumentService.update_document_status(
+            db, target_report.document_id, DocumentStatus.COMPLETED
+        )
+
+        await db.commit()
+        logger.info(
+            "Analysis results reused",
+            audit_report_id=str(target_report.id),
+            source_report_id=str(source_report.id),
+            violations_count=len(source_report.violations),
+        )
+        await ReportService.publish_status_change(db, target_report)
+        return target_report
+
     @staticmethod
     async def get_report_by_id(
         db: AsyncSession,
@@ -86,6 +303,21 @@ class ReportService:
         result = await db.execute(query)
         return result.scalar_one_or_none()
 
+    @staticmethod
+    async def get_report_ids(db: AsyncSession, document_id: UUID) -> List[UUID]:
+        """
+        ID отчетов документа.
+
+        Args:
+            db: Сессия БД
+            document_id: ID документа
+
+        Returns:
+            Список ID отчетов
+        """
+        result = await db.execute(select(AuditReport.id).where(AuditReport.document_id == document_id))
+        return list(result.scalars().all())
+
     @staticmethod
     async def get_reports_by_user(
         db: AsyncSession,
@@ -189,6 +421,27 @@ class ReportService:
 
         return list(reports), total
 
+    @staticmethod
+    async def get_violation_counts(db: AsyncSession, report_ids: List[UUID]) -> Dict[UUID, int]:
+        """
+        Количество нарушений отчетов одним запросом (вместо загрузки нарушений каждого отчета).
+
+        Args:
+            db: Сессия БД
+            report_ids: ID отчетов
+
+        Returns:
+            Словарь ID отчета -> количество нарушений (отчеты без нарушений отсутствуют)
+        """
+        if not report_ids:
+            return {}
+        result = await db.execute(
+            select(Violation.audit_report_id, func.count(Violation.id))
+            .where(Violation.audit_report_id.in_(report_ids))
+            .group_by(Violation.audit_report_id)
+        )
+        return dict(result.all())
+
     @staticmethod
     async def get_violations_by_report(
         db: AsyncSession,
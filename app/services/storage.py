@@ -0,0 +1,386 @@
+"""
+Бэкенды хранилища файлов (локальный диск и S3-совместимое хранилище).
+"""
+import hashlib
+import hmac
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Optional
+from urllib.parse import quote, urlencode, urlsplit
+
+import aiofiles
+import aiofiles.os
+import httpx
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.utils.download import content_disposition
+
+logger = get_logger(__name__)
+
+# Размер блока при потоковом чтении и записи
+CHUNK_SIZE = 64 * 1024
+
+
+class StorageBackend(ABC):
+    """Интерфейс хранилища файлов. Ключ - относительное имя файла (stored_filename)."""
+
+    @abstractmethod
+    async def put_stream(
+        self,
+        key: str,
+        stream: AsyncIterator[bytes],
+        content_length: Optional[int] = None,
+    ) -> None:
+        """Атомарная запись файла из потока."""
+
+    @abstractmethod
+    async def get_stream(self, key: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Потоковое чтение файла."""
+
+    @abstractmethod
+    async def read_range(self, key: str, start: int, end: int) -> bytes:
+        """Чтение диапазона байт [start, end] включительно."""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Проверка существования файла."""
+
+    @abstractmethod
+    async def size(self, key: str) -> Optional[int]:
+        """Размер файла в байтах или None, если файла нет."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Удаление файла (отсутствующий файл не считается ошибкой)."""
+
+    @abstractmethod
+    def presign(
+        self,
+        key: str,
+        expires_in: Optional[int] = None,
+        filename: Optional[str] = None,
+    ) -> str:
+        """Подписанная ссылка для чтения файла без аутентификации."""
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Путь в локальной файловой системе, если бэкенд его поддерживает."""
+        return None
+
+
+class LocalStorageBackend(StorageBackend):
+    """Хранилище на локальном диске."""
+
+    def __init__(self, root: str, base_url: str, secret_key: str):
+        """
+        Инициализация хранилища.
+
+        Args:
+            root: Корневой каталог хранилища
+            base_url: URL бэкенда для подписанных ссылок
+            secret_key: Ключ для подписи ссылок
+        """
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+        self.secret_key = secret_key
+
+    def local_path(self, key: str) -> str:
+        """Путь к файлу с защитой от выхода за пределы хранилища."""
+        root = self.root.resolve()
+        path = (root / key).resolve()
+        if root not in path.parents:
+            raise ValueError(f"Недопустимый ключ хранилища: {key}")
+        return str(path)
+
+    async def put_stream(
+        self,
+        key: str,
+        stream: AsyncIterator[bytes],
+        content_length: Optional[int] = None,
+    ) -> None:
+        file_path = self.local_path(key)
+        Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+
+        # Запись во временный файл рядом с целевым и атомарный перенос
+        tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                async for chunk in stream:
+                    await f.write(chunk)
+            await aiofiles.os.replace(tmp_path, file_path)
+        except Exception:
+            await self._remove(tmp_path)
+            raise
+
+    async def get_stream(self, key: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        async with aiofiles.open(self.local_path(key), "rb") as f:
+            while chunk := await f.read(chunk_size):
+                yield chunk
+
+    async def read_range(self, key: str, start: int, end: int) -> bytes:
+        async with aiofiles.open(self.local_path(key), "rb") as f:
+            await f.seek(start)
+            return await f.read(end - start + 1)
+
+    async def exists(self, key: str) -> bool:
+        return await aiofiles.os.path.exists(self.local_path(key))
+
+    async def size(self, key: str) -> Optional[int]:
+        try:
+            return (await aiofiles.os.stat(self.local_path(key))).st_size
+        except FileNotFoundError:
+            return None
+
+    async def delete(self, key: str) -> None:
+        await self._remove(self.local_path(key))
+
+    def presign(
+        self,
+        key: str,
+        expires_in: Optional[int] = None,
+        filename: Optional[str] = None,
+    ) -> str:
+        expires = int(time.time()) + (expires_in or settings.STORAGE_PRESIGN_EXPIRE_SECONDS)
+        query = {"expires": expires, "signature": self.sign(key, expires)}
+        return f"{self.base_url}/api/v1/files/{quote(key)}?{urlencode(query)}"
+
+    def sign(self, key: str, expires: int) -> str:
+        """Подпись ключа и времени истечения ссылки."""
+        message = f"{key}:{expires}".encode()
+        return hmac.new(self.secret_key.encode(), message, hashlib.sha256).hexdigest()
+
+    def verify_signature(self, key: str, expires: int, signature: str) -> bool:
+        """Проверка подписанной ссылки."""
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(self.sign(key, expires), signature)
+
+    @staticmethod
+    async def _remove(path: str) -> None:
+        try:
+            await aiofiles.os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class S3StorageBackend(StorageBackend):
+    """S3-совместимое хранилище (AWS S3, MinIO) с path-style адресацией и подписью SigV4."""
+
+    UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+
+    def __init__(
+        self,
+        endpoint_url: str,
+        bucket: str,
+        access_key: str,
+        secret_key: str,
+        region: str = "us-east-1",
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        """
+        Инициализация хранилища.
+
+        Args:
+            endpoint_url: URL S3-совместимого хранилища
+            bucket: Имя бакета
+            access_key: Ключ доступа
+            secret_key: Секретный ключ
+            region: Регион
+            transport: Транспорт httpx (для тестов)
+        """
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.transport = transport
+
+    def _client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=self.transport, timeout=60.0)
+
+    def _object_path(self, key: str) -> str:
+        return "/" + "/".join(quote(part, safe="-_.~") for part in f"{self.bucket}/{key}".split("/"))
+
+    def _presign_request(
+        self,
+        method: str,
+        key: str,
+        expires_in: int,
+        extra_query: Optional[dict] = None,
+        now: Optional[datetime] = None,
+    ) -> str:
+        return presign_s3_url(
+            method=method,
+            endpoint_url=self.endpoint_url,
+            path=self._object_path(key),
+            access_key=self.access_key,
+            secret_key=self.secret_key,
+            region=self.region,
+            expires_in=expires_in,
+            extra_query=extra_query,
+            now=now,
+        )
+
+    async def put_stream(
+        self,
+        key: str,
+        stream: AsyncIterator[bytes],
+        content_length: Optional[int] = None,
+    ) -> None:
+        headers = {}
+        if content_length is not None:
+            headers["Content-Length"] = str(content_length)
+        url = self._presign_request("PUT", key, expires_in=900)
+        async with self._client() as client:
+            response = await client.put(url, content=stream, headers=headers)
+            response.raise_for_status()
+
+    async def get_stream(self, key: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        url = self._presign_request("GET", key, expires_in=900)
+        async with self._client() as client:
+            async with client.stream("GET", url) as response:
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes(chunk_size):
+                    yield chunk
+
+    async def read_range(self, key: str, start: int, end: int) -> bytes:
+        url = self._presign_request("GET", key, expires_in=900)
+        async with self._client() as client:
+            response = await client.get(url, headers={"Range": f"bytes={start}-{end}"})
+            response.raise_for_status()
+            return response.content
+
+    async def exists(self, key: str) -> bool:
+        return await self.size(key) is not None
+
+    async def size(self, key: str) -> Optional[int]:
+        url = self._presign_request("HEAD", key, expires_in=900)
+        async with self._client() as client:
+            response = await client.head(url)
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            return int(response.headers.get("Content-Length", 0))
+
+    async def delete(self, key: str) -> None:
+        url = self._presign_request("DELETE", key, expires_in=900)
+        async with self._client() as client:
+            response = await client.delete(url)
+            if response.status_code != 404:
+                response.raise_for_status()
+
+    def presign(
+        self,
+        key: str,
+        expires_in: Optional[int] = None,
+        filename: Optional[str] = None,
+    ) -> str:
+        extra_query = None
+        if filename:
+            extra_query = {"response-content-disposition": content_disposition(filename)}
+        return self._presign_request(
+            "GET",
+            key,
+            expires_in=expires_in or settings.STORAGE_PRESIGN_EXPIRE_SECONDS,
+            extra_query=extra_query,
+        )
+
+
+def _hmac_sha256(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode(), hashlib.sha256).digest()
+
+
+def presign_s3_url(
+    method: str,
+    endpoint_url: str,
+    path: str,
+    access_key: str,
+    secret_key: str,
+    region: str,
+    expires_in: int,
+    extra_query: Optional[dict] = None,
+    now: Optional[datetime] = None,
+) -> str:
+    """
+    Построение подписанной ссылки S3 (AWS Signature Version 4, query string).
+
+    Args:
+        method: HTTP метод
+        endpoint_url: URL хранилища (схема и хост)
+        path: Путь объекта (уже URI-кодированный)
+        access_key: Ключ доступа
+        secret_key: Секретный ключ
+        region: Регион
+        expires_in: Время жизни ссылки в секундах
+        extra_query: Дополнительные параметры запроса
+        now: Время подписи (для тестов)
+
+    Returns:
+        Подписанный URL
+    """
+    now = now or datetime.utcnow()
+    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+    date_stamp = now.strftime("%Y%m%d")
+    host = urlsplit(endpoint_url).netloc
+    scope = f"{date_stamp}/{region}/s3/aws4_request"
+
+    query = {
+        "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+        "X-Amz-Credential": f"{access_key}/{scope}",
+        "X-Amz-Date": amz_date,
+        "X-Amz-Expires": str(expires_in),
+        "X-Amz-SignedHeaders": "host",
+        **(extra_query or {}),
+    }
+    canonical_query = "&".join(
+        f"{quote(k, safe='-_.~')}={quote(str(v), safe='-_.~')}" for k, v in sorted(query.items())
+    )
+    canonical_request = "\n".join([
+        method,
+        path,
+        canonical_query,
+        f"host:{host}\n",
+        "host",
+        S3StorageBackend.UNSIGNED_PAYLOAD,
+    ])
+    string_to_sign = "\n".join([
+        "AWS4-HMAC-SHA256",
+        amz_date,
+        scope,
+        hashlib.sha256(canonical_request.encode()).hexdigest(),
+    ])
+
+    signing_key = _hmac_sha256(f"AWS4{secret_key}".encode(), date_stamp)
+    for part in (region, "s3", "aws4_request"):
+        signing_key = _hmac_sha256(signing_key, part)
+    signature = hmac.new(signing_key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+    return f"{endpoint_url.rstrip('/')}{path}?{canonical_query}&X-Amz-Signature={signature}"
+
+
+# Глобальный экземпляр хранилища
+storage_backend: StorageBackend | None = None
+
+
+def get_storage() -> StorageBackend:
+    """Получить бэкенд хранилища, настроенный в STORAGE_BACKEND."""
+    global storage_backend
+    if storage_backend is None:
+        if settings.STORAGE_BACKEND == "s3":
+            storage_backend = S3StorageBackend(
+                endpoint_url=settings.S3_ENDPOINT_URL,
+                bucket=settings.S3_BUCKET,
+                access_key=settings.S3_ACCESS_KEY,
+                secret_key=settings.S3_SECRET_KEY,
+                region=settings.S3_REGION,
+            )
+        else:
+            storage_backend = LocalStorageBackend(
+                root=settings.FILE_STORAGE_PATH,
+                base_url=settings.BACKEND_URL,
+                secret_key=settings.SECRET_KEY,
+            )
+    return storage_backend
@@ -0,0 +1,40 @@
+"""
+Общие ресурсы Celery задач.
+"""
+import asyncio
+from typing import Any, Coroutine
+
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.services.cache_invalidation import register_cache_invalidation
+from app.services.notifications import register_status_notifications
+from app.utils.instrumentation import instrument_engine, register_report_metrics
+
+# Создание async движка для Celery задач
+db_engine = create_async_engine(settings.DATABASE_URL, echo=False)
+SessionLocal = async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+instrument_engine(db_engine)
+
+# Задачи публикуют доменные события - кеш API сбрасывается и клиенты
+# получают уведомления и из воркера
+register_cache_invalidation()
+register_status_notifications()
+register_report_metrics()
+
+
+def run_async(coro: Coroutine[Any, Any, Any]) -> Any:
+    """
+    Выполнение корутины в event loop процесса Celery worker.
+
+    Args:
+        coro: Корутина
+
+    Returns:
+        Результат корутины
+    """
+    loop = asyncio.get_event_loop()
+    if loop.is_closed():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+    return loop.run_until_complete(coro)
@@ -0,0 +1,333 @@
+"""
+Celery задачи для обработки загруженных файлов.
+
+Конвейер запускается после ответа на загрузку и выполняется цепочкой шагов:
+оптимизация изображения, извлечение метаданных, построение превью и
+завершение (с необязательным предварительным запуском NLP-анализа).
+Текущий шаг отражается в поле media_status документа.
+"""
+from typing import Any, Awaitable, Callable, Optional
+from uuid import UUID, uuid4
+
+from celery import chain
+from celery.exceptions import Ignore
+from celery.result import AsyncResult
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.celery_app import celery_app
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.models.audit_report import AuditReport, AuditReportStatus
+from app.models.document import Document, DocumentStatus, MediaStatus
+from app.services.cache import CacheService
+from app.services.document import DocumentService
+from app.services.report import ReportService
+from app.tasks.base import SessionLocal, run_async
+from app.tasks.nlp_tasks import process_document_with_nlp
+from app.utils.file import (
+    read_file,
+    save_blob,
+    calculate_file_hash,
+    get_blob_filename,
+    get_thumbnail_filename,
+)
+from app.utils.image_optimizer import needs_optimization, optimize_image_sync
+from app.utils.media import extract_metadata, generate_thumbnail
+
+logger = get_logger(__name__)
+
+# Типы файлов, для которых выполняется оптимизация
+OPTIMIZABLE_MIME_TYPES = ("image/jpeg", "image/png")
+
+
+class DocumentNotFoundError(Exception):
+    """Документ удален до завершения конвейера."""
+
+
+def _run_step(task, step: Callable[[UUID], Awaitable[dict]], document_id: str) -> dict:
+    """
+    Выполнение шага конвейера с повторными попытками.
+
+    Удаленный документ - не временная ошибка: шаг завершается без повторов,
+    оставшиеся шаги цепочки и обработчик ошибки не запускаются.
+
+    Args:
+        task: Экземпляр задачи Celery (bind=True)
+        step: Асинхронная функция шага
+        document_id: UUID документа в виде строки
+
+    Returns:
+        Результат шага
+    """
+    try:
+        return run_async(step(UUID(document_id)))
+    except DocumentNotFoundError:
+        logger.info("Document deleted, media processing stopped", task=task.name, document_id=document_id)
+        raise Ignore()
+    except Exception as exc:
+        logger.error(
+            "Error processing document media",
+            task=task.name,
+            document_id=document_id,
+            error=str(exc),
+            exc_info=True,
+        )
+        raise task.retry(exc=exc, countdown=2 ** task.request.retries)
+
+
+async def _get_document(db: AsyncSession, document_id: UUID) -> Document:
+    """Получение документа или ошибка, если он удален."""
+    document = await DocumentService.get_document_by_id(db, document_id)
+    if not document:
+        raise DocumentNotFoundError(f"Документ {document_id} не найден")
+    return document
+
+
+async def _set_media_status(
+    db: AsyncSession,
+    document: Document,
+    media_status: MediaStatus,
+    **fields: Any,
+) -> None:
+    """Обновление этапа обработки и сброс кеша документа."""
+    await DocumentService.update_media_status(db, document.id, media_status, **fields)
+    await CacheService.delete(f"document:{document.id}:user:{document.user_id}")
+    await CacheService.bump_generation(f"documents:user:{document.user_id}")
+
+
+@celery_app.task(
+    bind=True,
+    name="optimize_document_image",
+    max_retries=3,
+    default_retry_delay=60,
+)
+def optimize_document_image(self, document_id: str) -> dict:
+    """
+    Отложенная оптимизация изображения документа.
+
+    Args:
+        document_id: UUID документа в виде строки
+
+    Returns:
+        Результат обработки
+    """
+    return _run_step(self, _optimize_document_image_async, document_id)
+
+
+async def _optimize_document_image_async(document_id: UUID) -> dict:
+    """Асинхронная часть оптимизации изображения."""
+    async with SessionLocal() as db:
+        document = await _get_document(db, document_id)
+
+        if document.mime_type not in OPTIMIZABLE_MIME_TYPES:
+            return {"status": "skipped", "document_id": str(document_id)}
+
+        await _set_media_status(db, document, MediaStatus.OPTIMIZING)
+
+        file_content = await read_file(document.stored_filename)
+        if not needs_optimization(file_content):
+            return {"status": "skipped", "document_id": str(document_id)}
+
+        # Задача уже выполняется вне event loop API, пул процессов не нужен
+        optimized_content = optimize_image_sync(file_content)
+        if len(optimized_content) >= len(file_content):
+            return {"status": "skipped", "document_id": str(document_id)}
+
+        content_hash = await calculate_file_hash(optimized_content)
+        stored_filename = get_blob_filename(content_hash)
+        await DocumentService.replace_document_content(
+            db, document, content_hash, stored_filename, optimized_content
+        )
+
+        logger.info(
+            "Document image optimized",
+            document_id=str(document_id),
+            original_size=len(file_content),
+            optimized_size=len(optimized_content),
+        )
+        return {"status": "optimized", "document_id": str(document_id)}
+
+
+@celery_app.task(
+    bind=True,
+    name="extract_document_metadata",
+    max_retries=3,
+    default_retry_delay=60,
+)
+def extract_document_metadata(self, document_id: str) -> dict:
+    """
+    Извлечение количества страниц и метаданных документа.
+
+    Args:
+        document_id: UUID документа в виде строки
+
+    Returns:
+        Результат обработки
+    """
+    return _run_step(self, _extract_document_metadata_async, document_id)
+
+
+async def _extract_document_metadata_async(document_id: UUID) -> dict:
+    """Асинхронная часть извлечения метаданных."""
+    async with SessionLocal() as db:
+        document = await _get_document(db, document_id)
+        await _set_media_status(db, document, MediaStatus.EXTRACTING_METADATA)
+
+        file_content = await read_file(document.stored_filename)
+        metadata = extract_metadata(file_content, document.mime_type)
+        page_count = metadata.pop("page_count", None)
+
+        await _set_media_status(
+            db,
+            document,
+            MediaStatus.EXTRACTING_METADATA,
+            page_count=page_count,
+            media_metadata=metadata,
+        )
+        return {"status": "extracted", "document_id": str(document_id), "page_count": page_count}
+
+
+@celery_app.task(
+    bind=True,
+    name="generate_document_thumbnail",
+    max_retries=3,
+    default_retry_delay=60,
+)
+def generate_document_thumbnail(self, document_id: str) -> dict:
+    """
+    Построение превью документа.
+
+    Args:
+        document_id: UUID документа в виде строки
+
+    Returns:
+        Результат обработки
+    """
+    return _run_step(self, _generate_document_thumbnail_async, document_id)
+
+
+async def _generate_document_thumbnail_async(document_id: UUID) -> dict:
+    """Асинхронная часть построения превью."""
+    async with SessionLocal() as db:
+        document = await _get_document(db, document_id)
+        await _set_media_status(db, document, MediaStatus.GENERATING_THUMBNAIL)
+
+        file_content = await read_file(document.stored_filename)
+        thumbnail = generate_thumbnail(file_content, document.mime_type, settings.MEDIA_THUMBNAIL_SIZE)
+        if thumbnail is None:
+            return {"status": "skipped", "document_id": str(document_id)}
+
+        # Превью общее для всех документов с одинаковым содержимым
+        thumbnail_filename = get_thumbnail_filename(document.content_hash)
+        await save_blob(thumbnail_filename, thumbnail)
+
+        await _set_media_status(
+            db,
+            document,
+            MediaStatus.GENERATING_THUMBNAIL,
+            thumbnail_filename=thumbnail_filename,
+        )
+        return {"status": "generated", "document_id": str(document_id)}
+
+
+@celery_app.task(
+    bind=True,
+    name="finish_document_media",
+    max_retries=3,
+    default_retry_delay=60,
+)
+def finish_document_media(self, document_id: str) -> dict:
+    """
+    Завершение обработки файла и необязательный запуск NLP-анализа.
+
+    Args:
+        document_id: UUID документа в виде строки
+
+    Returns:
+        Результат обработки
+    """
+    return _run_step(self, _finish_document_media_async, document_id)
+
+
+async def _finish_document_media_async(document_id: UUID) -> dict:
+    """Асинхронная часть завершения обработки."""
+    async with SessionLocal() as db:
+        document = await _get_document(db, document_id)
+        await _set_media_status(db, document, MediaStatus.READY)
+
+        nlp_status: Optional[str] = None
+        if settings.MEDIA_NLP_PREWARM_ENABLED and document.status == DocumentStatus.PENDING:
+            nlp_status = await _prewarm_nlp_analysis(db, document)
+
+        logger.info("Document media processed", document_id=str(document_id), nlp=nlp_status)
+        return {"status": "ready", "document_id": str(document_id), "nlp": nlp_status}
+
+
+async def _prewarm_nlp_analysis(db: AsyncSession, document: Document) -> Optional[str]:
+    """
+    Предварительный запуск анализа, чтобы отчет был готов к первому запросу.
+
+    Returns:
+        "reused", "dispatched" или None, если анализ уже запущен
+    """
+    existing = await db.execute(
+        select(AuditReport.id).where(
+            AuditReport.document_id == document.id,
+            AuditReport.status.in_([AuditReportStatus.PENDING, AuditReportStatus.PROCESSING]),
+        )
+    )
+    if existing.first() is not None:
+        return None
+
+    audit_report = await ReportService.create_audit_report(db, document.id, uuid4())
+
+    if settings.NLP_RESULT_REUSE_ENABLED:
+        source_report = await ReportService.find_reusable_report(db, document.file_hash)
+        if source_report:
+            await ReportService.clone_analysis_results(db, source_report, audit_report)
+            return "reused"
+
+    process_document_with_nlp.delay(str(document.id))
+    return "dispatched"
+
+
+@celery_app.task(name="mark_document_media_failed")
+def mark_document_media_failed(document_id: str) -> None:
+    """
+    Обработчик ошибки конвейера (после исчерпания повторных попыток).
+
+    Args:
+        document_id: UUID документа в виде строки
+    """
+    run_async(_mark_document_media_failed_async(UUID(document_id)))
+
+
+async def _mark_document_media_failed_async(document_id: UUID) -> None:
+    """Асинхронная часть обработчика ошибки."""
+    async with SessionLocal() as db:
+        document = await DocumentService.get_document_by_id(db, document_id)
+        if document:
+            await _set_media_status(db, document, MediaStatus.FAILED)
+            logger.warning("Document media processing failed", document_id=str(document_id))
+
+
+def start_media_pipeline(document_id: UUID) -> AsyncResult:
+    """
+    Запуск конвейера обработки загруженного файла.
+
+    Args:
+        document_id: ID документа
+
+    Returns:
+        Результат последнего шага цепочки
+    """
+    document_id = str(document_id)
+    pipeline = chain(
+        optimize_document_image.si(document_id),
+        extract_document_metadata.si(document_id),
+        generate_document_thumbnail.si(document_id),
+        finish_document_media.si(document_id),
+    )
+    pipeline.link_error(mark_document_media_failed.si(document_id))
+    return pipeline.apply_async()
@@ -1,11 +1,9 @@
 """
 Celery задачи для обработки документов через NLP-сервис.
 """
-import asyncio
 from uuid import UUID, uuid4
 from datetime import datetime
 
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy import select
 
 from app.core.celery_app import celery_app
@@ -15,13 +13,11 @@ from app.models.document import DocumentStatus
 from app.models.audit_report import AuditReport, AuditReportStatus
 from app.services.nlp import NLPService
 from app.services.document import DocumentService
+from app.services.report import ReportService
+from app.tasks.base import SessionLocal, run_async
 
 logger = get_logger(__name__)
 
-# Создание async движка для Celery задач
-db_engine = create_async_engine(settings.DATABASE_URL, echo=False)
-SessionLocal = async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
-
 
 @celery_app.task(
     bind=True,
@@ -41,12 +37,7 @@ def process_document_with_nlp(self, document_id: str) -> dict:
     """
     try:
         # Запускаем асинхронную функцию
-        loop = asyncio.get_event_loop()
-        if loop.is_closed():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(_process_document_async(UUID(document_id)))
-        return result
+        return run_async(_process_document_async(UUID(document_id)))
     except Exception as exc:
         logger.error(
             "Error processing document with NLP",
@@ -102,7 +93,9 @@ async def _process_document_async(document_id: UUID) -> dict:
 
             # Обновляем статус отчета
             audit_report.status = AuditReportStatus.PROCESSING
+            ReportService.mark_processing_started(audit_report)
             await db.commit()
+            await ReportService.publish_status_change(db, audit_report)
 
             # Строим URL файла
             file_url = NLPService.build_file_url(document_id, document.stored_filename)
@@ -118,6 +111,8 @@ async def _process_document_async(document_id: UUID) -> dict:
                     file_url=file_url,
                     callback_url=callback_url,
                 )
+                ReportService.mark_dispatched(audit_report)
+                await db.commit()
 
                 logger.info(
                     "Document sent to NLP service",
@@ -141,10 +136,10 @@ async def _process_document_async(document_id: UUID) -> dict:
                 )
 
                 # Обновляем статусы
-                audit_report.status = AuditReportStatus.FAILED
-                audit_report.error_message = str(e)
+                ReportService.mark_finished(audit_report, AuditReportStatus.FAILED, str(e))
                 await DocumentService.update_document_status(db, document_id, DocumentStatus.FAILED)
                 await db.commit()
+                await ReportService.publish_status_change(db, audit_report)
 
                 raise
         except Exception as e:
@@ -0,0 +1,181 @@
+"""
+Кодеки значений кеша.
+
+Значение в Redis хранится в конверте из двух байт заголовка: идентификатор
+кодека и признак сжатия. Благодаря этому смена CACHE_CODEC не ломает
+чтение уже записанных значений.
+"""
+import json
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict
+
+from app.core.logging import get_logger
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - зависит от окружения
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - зависит от окружения
+    msgpack = None
+
+logger = get_logger(__name__)
+
+# Признак сжатия во втором байте заголовка
+COMPRESSED = b"z"
+UNCOMPRESSED = b"-"
+
+
+class CacheCodec(ABC):
+    """Сериализация значений кеша."""
+
+    # Идентификатор кодека в заголовке значения
+    tag: bytes
+
+    @abstractmethod
+    def dumps(self, value: Any) -> bytes:
+        """Сериализация значения."""
+
+    @abstractmethod
+    def loads(self, data: bytes) -> Any:
+        """Десериализация значения."""
+
+
+class RawCodec(CacheCodec):
+    """Готовые байты (например, JSON ответа, собранный pydantic)."""
+
+    tag = b"r"
+
+    def dumps(self, value: bytes) -> bytes:
+        return value
+
+    def loads(self, data: bytes) -> bytes:
+        return data
+
+
+class JsonCodec(CacheCodec):
+    """Стандартный json (даты и UUID сериализуются строками)."""
+
+    tag = b"j"
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, default=str, ensure_ascii=False).encode()
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(CacheCodec):
+    """orjson: нативная поддержка datetime/UUID, в разы быстрее json."""
+
+    tag = b"o"
+
+    def dumps(self, value: Any) -> bytes:
+        return orjson.dumps(value, default=str)
+
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+class MsgpackCodec(CacheCodec):
+    """msgpack: компактный бинарный формат."""
+
+    tag = b"m"
+
+    def dumps(self, value: Any) -> bytes:
+        return msgpack.packb(value, default=str, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False)
+
+
+RAW_CODEC = RawCodec()
+
+_CODECS: Dict[str, CacheCodec] = {"json": JsonCodec()}
+if orjson is not None:
+    _CODECS["orjson"] = OrjsonCodec()
+if msgpack is not None:
+    _CODECS["msgpack"] = MsgpackCodec()
+
+_CODECS_BY_TAG: Dict[bytes, CacheCodec] = {
+    codec.tag: codec for codec in [RAW_CODEC, *_CODECS.values()]
+}
+
+
+def get_codec(name: str) -> CacheCodec:
+    """
+    Получить кодек по имени.
+
+    Если библиотека кодека не установлена, используется стандартный json.
+
+    Args:
+        name: Имя кодека (json, orjson, msgpack)
+
+    Returns:
+        Кодек
+    """
+    codec = _CODECS.get(name)
+    if codec is None:
+        logger.warning("Cache codec is not available, falling back to json", codec=name)
+        return _CODECS["json"]
+    return codec
+
+
+def encode(value: Any, codec: CacheCodec, compress_min_bytes: int) -> bytes:
+    """
+    Упаковка значения в конверт кеша.
+
+    Args:
+        value: Значение
+        codec: Кодек
+        compress_min_bytes: Значения от этого размера сжимаются zlib
+            (если сжатие действительно уменьшает размер)
+
+    Returns:
+        Байты для записи в кеш
+    """
+    payload = codec.dumps(value)
+    if len(payload) >= compress_min_bytes:
+        compressed = zlib.compress(payload, 1)
+        if len(compressed) < len(payload):
+            return codec.tag + COMPRESSED + compressed
+    return codec.tag + UNCOMPRESSED + payload
+
+
+def unpack(data: bytes) -> tuple[CacheCodec, bytes]:
+    """
+    Снятие конверта без десериализации.
+
+    Значения без заголовка (записанные до появления кодеков) считаются JSON.
+
+    Args:
+        data: Байты из кеша
+
+    Returns:
+        Кортеж (кодек, полезная нагрузка)
+    """
+    codec = _CODECS_BY_TAG.get(data[:1])
+    flag = data[1:2]
+    if codec is None or flag not in (COMPRESSED, UNCOMPRESSED):
+        return _CODECS["json"], data
+    payload = data[2:]
+    if flag == COMPRESSED:
+        payload = zlib.decompress(payload)
+    return codec, payload
+
+
+def decode(data: bytes) -> Any:
+    """
+    Распаковка значения из конверта кеша.
+
+    Args:
+        data: Байты из кеша
+
+    Returns:
+        Значение
+    """
+    codec, payload = unpack(data)
+    return codec.loads(payload)
@@ -0,0 +1,267 @@
+"""
+Утилиты для отдачи файлов с поддержкой Range и условных запросов.
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+import aiofiles
+from fastapi import Request, status
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+# Размер блока при потоковой отдаче файла
+CHUNK_SIZE = 64 * 1024
+
+# Расширение ASGI для отдачи файла через sendfile (если сервер его поддерживает)
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+
+def build_etag(value: str) -> str:
+    """
+    Построение сильного ETag.
+
+    Args:
+        value: Неизменяемый идентификатор содержимого (SHA-256 файла)
+
+    Returns:
+        ETag в кавычках
+    """
+    return f'"{value}"'
+
+
+def _to_http_date(value: datetime) -> str:
+    """Форматирование даты (наивные даты считаются UTC) для HTTP заголовков."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value, usegmt=True)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Слабое сравнение ETag из If-None-Match / If-Range."""
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag.removeprefix("W/") in candidates
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """
+    Проверка условного запроса (If-None-Match имеет приоритет над If-Modified-Since).
+
+    Args:
+        request: HTTP запрос
+        etag: ETag ресурса
+        last_modified: Время последнего изменения ресурса
+
+    Returns:
+        True если клиенту можно ответить 304
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            # Зона "-0000" (RFC 5322) разбирается в naive datetime
+            since = since.replace(tzinfo=timezone.utc)
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+
+    return False
+
+
+def parse_range_header(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Разбор заголовка Range (поддерживается один диапазон).
+
+    Args:
+        header: Значение заголовка Range
+        size: Размер файла
+
+    Returns:
+        Кортеж (start, end) включительно или None, если диапазон невыполним
+
+    Raises:
+        ValueError: Если заголовок некорректен или содержит несколько диапазонов
+    """
+    unit, _, ranges = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        raise ValueError(f"Неподдерживаемый Range: {header}")
+
+    start_str, _, end_str = ranges.strip().partition("-")
+    if not start_str:
+        # Суффиксный диапазон: последние N байт
+        length = int(end_str)
+        if length <= 0:
+            return None
+        return max(size - length, 0), size - 1
+
+    start = int(start_str)
+    end = int(end_str) if end_str else size - 1
+    if end_str and start > end:
+        raise ValueError(f"Некорректный Range: {header}")
+    if start >= size:
+        return None
+    return start, min(end, size - 1)
+
+
+def content_disposition(filename: str) -> str:
+    """
+    Значение Content-Disposition для скачивания файла (RFC 6266).
+
+    Кавычки, точка с запятой, обратная косая черта и не-ASCII символы в
+    filename заменяются на "_", полное имя передается в filename* (RFC 5987).
+
+    Args:
+        filename: Исходное имя файла
+
+    Returns:
+        str: Значение заголовка
+    """
+    fallback = "".join(
+        "_" if not 0x20 <= ord(char) < 0x7F or char in '"\\;' else char
+        for char in filename
+    )
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+class FileRangeResponse(Response):
+    """Ответ с содержимым файла (целиком или диапазон) без загрузки в память."""
+
+    def __init__(
+        self,
+        path: str,
+        start: int,
+        end: int,
+        status_code: int,
+        headers: dict,
+        media_type: Optional[str] = None,
+    ):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.length = max(end - start + 1, 0)
+        self.headers["content-length"] = str(self.length)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+
+        if scope.get("method") == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        # sendfile без копирования через пространство пользователя
+        if ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+            async with aiofiles.open(self.path, "rb") as f:
+                await send({
+                    "type": ZEROCOPY_EXTENSION,
+                    "file": f.fileno(),
+                    "offset": self.start,
+                    "count": self.length,
+                    "more_body": False,
+                })
+            return
+
+        async with aiofiles.open(self.path, "rb") as f:
+            await f.seek(self.start)
+            remaining = self.length
+            more_body = True
+            while more_body:
+                chunk = await f.read(min(CHUNK_SIZE, remaining))
+                remaining -= len(chunk)
+                more_body = remaining > 0 and bool(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+
+def _validator_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    """Заголовки валидации кеша, общие для 200/206/304."""
+    headers = {
+        "accept-ranges": "bytes",
+        "etag": etag,
+        "cache-control": "private, no-cache",
+    }
+    if last_modified is not None:
+        headers["last-modified"] = _to_http_date(last_modified)
+    return headers
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    """
+    Ответ 304 Not Modified.
+
+    Args:
+        etag: ETag ресурса
+        last_modified: Время последнего изменения ресурса
+
+    Returns:
+        Ответ без тела
+    """
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers=_validator_headers(etag, last_modified),
+    )
+
+
+def build_file_response(
+    request: Request,
+    path: str,
+    size: int,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+    media_type: Optional[str] = None,
+    filename: Optional[str] = None,
+) -> Response:
+    """
+    Ответ на запрос файла с учетом Range, If-Range, If-None-Match и If-Modified-Since.
+
+    Args:
+        request: HTTP запрос
+        path: Путь к файлу на диске
+        size: Размер файла
+        etag: ETag ресурса
+        last_modified: Время последнего изменения ресурса
+        media_type: MIME-тип
+        filename: Имя файла для Content-Disposition
+
+    Returns:
+        200, 206, 304 или 416 ответ
+    """
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+
+    headers = _validator_headers(etag, last_modified)
+    if filename:
+        headers["content-disposition"] = content_disposition(filename)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or _etag_matches(if_range, etag)):
+        try:
+            byte_range = parse_range_header(range_header, size)
+        except ValueError:
+            pass  # Некорректный Range игнорируется, отдается файл целиком
+        else:
+            if byte_range is None:
+                return Response(
+                    status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                    headers={**headers, "content-range": f"bytes */{size}"},
+                )
+            start, end = byte_range
+            headers["content-range"] = f"bytes {start}-{end}/{size}"
+            return FileRangeResponse(
+                path, start, end, status.HTTP_206_PARTIAL_CONTENT, headers, media_type
+            )
+
+    return FileRangeResponse(path, 0, size - 1, status.HTTP_200_OK, headers, media_type)
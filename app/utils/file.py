@@ -2,16 +2,14 @@
 Утилиты для работы с файлами.
 """
 import hashlib
-import os
-import uuid
 from pathlib import Path
 from typing import Tuple, Optional
 
-import aiofiles
 from fastapi import UploadFile, HTTPException, status
 
 from app.core.config import settings
 from app.core.logging import get_logger
+from app.services.storage import get_storage
 
 logger = get_logger(__name__)
 
@@ -70,40 +68,76 @@ async def calculate_file_hash(file_content: bytes) -> str:
     return hashlib.sha256(file_content).hexdigest()
 
 
-async def save_file(file: UploadFile, file_content: bytes) -> Tuple[str, str]:
+# Уровни шардирования каталога блобов (blobs/ab/cd/<sha256>)
+BLOB_DIRECTORY = "blobs"
+BLOB_SHARD_DEPTH = 2
+BLOB_SHARD_WIDTH = 2
+
+
+def get_blob_filename(file_hash: str) -> str:
     """
-    Сохранение файла на диск.
+    Получение имени блоба (относительно хранилища) по SHA-256 хешу.
 
     Args:
-        file: Загружаемый файл
-        file_content: Содержимое файла
+        file_hash: SHA-256 хеш файла
 
     Returns:
-        Кортеж (stored_filename, file_path)
+        Относительный путь вида blobs/ab/cd/<hash>
     """
-    # Создаем директорию для хранения файлов
-    storage_path = Path(settings.FILE_STORAGE_PATH)
-    storage_path.mkdir(parents=True, exist_ok=True)
+    shards = [
+        file_hash[i * BLOB_SHARD_WIDTH:(i + 1) * BLOB_SHARD_WIDTH]
+        for i in range(BLOB_SHARD_DEPTH)
+    ]
+    return "/".join([BLOB_DIRECTORY, *shards, file_hash])
+
+
+# Каталог превью (одно превью на блоб: thumbnails/ab/cd/<sha256>.jpg)
+THUMBNAIL_DIRECTORY = "thumbnails"
+
+
+def get_thumbnail_filename(file_hash: str) -> str:
+    """
+    Получение имени превью (относительно хранилища) по SHA-256 хешу содержимого.
+
+    Args:
+        file_hash: SHA-256 хеш файла
 
-    # Генерируем уникальное имя файла
-    file_extension = Path(file.filename).suffix
-    stored_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = storage_path / stored_filename
+    Returns:
+        Относительный путь вида thumbnails/ab/cd/<hash>.jpg
+    """
+    blob_filename = get_blob_filename(file_hash)
+    return f"{THUMBNAIL_DIRECTORY}{blob_filename[len(BLOB_DIRECTORY):]}.jpg"
+
+
+async def save_blob(stored_filename: str, file_content: bytes) -> None:
+    """
+    Сохранение блоба в хранилище, если его еще нет.
+
+    Бэкенд записывает файл атомарно, поэтому параллельные загрузки
+    одинакового содержимого не видят частично записанный файл.
 
-    # Сохраняем файл
-    async with aiofiles.open(file_path, 'wb') as f:
-        await f.write(file_content)
+    Args:
+        stored_filename: Имя блоба (см. get_blob_filename)
+        file_content: Содержимое файла
+    """
+    storage = get_storage()
+    if await storage.exists(stored_filename):
+        logger.debug("Blob already stored", stored_filename=stored_filename)
+        return
 
-    logger.info("File saved", stored_filename=stored_filename, file_path=str(file_path))
-    return stored_filename, str(file_path)
+    async def content_stream():
+        yield file_content
 
+    await storage.put_stream(stored_filename, content_stream(), content_length=len(file_content))
+    logger.info("File saved", stored_filename=stored_filename)
 
-async def read_file(file_path: str) -> bytes:
+
+async def read_file(stored_filename: str) -> bytes:
     """
-    Чтение файла с диска.
+    Чтение файла из хранилища.
 
     Args:
-        file_path: Путь к файлу
+        stored_filename: Имя сохраненного файла
 
     Returns:
         Содержимое файла
@@ -111,29 +145,28 @@ async def read_file(file_path: str) -> bytes:
     Raises:
         HTTPException: Если файл не найден
     """
-    if not os.path.exists(file_path):
+    storage = get_storage()
+    if not await storage.exists(stored_filename):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Файл не найден",
         )
 
-    async with aiofiles.open(file_path, 'rb') as f:
-        return await f.read()
+    return b"".join([chunk async for chunk in storage.get_stream(stored_filename)])
 
 
-async def delete_file(file_path: str) -> None:
+async def delete_file(stored_filename: str) -> None:
     """
-    Удаление файла с диска.
+    Удаление файла из хранилища.
 
     Args:
-        file_path: Путь к файлу
+        stored_filename: Имя сохраненного файла
     """
     try:
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            logger.info("File deleted", file_path=file_path)
-    except OSError as e:
-        logger.error("Error deleting file", file_path=file_path, error=str(e))
+        await get_storage().delete(stored_filename)
+        logger.info("File deleted", stored_filename=stored_filename)
+    except Exception as e:
+        logger.error("Error deleting file", stored_filename=stored_filename, error=str(e))
 
 
 def get_file_path(stored_filename: str) -> str:
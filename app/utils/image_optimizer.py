@@ -1,23 +1,99 @@
 """
 Утилиты для оптимизации изображений.
 """
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
 from typing import Optional
 from PIL import Image
 
+from app.core.config import settings
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Пул процессов для декодирования/сжатия (Pillow держит GIL на больших изображениях)
+_executor: ProcessPoolExecutor | None = None
 
-async def optimize_image(
+
+def start_image_executor() -> ProcessPoolExecutor:
+    """
+    Создание пула процессов для оптимизации изображений (при старте приложения).
+
+    Рабочие процессы запускаются через forkserver (spawn, где его нет), а не
+    fork: к первому запросу в процессе uvicorn уже работают потоки (aiofiles,
+    QueueListener логов, экспорт спанов), и fork мог бы унаследовать
+    захваченную ими блокировку.
+
+    Returns:
+        Пул процессов
+    """
+    global _executor
+    if _executor is None:
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_OPTIMIZE_WORKERS,
+            mp_context=multiprocessing.get_context(start_method),
+        )
+    return _executor
+
+
+def get_image_executor() -> ProcessPoolExecutor:
+    """Получить пул процессов для оптимизации изображений."""
+    return _executor or start_image_executor()
+
+
+def shutdown_image_executor() -> None:
+    """Остановить пул процессов оптимизации изображений."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def needs_optimization(
+    image_content: bytes,
+    max_width: Optional[int] = 1920,
+    max_height: Optional[int] = 1080,
+) -> bool:
+    """
+    Проверка, имеет ли смысл оптимизировать изображение.
+
+    Читается только заголовок изображения, пиксели не декодируются.
+
+    Args:
+        image_content: Содержимое изображения
+        max_width: Максимальная ширина
+        max_height: Максимальная высота
+
+    Returns:
+        False если изображение меньше порога по размеру или уже в пределах габаритов
+    """
+    if len(image_content) < settings.IMAGE_OPTIMIZE_MIN_BYTES:
+        return False
+
+    try:
+        with Image.open(BytesIO(image_content)) as image:
+            width, height = image.size
+    except Exception:
+        return False
+
+    return (max_width is not None and width > max_width) or (
+        max_height is not None and height > max_height
+    )
+
+
+def optimize_image_sync(
     image_content: bytes,
     max_width: Optional[int] = 1920,
     max_height: Optional[int] = 1080,
     quality: int = 85,
-) -> Optional[bytes]:
+) -> bytes:
     """
-    Оптимизация изображения (сжатие и изменение размера).
+    Оптимизация изображения (сжатие и изменение размера), синхронная версия.
+
+    Выполняется в пуле процессов или в Celery-задаче, но не в event loop.
 
     Args:
         image_content: Содержимое изображения
@@ -26,13 +102,17 @@ async def optimize_image(
         quality: Качество JPEG (1-100)
 
     Returns:
-        Оптимизированное изображение или None при ошибке
+        Оптимизированное изображение или исходное при ошибке
     """
     try:
         # Открываем изображение
         image = Image.open(BytesIO(image_content))
         original_format = image.format
 
+        # Для JPEG декодер сразу уменьшает изображение в 2/4/8 раз (DCT scaling)
+        if original_format == "JPEG" and (max_width or max_height):
+            image.draft("RGB", (max_width or image.width, max_height or image.height))
+
         # Изменяем размер если нужно
         if max_width or max_height:
             image.thumbnail((max_width or image.width, max_height or image.height), Image.Resampling.LANCZOS)
@@ -49,7 +129,7 @@ async def optimize_image(
 
         # Сохраняем в буфер
         output = BytesIO()
-        
+
         if original_format == "JPEG" or image.mode == "RGB":
             image.save(output, format="JPEG", quality=quality, optimize=True)
         else:
@@ -79,6 +159,37 @@ async def optimize_image(
         return image_content
 
 
+async def optimize_image(
+    image_content: bytes,
+    max_width: Optional[int] = 1920,
+    max_height: Optional[int] = 1080,
+    quality: int = 85,
+) -> Optional[bytes]:
+    """
+    Оптимизация изображения (сжатие и изменение размера).
 
+    Небольшие изображения и изображения в пределах габаритов возвращаются
+    без изменений; остальные обрабатываются в пуле процессов, не блокируя
+    event loop.
 
+    Args:
+        image_content: Содержимое изображения
+        max_width: Максимальная ширина
+        max_height: Максимальная высота
+        quality: Качество JPEG (1-100)
+
+    Returns:
+        Оптимизированное изображение или None при ошибке
+    """
+    if not needs_optimization(image_content, max_width, max_height):
+        return image_content
 
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_image_executor(),
+        optimize_image_sync,
+        image_content,
+        max_width,
+        max_height,
+        quality,
+    )
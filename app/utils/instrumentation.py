@@ -0,0 +1,207 @@
+"""
+Инструментирование БД, Celery и очереди задач метриками Prometheus.
+
+Обработчики выполняются на каждом запросе к БД и каждой задаче, поэтому
+дочерние метрики с постоянными метками создаются один раз заранее.
+"""
+import asyncio
+import time
+from typing import Dict, Optional
+
+from celery.signals import (
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_process_init,
+    worker_process_shutdown,
+)
+from prometheus_client import start_http_server
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.services.events import ReportStatusChanged, subscribe
+from app.utils.metrics import (
+    active_connections,
+    celery_task_duration_seconds,
+    celery_tasks_total,
+    cleanup_dead_processes,
+    db_queries_total,
+    db_query_duration_seconds,
+    documents_processed_total,
+    get_registry,
+    mark_process_dead,
+    multiprocess_dir,
+    queue_size,
+    reports_generated_total,
+)
+from app.utils.query_profiler import current_query_stats
+from app.utils.slow_queries import record_statement
+
+logger = get_logger(__name__)
+
+# Типы запросов БД (метка query_type)
+QUERY_TYPES = ("SELECT", "INSERT", "UPDATE", "DELETE")
+OTHER_QUERY_TYPE = "OTHER"
+
+_query_counters = {name: db_queries_total.labels(query_type=name) for name in (*QUERY_TYPES, OTHER_QUERY_TYPE)}
+_query_durations = {
+    name: db_query_duration_seconds.labels(query_type=name) for name in (*QUERY_TYPES, OTHER_QUERY_TYPE)
+}
+_db_connections = active_connections.labels(connection_type="db")
+
+# Статусы отчета, после которых обработка документа завершена
+_TERMINAL_REPORT_STATUSES = ("completed", "failed")
+
+
+def query_type(statement: str) -> str:
+    """
+    Тип SQL запроса по первому ключевому слову.
+
+    Args:
+        statement: SQL запрос
+
+    Returns:
+        SELECT, INSERT, UPDATE, DELETE или OTHER
+    """
+    keyword = statement.lstrip()[:6].upper()
+    return keyword if keyword in QUERY_TYPES else OTHER_QUERY_TYPE
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Запоминание времени начала запроса в контексте выполнения."""
+    context._query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Запись количества и длительности запроса."""
+    duration = time.perf_counter() - context._query_start_time
+    name = query_type(statement)
+    _query_counters[name].inc()
+    _query_durations[name].observe(duration)
+
+    stats = current_query_stats()
+    if stats is not None:
+        stats.record(statement, duration)
+
+    record_statement(conn, statement, parameters, executemany, duration)
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    _db_connections.inc()
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    _db_connections.dec()
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """
+    Подключение метрик запросов и занятых соединений пула к движку БД.
+
+    Args:
+        engine: Асинхронный движок SQLAlchemy
+    """
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "checkout", _on_checkout)
+    event.listen(sync_engine, "checkin", _on_checkin)
+
+
+# Время начала выполняемых задач процесса воркера
+_task_start_times: Dict[str, float] = {}
+
+
+def _on_task_prerun(task_id=None, task=None, **kwargs):
+    _task_start_times[task_id] = time.perf_counter()
+
+
+def _on_task_postrun(task_id=None, task=None, state=None, **kwargs):
+    """Запись количества задач по итоговому состоянию и их длительности."""
+    start_time = _task_start_times.pop(task_id, None)
+    celery_tasks_total.labels(task_name=task.name, status=(state or "unknown").lower()).inc()
+    if start_time is not None:
+        celery_task_duration_seconds.labels(task_name=task.name).observe(time.perf_counter() - start_time)
+
+
+def _on_worker_init(**kwargs):
+    """Запуск HTTP экспорта метрик в главном процессе воркера."""
+    if not settings.CELERY_METRICS_PORT:
+        return
+    if multiprocess_dir() is None:
+        # Задачи выполняются в дочерних процессах, их значения без
+        # общего каталога главному процессу не видны
+        logger.warning("PROMETHEUS_MULTIPROC_DIR is not set, worker metrics cover the main process only")
+    start_http_server(settings.CELERY_METRICS_PORT, registry=get_registry())
+    logger.info("Celery metrics server started", port=settings.CELERY_METRICS_PORT)
+
+
+def _on_worker_process_init(**kwargs):
+    cleanup_dead_processes()
+
+
+def _on_worker_process_shutdown(pid=None, **kwargs):
+    mark_process_dead(pid)
+
+
+def instrument_celery() -> None:
+    """Подписка метрик задач и экспорта на сигналы Celery."""
+    task_prerun.connect(_on_task_prerun, weak=False)
+    task_postrun.connect(_on_task_postrun, weak=False)
+    worker_init.connect(_on_worker_init, weak=False)
+    worker_process_init.connect(_on_worker_process_init, weak=False)
+    worker_process_shutdown.connect(_on_worker_process_shutdown, weak=False)
+
+
+async def _on_report_status_changed(event: ReportStatusChanged) -> None:
+    """Учет завершенных отчетов и обработанных документов."""
+    if event.status in _TERMINAL_REPORT_STATUSES:
+        reports_generated_total.labels(status=event.status).inc()
+        documents_processed_total.labels(status=event.status).inc()
+
+
+def register_report_metrics() -> None:
+    """Подписка метрик отчетов на доменные события."""
+    subscribe(ReportStatusChanged, _on_report_status_changed)
+
+
+async def sample_queue_sizes() -> None:
+    """Периодическое измерение длины очередей Celery в брокере (Redis)."""
+    from app.core.celery_app import celery_app
+    from app.core.redis import get_redis
+
+    queue_names = [celery_app.conf.task_default_queue]
+    while True:
+        try:
+            redis = await get_redis()
+            for name in queue_names:
+                queue_size.labels(queue_name=name).set(await redis.llen(name))
+        except Exception as e:
+            logger.warning("Error sampling queue size", error=str(e))
+        await asyncio.sleep(settings.METRICS_QUEUE_SAMPLE_SECONDS)
+
+
+_sampler_task: Optional[asyncio.Task] = None
+
+
+def start_queue_size_sampler() -> None:
+    """Запуск измерения длины очередей."""
+    global _sampler_task
+    if settings.METRICS_QUEUE_SAMPLE_SECONDS > 0 and _sampler_task is None:
+        _sampler_task = asyncio.create_task(sample_queue_sizes())
+
+
+async def stop_queue_size_sampler() -> None:
+    """Остановка измерения длины очередей."""
+    global _sampler_task
+    if _sampler_task is not None:
+        _sampler_task.cancel()
+        try:
+            await _sampler_task
+        except asyncio.CancelledError:
+            pass
+        _sampler_task = None
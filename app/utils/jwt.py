@@ -49,6 +49,27 @@ def create_refresh_token(data: dict) -> str:
     return encoded_jwt
 
 
+def create_stream_token(data: dict) -> str:
+    """
+    Создание короткоживущего токена подключения к потоку событий.
+
+    EventSource в браузере не передает заголовок Authorization, поэтому
+    токен передается в query-параметре. Он принимается только потоком
+    событий и действует EVENTS_STREAM_TOKEN_EXPIRE_SECONDS.
+
+    Args:
+        data: Данные для включения в токен
+
+    Returns:
+        JWT токен потока событий
+    """
+    to_encode = data.copy()
+    expire = datetime.utcnow() + timedelta(seconds=settings.EVENTS_STREAM_TOKEN_EXPIRE_SECONDS)
+    to_encode.update({"exp": expire, "type": "stream"})
+    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    return encoded_jwt
+
+
 def decode_token(token: str) -> Optional[dict]:
     """
     Декодирование JWT токена.
@@ -0,0 +1,140 @@
+"""
+Утилиты для извлечения метаданных и построения превью документов.
+"""
+import re
+import zipfile
+from io import BytesIO
+from typing import Any, Dict, Optional
+from xml.etree import ElementTree
+
+from PIL import Image
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+PDF_MIME_TYPE = "application/pdf"
+DOCX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+IMAGE_MIME_TYPES = ("image/jpeg", "image/png")
+
+# Объекты страниц и счетчик страниц в дереве /Pages
+_PDF_PAGE_RE = re.compile(rb"/Type\s*/Page(?![A-Za-z])")
+_PDF_COUNT_RE = re.compile(rb"/Count\s+(\d+)")
+_PDF_VERSION_RE = re.compile(rb"^%PDF-(\d\.\d)")
+
+# Пространства имен свойств DOCX (docProps/app.xml и docProps/core.xml)
+_DOCX_APP_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/extended-properties}"
+_DOCX_CORE_FIELDS = {
+    "title": "{http://purl.org/dc/elements/1.1/}title",
+    "author": "{http://purl.org/dc/elements/1.1/}creator",
+}
+
+
+def _pdf_metadata(content: bytes) -> Dict[str, Any]:
+    """Количество страниц и версия PDF без полного разбора документа."""
+    metadata: Dict[str, Any] = {}
+    version = _PDF_VERSION_RE.match(content)
+    if version:
+        metadata["pdf_version"] = version.group(1).decode()
+
+    page_count = len(_PDF_PAGE_RE.findall(content))
+    if page_count == 0:
+        # Страницы в сжатых потоках объектов (PDF 1.5+) - берем счетчик корня /Pages
+        counts = [int(value) for value in _PDF_COUNT_RE.findall(content)]
+        page_count = max(counts, default=0)
+    metadata["page_count"] = page_count or None
+    return metadata
+
+
+def _docx_metadata(content: bytes) -> Dict[str, Any]:
+    """Количество страниц и свойства документа DOCX."""
+    metadata: Dict[str, Any] = {"page_count": None}
+    with zipfile.ZipFile(BytesIO(content)) as archive:
+        names = set(archive.namelist())
+        if "docProps/app.xml" in names:
+            app = ElementTree.fromstring(archive.read("docProps/app.xml"))
+            pages = app.findtext(f"{_DOCX_APP_NS}Pages")
+            words = app.findtext(f"{_DOCX_APP_NS}Words")
+            if pages and pages.isdigit():
+                metadata["page_count"] = int(pages)
+            if words and words.isdigit():
+                metadata["word_count"] = int(words)
+        if "docProps/core.xml" in names:
+            core = ElementTree.fromstring(archive.read("docProps/core.xml"))
+            for field, tag in _DOCX_CORE_FIELDS.items():
+                value = core.findtext(tag)
+                if value:
+                    metadata[field] = value
+    return metadata
+
+
+def _image_metadata(content: bytes) -> Dict[str, Any]:
+    """Размеры и формат изображения (читается только заголовок)."""
+    with Image.open(BytesIO(content)) as image:
+        return {
+            "page_count": getattr(image, "n_frames", 1),
+            "width": image.width,
+            "height": image.height,
+            "format": image.format,
+            "mode": image.mode,
+        }
+
+
+def extract_metadata(content: bytes, mime_type: str) -> Dict[str, Any]:
+    """
+    Извлечение количества страниц и метаданных документа.
+
+    Args:
+        content: Содержимое файла
+        mime_type: MIME-тип файла
+
+    Returns:
+        Словарь метаданных; ключ page_count содержит количество страниц или None
+    """
+    try:
+        if mime_type == PDF_MIME_TYPE:
+            return _pdf_metadata(content)
+        if mime_type == DOCX_MIME_TYPE:
+            return _docx_metadata(content)
+        if mime_type in IMAGE_MIME_TYPES:
+            return _image_metadata(content)
+    except Exception as e:
+        logger.warning("Error extracting document metadata", mime_type=mime_type, error=str(e))
+    return {"page_count": None}
+
+
+def generate_thumbnail(content: bytes, mime_type: str, size: int = 256) -> Optional[bytes]:
+    """
+    Построение JPEG превью документа.
+
+    Превью строится только для изображений: рендеринг страниц PDF/DOCX
+    требует зависимостей, которых нет в окружении.
+
+    Args:
+        content: Содержимое файла
+        mime_type: MIME-тип файла
+        size: Максимальная сторона превью в пикселях
+
+    Returns:
+        Содержимое превью или None, если превью не поддерживается
+    """
+    if mime_type not in IMAGE_MIME_TYPES:
+        return None
+
+    try:
+        image = Image.open(BytesIO(content))
+        if image.format == "JPEG":
+            image.draft("RGB", (size, size))
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        if image.mode != "RGB":
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            rgba = image.convert("RGBA")
+            background.paste(rgba, mask=rgba.split()[3])
+            image = background
+
+        output = BytesIO()
+        image.save(output, format="JPEG", quality=80, optimize=True)
+        return output.getvalue()
+    except Exception as e:
+        logger.warning("Error generating thumbnail", mime_type=mime_type, error=str(e))
+        return None
@@ -1,10 +1,31 @@
 """
 Метрики Prometheus для мониторинга приложения.
+
+При нескольких процессах (воркеры uvicorn, дочерние процессы Celery)
+включается multiprocess режим prometheus_client: переменная окружения
+PROMETHEUS_MULTIPROC_DIR указывает на общий каталог, где каждый процесс
+пишет значения в свои mmap файлы, а экспорт суммирует их. Переменная
+должна быть задана до импорта этого модуля.
 """
-from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST
+import os
+from typing import Optional
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    Gauge,
+    generate_latest,
+    multiprocess,
+    CONTENT_TYPE_LATEST,
+)
 from fastapi import Response
 import prometheus_client
 
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
 # Метрики HTTP запросов
 http_requests_total = Counter(
     'http_requests_total',
@@ -45,6 +66,13 @@ redis_operation_duration_seconds = Histogram(
     ['operation']
 )
 
+# Метрики кеша (tier: local - память процесса, redis)
+cache_requests_total = Counter(
+    'cache_requests_total',
+    'Total number of cache lookups',
+    ['tier', 'result']
+)
+
 # Метрики Celery задач
 celery_tasks_total = Counter(
     'celery_tasks_total',
@@ -84,40 +112,121 @@ violations_detected_total = Counter(
     ['risk_level']
 )
 
+# Этапы анализа документа: ожидание задачи в очереди, отправка в
+# NLP-сервис (от начала задачи до подтверждения), ответ NLP-сервиса
+# (от подтверждения до callback) и полное время от постановки в очередь
+analysis_queue_wait_seconds = Histogram(
+    'analysis_queue_wait_seconds',
+    'Time from analysis request to task start in seconds',
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+)
+
+analysis_dispatch_seconds = Histogram(
+    'analysis_dispatch_seconds',
+    'Time from task start to NLP service acknowledgement in seconds',
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+analysis_nlp_turnaround_seconds = Histogram(
+    'analysis_nlp_turnaround_seconds',
+    'Time from NLP service acknowledgement to callback in seconds',
+    ['status'],
+    buckets=(1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1200.0, 1800.0, 3600.0)
+)
+
+analysis_total_duration_seconds = Histogram(
+    'analysis_total_duration_seconds',
+    'Time from analysis request to final report status in seconds',
+    ['status'],
+    buckets=(1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1200.0, 1800.0, 3600.0)
+)
+
 # Метрики активных подключений
 active_connections = Gauge(
     'active_connections',
     'Number of active connections',
-    ['connection_type']
+    ['connection_type'],
+    multiprocess_mode='livesum'
 )
 
 # Метрики размера очереди
 queue_size = Gauge(
     'queue_size',
     'Size of the task queue',
-    ['queue_name']
+    ['queue_name'],
+    multiprocess_mode='livemostrecent'
 )
 
 
-def get_metrics_response() -> Response:
-    """Возвращает метрики в формате Prometheus."""
+def multiprocess_dir() -> Optional[str]:
+    """Каталог multiprocess режима (None - метрики только текущего процесса)."""
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR") or None
+
+
+def get_registry() -> CollectorRegistry:
+    """
+    Реестр для экспорта метрик.
+
+    Returns:
+        Реестр, объединяющий файлы всех процессов, в multiprocess режиме,
+        иначе реестр текущего процесса
+    """
+    if multiprocess_dir() is None:
+        return prometheus_client.REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def _is_process_alive(pid: int) -> bool:
     try:
-        output = generate_latest(prometheus_client.REGISTRY)
-        # Убеждаемся, что ответ заканчивается новой строкой
-        if isinstance(output, bytes):
-            output = output.decode('utf-8')
-        if not output.endswith('\n'):
-            output += '\n'
-        return Response(
-            content=output,
-            media_type=CONTENT_TYPE_LATEST
-        )
-    except Exception as e:
-        # Fallback на простой формат
-        from prometheus_client import generate_latest as gl
-        output = gl()
-        return Response(
-            content=output,
-            media_type=CONTENT_TYPE_LATEST
-        )
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def mark_process_dead(pid: Optional[int] = None) -> None:
+    """
+    Удаление значений live gauge завершенного процесса.
+
+    Счетчики и гистограммы завершенных процессов остаются в каталоге,
+    чтобы суммарные значения не уменьшались.
+
+    Args:
+        pid: PID процесса (по умолчанию - текущий)
+    """
+    if multiprocess_dir() is not None:
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
+def cleanup_dead_processes() -> None:
+    """
+    Удаление значений live gauge процессов, завершившихся без mark_process_dead.
+
+    Вызывается при старте процесса: воркер, убитый по OOM или сигналом,
+    не успевает отметить себя завершенным.
+    """
+    directory = multiprocess_dir()
+    if directory is None:
+        return
+    pids = set()
+    for filename in os.listdir(directory):
+        # Имена файлов: <тип>[_<режим>]_<pid>.db
+        pid = filename.rsplit("_", 1)[-1].split(".", 1)[0]
+        if pid.isdigit():
+            pids.add(int(pid))
+    for pid in pids:
+        if not _is_process_alive(pid):
+            multiprocess.mark_process_dead(pid, directory)
+            logger.info("Removed metrics of dead process", pid=pid)
 
+
+def get_metrics_response() -> Response:
+    """Возвращает метрики в формате Prometheus."""
+    return Response(
+        content=generate_latest(get_registry()),
+        media_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,135 @@
+"""
+Статистический профилировщик: выборка стеков потоков фоновым потоком.
+
+Не использует sys.setprofile/settrace, поэтому не замедляет код между
+выборками: раз в интервал фоновый поток читает sys._current_frames() и
+учитывает стек каждого потока. Результат - свернутые стеки (формат
+collapsed stacks для flamegraph.pl, speedscope и т.п.).
+"""
+import asyncio
+import os
+import sys
+import threading
+from collections import Counter
+from types import CodeType, FrameType
+from typing import Dict, List, Optional
+
+
+class ProfilerBusyError(Exception):
+    """Профилировщик процесса уже запущен."""
+
+
+class StackSampler:
+    """Фоновая выборка стеков всех потоков процесса."""
+
+    def __init__(self, interval: float):
+        """
+        Инициализация профилировщика.
+
+        Args:
+            interval: Интервал между выборками в секундах
+        """
+        self.interval = interval
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._labels: Dict[CodeType, str] = {}
+        self._thread_names: Dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _label(self, code: CodeType) -> str:
+        """Подпись кадра стека (кешируется по объекту кода)."""
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _collapse(self, thread_name: str, frame: Optional[FrameType]) -> str:
+        """Стек потока от корня к текущему кадру через ';'."""
+        labels: List[str] = []
+        while frame is not None:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        labels.append(thread_name)
+        labels.reverse()
+        return ";".join(labels)
+
+    def _sample(self) -> None:
+        """Одна выборка стеков всех потоков, кроме самого профилировщика."""
+        own_id = threading.get_ident()
+        frames = sys._current_frames()
+        if not frames.keys() <= self._thread_names.keys():
+            # Имена потоков обновляются только при появлении новых потоков
+            self._thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in frames.items():
+            if thread_id == own_id:
+                continue
+            self._stacks[self._collapse(self._thread_names.get(thread_id, str(thread_id)), frame)] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> None:
+        """Запуск выборки."""
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Остановка выборки."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    @property
+    def stacks(self) -> Counter:
+        """Количество выборок каждого свернутого стека."""
+        return self._stacks
+
+
+def format_collapsed(stacks: Counter) -> str:
+    """
+    Свернутые стеки в текстовом формате "кадр;кадр;... количество".
+
+    Args:
+        stacks: Количество выборок каждого стека
+
+    Returns:
+        Текст для flamegraph.pl / speedscope
+    """
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+# Один профиль на процесс: выборки параллельных профилей искажали бы друг друга
+_profile_lock = threading.Lock()
+
+
+async def profile(seconds: float, interval: float) -> StackSampler:
+    """
+    Профилирование процесса в течение заданного времени.
+
+    Event loop не блокируется: выборку делает фоновый поток, а вызывающая
+    корутина ждет окончания окна, пока процесс обслуживает запросы.
+
+    Args:
+        seconds: Длительность в секундах
+        interval: Интервал между выборками в секундах
+
+    Returns:
+        Остановленный профилировщик с результатами
+
+    Raises:
+        ProfilerBusyError: Если профилировщик процесса уже запущен
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusyError()
+    sampler = StackSampler(interval)
+    try:
+        sampler.start()
+        await asyncio.sleep(seconds)
+    finally:
+        sampler.stop()
+        _profile_lock.release()
+    return sampler
@@ -0,0 +1,76 @@
+"""
+Подсчет SQL запросов в рамках HTTP запроса (или любого другого блока кода).
+
+Статистика хранится в contextvar: запросы к БД, выполненные в задаче
+запроса (и в скопированных из нее контекстах), попадают в ее счетчик.
+Запись выполняет обработчик after_cursor_execute из app.utils.instrumentation.
+"""
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, Optional, Tuple
+
+
+@dataclass
+class QueryStats:
+    """Количество и суммарное время SQL запросов."""
+
+    count: int = 0
+    duration: float = 0.0
+    # Количество выполнений каждого текста запроса (повторы - признак N+1)
+    statements: Counter = field(default_factory=Counter)
+    # Внешний профилируемый блок, которому тоже засчитываются запросы
+    parent: Optional["QueryStats"] = None
+
+    def record(self, statement: str, duration: float) -> None:
+        """
+        Учет выполненного запроса в этом и во всех внешних блоках.
+
+        Args:
+            statement: SQL запрос
+            duration: Длительность в секундах
+        """
+        stats = self
+        while stats is not None:
+            stats.count += 1
+            stats.duration += duration
+            stats.statements[statement] += 1
+            stats = stats.parent
+
+    def most_repeated(self) -> Tuple[Optional[str], int]:
+        """
+        Чаще всего выполнявшийся запрос.
+
+        Returns:
+            Кортеж (текст запроса, количество выполнений)
+        """
+        if not self.statements:
+            return None, 0
+        return self.statements.most_common(1)[0]
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Статистика текущего профилируемого блока (None - профилирование не ведется)."""
+    return _current_stats.get()
+
+
+@contextmanager
+def profile_queries() -> Iterator[QueryStats]:
+    """
+    Подсчет SQL запросов внутри блока.
+
+    Блоки можно вкладывать: запрос засчитывается всем внешним блокам.
+
+    Yields:
+        Статистика блока
+    """
+    stats = QueryStats(parent=_current_stats.get())
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
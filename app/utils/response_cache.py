@@ -0,0 +1,130 @@
+"""
+Кеширование готовых HTTP ответов (тело JSON и ETag).
+"""
+import hashlib
+from typing import Awaitable, Callable, Optional
+from uuid import UUID
+
+from fastapi import Request, status
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import Response
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.services.cache import CacheService
+from app.utils.download import build_etag, is_not_modified
+
+# Разделитель ETag и тела в значении кеша
+_SEPARATOR = b"\n"
+
+# Клиент может хранить ответ, но обязан перепроверять его (If-None-Match)
+_CACHE_CONTROL = "private, no-cache"
+
+
+def _json_response(request: Request, body: bytes, etag: str) -> Response:
+    """Ответ с готовым телом или 304, если у клиента актуальная версия."""
+    headers = {"etag": etag, "cache-control": _CACHE_CONTROL}
+    if is_not_modified(request, etag, None):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _render_body(result: BaseModel) -> bytes:
+    """Тело ответа с ETag для хранения в кеше."""
+    body = result.model_dump_json().encode()
+    etag = build_etag(hashlib.blake2b(body, digest_size=16).hexdigest())
+    return etag.encode() + _SEPARATOR + body
+
+
+async def cached_json_response(
+    request: Request,
+    cache_key: str,
+    render: Callable[[AsyncSession], Awaitable[BaseModel]],
+    db: AsyncSession,
+    ttl: int,
+) -> Response:
+    """
+    Ответ из кеша готовых тел без десериализации и повторной валидации.
+
+    При промахе ответ строит один запрос (single-flight), остальные ждут
+    его результат. Устаревший ответ отдается еще CACHE_STALE_TTL_SECONDS,
+    пока новый строится в фоне в отдельной сессии БД.
+
+    Args:
+        request: HTTP запрос
+        cache_key: Ключ кеша
+        render: Построение модели ответа по сессии БД
+        db: Сессия БД текущего запроса
+        ttl: Время свежести ответа в секундах
+
+    Returns:
+        200 с телом ответа или 304 при совпадении If-None-Match
+    """
+    async def compute() -> bytes:
+        return _render_body(await render(db))
+
+    async def refresh() -> bytes:
+        async with AsyncSessionLocal() as session:
+            return _render_body(await render(session))
+
+    cached = await CacheService.get_or_compute_raw(
+        cache_key,
+        compute,
+        ttl=ttl,
+        stale_ttl=settings.CACHE_STALE_TTL_SECONDS,
+        refresh=refresh,
+    )
+    etag, _, body = cached.partition(_SEPARATOR)
+    return _json_response(request, body, etag.decode())
+
+
+async def get_owned_response(request: Request, cache_key: str, owner_id: UUID) -> Optional[Response]:
+    """
+    Готовый ответ из кеша, если он сохранен для этого пользователя.
+
+    Права доступа проверяются сравнением с владельцем, сохраненным вместе
+    с телом ответа, без обращения к БД.
+
+    Args:
+        request: HTTP запрос
+        cache_key: Ключ кеша
+        owner_id: ID текущего пользователя
+
+    Returns:
+        200 с телом ответа или 304; None - промах или другой владелец
+    """
+    cached = await CacheService.get_raw(cache_key)
+    if cached is None:
+        return None
+    owner, _, data = cached.partition(_SEPARATOR)
+    if owner != str(owner_id).encode():
+        return None
+    etag, _, body = data.partition(_SEPARATOR)
+    return _json_response(request, body, etag.decode())
+
+
+async def store_owned_response(
+    request: Request,
+    cache_key: str,
+    owner_id: UUID,
+    result: BaseModel,
+    ttl: int,
+) -> Response:
+    """
+    Сохранение ответа в кеш вместе с владельцем (для get_owned_response).
+
+    Args:
+        request: HTTP запрос
+        cache_key: Ключ кеша
+        owner_id: ID пользователя, которому доступен ответ
+        result: Модель ответа
+        ttl: Время жизни в секундах
+
+    Returns:
+        200 с телом ответа или 304 при совпадении If-None-Match
+    """
+    data = _render_body(result)
+    await CacheService.set_raw(cache_key, str(owner_id).encode() + _SEPARATOR + data, ttl)
+    etag, _, body = data.partition(_SEPARATOR)
+    return _json_response(request, body, etag.decode())
@@ -0,0 +1,220 @@
+"""
+Журнал SQL запросов: агрегаты по отпечаткам и логирование медленных запросов.
+
+Отпечаток (fingerprint) - текст запроса без литералов и параметров,
+поэтому запросы, различающиеся только значениями, попадают в одну строку
+отчета. Значения параметров не логируются: в них персональные данные.
+
+Агрегаты хранятся в памяти процесса (как pg_stat_statements, но с
+разбивкой по процессам API/воркера).
+"""
+import random
+import re
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Строка отчета для запросов сверх лимита отпечатков
+OVERFLOW_FINGERPRINT = "<other>"
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?\b")
+# Параметры DBAPI: asyncpg ($1), psycopg (%(name)s, %s), sqlite (?)
+_PLACEHOLDER = re.compile(r"\$\d+|%\(\w+\)s|%s")
+# Элемент списка IN: параметр с необязательным приведением типа (asyncpg: $1::UUID)
+_IN_ITEM = r"\?(?:::\w+(?:\s+\w+)*(?:\[\])*)?"
+_IN_LIST = re.compile(rf"\(\s*{_IN_ITEM}(?:\s*,\s*{_IN_ITEM})+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """
+    Нормализованный текст запроса без литералов и параметров.
+
+    Args:
+        statement: SQL запрос
+
+    Returns:
+        Отпечаток запроса
+    """
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _PLACEHOLDER.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _IN_LIST.sub("(?+)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def redact_parameters(parameters: Any) -> Any:
+    """
+    Параметры запроса без значений (только типы).
+
+    Args:
+        parameters: Параметры DBAPI (кортеж, список или словарь)
+
+    Returns:
+        Типы параметров в той же структуре
+    """
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def redact_plan(plan: str) -> str:
+    """Удаление строковых литералов (значений параметров) из плана запроса."""
+    return _STRING_LITERAL.sub("'?'", plan)
+
+
+@dataclass
+class StatementStats:
+    """Агрегат выполнений запросов с одним отпечатком."""
+
+    fingerprint: str
+    calls: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+    slow_calls: int = 0
+    # Последний сохраненный план медленного выполнения
+    sample_plan: Optional[str] = None
+
+    @property
+    def mean_time(self) -> float:
+        return self.total_time / self.calls if self.calls else 0.0
+
+
+class QueryLog:
+    """Агрегаты SQL запросов процесса."""
+
+    def __init__(self, max_fingerprints: int):
+        self.max_fingerprints = max_fingerprints
+        self._stats: Dict[str, StatementStats] = {}
+        # Запросы выполняются и в потоках (run_sync), обновление под блокировкой
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, duration: float, slow: bool) -> StatementStats:
+        """
+        Учет выполнения запроса.
+
+        Args:
+            statement: SQL запрос
+            duration: Длительность в секундах
+            slow: Запрос превысил порог медленных запросов
+
+        Returns:
+            Агрегат отпечатка запроса
+        """
+        key = fingerprint(statement)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                if len(self._stats) >= self.max_fingerprints:
+                    key = OVERFLOW_FINGERPRINT
+                    stats = self._stats.get(key)
+                if stats is None:
+                    stats = self._stats[key] = StatementStats(fingerprint=key)
+            stats.calls += 1
+            stats.total_time += duration
+            stats.max_time = max(stats.max_time, duration)
+            if slow:
+                stats.slow_calls += 1
+        return stats
+
+    def top(self, limit: int) -> List[StatementStats]:
+        """
+        Запросы с наибольшим суммарным временем.
+
+        Args:
+            limit: Количество строк
+
+        Returns:
+            Агрегаты по убыванию суммарного времени
+        """
+        with self._lock:
+            stats = list(self._stats.values())
+        return sorted(stats, key=lambda item: item.total_time, reverse=True)[:limit]
+
+    def reset(self) -> None:
+        """Сброс агрегатов."""
+        with self._lock:
+            self._stats.clear()
+
+
+# Агрегаты процесса
+query_log = QueryLog(settings.DB_QUERY_LOG_MAX_FINGERPRINTS)
+
+
+def _explain(conn, statement: str, parameters: Any) -> Optional[str]:
+    """
+    План медленного SELECT через EXPLAIN (ANALYZE, BUFFERS) на том же соединении.
+
+    EXPLAIN ANALYZE выполняет запрос повторно, поэтому используется только
+    для SELECT и только для PostgreSQL. Курсор DBAPI создается отдельно:
+    результаты исходного запроса еще не прочитаны, а события SQLAlchemy
+    для него не вызываются. Ошибка EXPLAIN откатывается до точки
+    сохранения и не прерывает транзакцию запроса.
+    """
+    if conn.dialect.name != "postgresql" or statement.lstrip()[:6].upper() != "SELECT":
+        return None
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        except Exception:
+            cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            raise
+        cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        return plan
+    finally:
+        cursor.close()
+
+
+def record_statement(conn, statement: str, parameters: Any, executemany: bool, duration: float) -> None:
+    """
+    Учет выполненного запроса; медленные запросы логируются, часть из них - с планом.
+
+    Вызывается из обработчика after_cursor_execute.
+
+    Args:
+        conn: Соединение SQLAlchemy
+        statement: SQL запрос
+        parameters: Параметры DBAPI
+        executemany: Пакетное выполнение
+        duration: Длительность в секундах
+    """
+    slow = duration * 1000 >= settings.DB_SLOW_QUERY_THRESHOLD_MS
+    stats = query_log.record(statement, duration, slow)
+    if not slow:
+        return
+
+    plan = None
+    if (
+        not executemany
+        and settings.DB_SLOW_QUERY_EXPLAIN_SAMPLE_RATE > 0
+        and random.random() < settings.DB_SLOW_QUERY_EXPLAIN_SAMPLE_RATE
+    ):
+        try:
+            plan = _explain(conn, statement, parameters)
+        except Exception as e:
+            logger.warning("Error explaining slow query", fingerprint=stats.fingerprint, error=str(e))
+        if plan is not None:
+            plan = redact_plan(plan)
+            stats.sample_plan = plan
+
+    logger.warning(
+        "Slow SQL statement",
+        fingerprint=stats.fingerprint,
+        duration_ms=round(duration * 1000, 1),
+        parameters=None if executemany else redact_parameters(parameters),
+        executemany=executemany,
+        plan=plan,
+    )
@@ -0,0 +1,517 @@
+"""
+Распределенная трассировка (W3C Trace Context) с экспортом в OTLP/HTTP или файл.
+
+Контекст трассы передается в заголовке traceparent: во входящих HTTP
+запросах, в заголовках задач Celery и в запросе к NLP-сервису. Результат
+анализа приходит отдельным callback, поэтому контекст отправки документа
+сохраняется в Redis по request_id и восстанавливается при обработке
+callback - вся обработка документа попадает в одну трассу.
+
+Завершенные спаны экспортируются пачками фоновым потоком: экспорт не
+блокирует event loop и задачи, а при переполнении очереди спаны
+отбрасываются.
+"""
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Mapping, MutableMapping, Optional, Tuple
+
+import httpx
+import structlog
+from celery.signals import before_task_publish, task_postrun, task_prerun, worker_process_shutdown
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.redis import get_redis
+
+logger = get_logger(__name__)
+
+TRACEPARENT_HEADER = "traceparent"
+
+# Виды спанов и статусы OTLP
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+SPAN_KIND_PRODUCER = 4
+SPAN_KIND_CONSUMER = 5
+STATUS_UNSET = 0
+STATUS_ERROR = 2
+
+# Префикс ключей Redis с контекстом трассы и время их жизни
+TRACE_CONTEXT_KEY_PREFIX = "trace:"
+TRACE_CONTEXT_TTL = 24 * 3600
+
+# Параметры экспорта: размер пачки, интервал отправки (с), размер очереди
+EXPORT_BATCH_SIZE = 512
+EXPORT_INTERVAL = 5.0
+EXPORT_QUEUE_SIZE = 4096
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_INVALID_TRACE_ID = "0" * 32
+_INVALID_SPAN_ID = "0" * 16
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    """Идентификаторы спана, передаваемые между процессами."""
+
+    trace_id: str
+    span_id: str
+    sampled: bool = True
+
+    @property
+    def traceparent(self) -> str:
+        """Значение заголовка traceparent."""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    """
+    Разбор заголовка traceparent.
+
+    Args:
+        value: Значение заголовка
+
+    Returns:
+        Контекст спана или None, если заголовок отсутствует или невалиден
+    """
+    if not value:
+        return None
+    match = _TRACEPARENT.match(value.strip().lower())
+    if match is None:
+        return None
+    trace_id, span_id, flags = match.groups()
+    if trace_id == _INVALID_TRACE_ID or span_id == _INVALID_SPAN_ID:
+        return None
+    return SpanContext(trace_id, span_id, bool(int(flags, 16) & 1))
+
+
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    """Атрибут спана в формате OTLP/JSON."""
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+@dataclass
+class Span:
+    """Операция трассы."""
+
+    name: str
+    context: SpanContext
+    kind: int = SPAN_KIND_INTERNAL
+    parent_span_id: Optional[str] = None
+    start_time: int = field(default_factory=time.time_ns)
+    end_time: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    # Связанные спаны других трасс (например, HTTP запрос callback)
+    links: List[SpanContext] = field(default_factory=list)
+    status: int = STATUS_UNSET
+    status_message: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Установка атрибута спана."""
+        self.attributes[key] = value
+
+    def set_error(self, message: str) -> None:
+        """Отметка спана как завершившегося ошибкой."""
+        self.status = STATUS_ERROR
+        self.status_message = message
+
+    def end(self) -> None:
+        """Завершение спана и передача на экспорт (если трасса выбрана)."""
+        if self.end_time is not None:
+            return
+        self.end_time = time.time_ns()
+        if self.context.sampled:
+            _get_processor().submit(self)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Спан в формате OTLP/JSON."""
+        data: Dict[str, Any] = {
+            "traceId": self.context.trace_id,
+            "spanId": self.context.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_time),
+            "endTimeUnixNano": str(self.end_time),
+            "attributes": [_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": self.status},
+        }
+        if self.parent_span_id:
+            data["parentSpanId"] = self.parent_span_id
+        if self.links:
+            data["links"] = [{"traceId": link.trace_id, "spanId": link.span_id} for link in self.links]
+        if self.status_message:
+            data["status"]["message"] = self.status_message
+        return data
+
+
+def otlp_payload(spans: List[Span]) -> Dict[str, Any]:
+    """
+    Тело запроса экспорта OTLP/HTTP (JSON).
+
+    Args:
+        spans: Завершенные спаны
+
+    Returns:
+        Данные ExportTraceServiceRequest
+    """
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [_attribute("service.name", settings.TRACING_SERVICE_NAME)]},
+                "scopeSpans": [{"scope": {"name": "app"}, "spans": [span.to_otlp() for span in spans]}],
+            }
+        ]
+    }
+
+
+class OTLPSpanExporter:
+    """Экспорт спанов в коллектор по OTLP/HTTP (JSON)."""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self._client = httpx.Client(timeout=10.0)
+
+    def export(self, spans: List[Span]) -> None:
+        response = self._client.post(self.endpoint, json=otlp_payload(spans))
+        response.raise_for_status()
+
+
+class FileSpanExporter:
+    """
+    Экспорт спанов в файл: строка на пачку в формате OTLP/JSON.
+
+    Файл читается ресивером otlpjsonfile коллектора OpenTelemetry.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Span]) -> None:
+        line = json.dumps(otlp_payload(spans), ensure_ascii=False)
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write(line + "\n")
+
+
+class BatchSpanProcessor:
+    """Очередь завершенных спанов и фоновый поток их экспорта."""
+
+    def __init__(self, exporter: Any):
+        """
+        Инициализация обработчика.
+
+        Args:
+            exporter: Объект с методом export(spans)
+        """
+        self.exporter = exporter
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(EXPORT_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _ensure_thread(self) -> None:
+        """Запуск потока экспорта, в том числе заново после fork (воркеры Celery)."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(EXPORT_QUEUE_SIZE)
+            self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def submit(self, span: Span) -> None:
+        """Постановка спана в очередь экспорта."""
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[Span] = []
+            deadline = time.monotonic() + EXPORT_INTERVAL
+            while len(batch) < EXPORT_BATCH_SIZE:
+                try:
+                    span = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if span is None:
+                    stopping = True
+                    break
+                batch.append(span)
+            if batch:
+                self._export(batch)
+
+    def _export(self, batch: List[Span]) -> None:
+        try:
+            self.exporter.export(batch)
+        except Exception as e:
+            logger.warning("Error exporting spans", spans=len(batch), error=str(e))
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Экспорт оставшихся спанов и остановка потока."""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+        self._thread = None
+        self._pid = None
+
+
+_processor: Optional[BatchSpanProcessor] = None
+
+
+def _get_processor() -> BatchSpanProcessor:
+    """Обработчик спанов процесса (создается при первом спане)."""
+    global _processor
+    if _processor is None:
+        if settings.TRACING_EXPORTER == "file":
+            exporter: Any = FileSpanExporter(settings.TRACING_FILE_PATH)
+        else:
+            exporter = OTLPSpanExporter(settings.TRACING_OTLP_ENDPOINT)
+        _processor = BatchSpanProcessor(exporter)
+    return _processor
+
+
+def shutdown_tracing() -> None:
+    """Экспорт оставшихся спанов при остановке процесса."""
+    if _processor is not None:
+        _processor.shutdown()
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    """Текущий спан (None - трассировка не ведется)."""
+    return _current_span.get()
+
+
+def current_traceparent() -> Optional[str]:
+    """Заголовок traceparent текущего спана."""
+    span = _current_span.get()
+    return span.context.traceparent if span is not None else None
+
+
+def inject_traceparent(headers: MutableMapping[str, Any]) -> None:
+    """
+    Добавление заголовка traceparent текущего спана.
+
+    Args:
+        headers: Заголовки исходящего запроса или сообщения
+    """
+    traceparent = current_traceparent()
+    if traceparent is not None:
+        headers[TRACEPARENT_HEADER] = traceparent
+
+
+def start_span(
+    name: str,
+    kind: int = SPAN_KIND_INTERNAL,
+    parent: Optional[SpanContext] = None,
+    attributes: Optional[Dict[str, Any]] = None,
+) -> Span:
+    """
+    Создание спана (без активации в текущем контексте).
+
+    Args:
+        name: Имя операции
+        kind: Вид спана
+        parent: Родитель; по умолчанию - текущий спан, без него - новая трасса
+        attributes: Атрибуты спана
+
+    Returns:
+        Начатый спан
+    """
+    links: List[SpanContext] = []
+    current = _current_span.get()
+    if parent is None and current is not None:
+        parent = current.context
+    elif parent is not None and current is not None and current.context.trace_id != parent.trace_id:
+        # Явный родитель из другой трассы: текущий спан сохраняется ссылкой
+        links.append(current.context)
+
+    span_id = f"{random.getrandbits(64):016x}"
+    if parent is None:
+        context = SpanContext(
+            f"{random.getrandbits(128):032x}", span_id, random.random() < settings.TRACING_SAMPLE_RATE
+        )
+    else:
+        context = SpanContext(parent.trace_id, span_id, parent.sampled)
+    return Span(
+        name=name,
+        context=context,
+        kind=kind,
+        parent_span_id=parent.span_id if parent is not None else None,
+        attributes=dict(attributes or {}),
+        links=links,
+    )
+
+
+def _activate(span: Span) -> Tuple[Token, Mapping[str, Token]]:
+    """Спан становится текущим; идентификатор трассы добавляется в логи."""
+    return _current_span.set(span), structlog.contextvars.bind_contextvars(trace_id=span.context.trace_id)
+
+
+def _deactivate(tokens: Tuple[Token, Mapping[str, Token]]) -> None:
+    span_token, log_tokens = tokens
+    structlog.contextvars.reset_contextvars(**log_tokens)
+    _current_span.reset(span_token)
+
+
+@contextmanager
+def trace_span(
+    name: str,
+    kind: int = SPAN_KIND_INTERNAL,
+    parent: Optional[SpanContext] = None,
+    attributes: Optional[Dict[str, Any]] = None,
+) -> Iterator[Optional[Span]]:
+    """
+    Спан вокруг блока кода; исключение отмечает спан ошибкой.
+
+    Args:
+        name: Имя операции
+        kind: Вид спана
+        parent: Родитель; по умолчанию - текущий спан
+        attributes: Атрибуты спана
+
+    Yields:
+        Спан или None, если трассировка отключена
+    """
+    if not settings.TRACING_ENABLED:
+        yield None
+        return
+    span = start_span(name, kind, parent, attributes)
+    tokens = _activate(span)
+    try:
+        yield span
+    except Exception as e:
+        span.set_error(str(e))
+        raise
+    finally:
+        _deactivate(tokens)
+        span.end()
+
+
+def trace_context_key(name: str) -> str:
+    """Ключ Redis с сохраненным контекстом трассы."""
+    return f"{TRACE_CONTEXT_KEY_PREFIX}{name}"
+
+
+async def save_trace_context(name: str) -> None:
+    """
+    Сохранение контекста текущего спана для продолжения трассы позже.
+
+    Args:
+        name: Имя контекста (например, nlp:<request_id>)
+    """
+    traceparent = current_traceparent()
+    if traceparent is None:
+        return
+    try:
+        redis = await get_redis()
+        await redis.set(trace_context_key(name), traceparent, ex=TRACE_CONTEXT_TTL)
+    except Exception as e:
+        logger.warning("Error saving trace context", name=name, error=str(e))
+
+
+async def load_trace_context(name: str) -> Optional[SpanContext]:
+    """
+    Контекст, сохраненный save_trace_context.
+
+    Args:
+        name: Имя контекста
+
+    Returns:
+        Контекст спана или None
+    """
+    if not settings.TRACING_ENABLED:
+        return None
+    try:
+        redis = await get_redis()
+        value = await redis.get(trace_context_key(name))
+    except Exception as e:
+        logger.warning("Error loading trace context", name=name, error=str(e))
+        return None
+    if isinstance(value, bytes):
+        value = value.decode()
+    return parse_traceparent(value)
+
+
+# Спаны выполняемых задач процесса воркера
+_task_spans: Dict[str, Tuple[Span, Tuple[Token, Mapping[str, Token]]]] = {}
+
+
+def _on_before_task_publish(sender=None, headers=None, **kwargs):
+    """
+    Спан публикации задачи и передача его контекста в заголовках сообщения.
+
+    Спан завершается сразу: промежуток до спана выполнения задачи -
+    ожидание в очереди.
+    """
+    if not settings.TRACING_ENABLED or headers is None:
+        return
+    span = start_span(f"publish {sender}", SPAN_KIND_PRODUCER, attributes={"celery.task_name": sender})
+    headers[TRACEPARENT_HEADER] = span.context.traceparent
+    span.end()
+
+
+def _on_task_prerun(task_id=None, task=None, **kwargs):
+    """Спан выполнения задачи - продолжение трассы из заголовков сообщения."""
+    if not settings.TRACING_ENABLED:
+        return
+    parent = parse_traceparent(getattr(task.request, TRACEPARENT_HEADER, None))
+    span = start_span(
+        f"run {task.name}",
+        SPAN_KIND_CONSUMER,
+        parent,
+        attributes={"celery.task_name": task.name, "celery.task_id": task_id},
+    )
+    _task_spans[task_id] = (span, _activate(span))
+
+
+def _on_task_postrun(task_id=None, task=None, state=None, **kwargs):
+    entry = _task_spans.pop(task_id, None)
+    if entry is None:
+        return
+    span, tokens = entry
+    span.set_attribute("celery.state", state or "unknown")
+    if state == "FAILURE":
+        span.set_error("Task failed")
+    _deactivate(tokens)
+    span.end()
+
+
+def _on_worker_process_shutdown(**kwargs):
+    shutdown_tracing()
+
+
+def trace_celery() -> None:
+    """Подписка трассировки задач на сигналы Celery."""
+    before_task_publish.connect(_on_before_task_publish, weak=False)
+    task_prerun.connect(_on_task_prerun, weak=False)
+    task_postrun.connect(_on_task_postrun, weak=False)
+    worker_process_shutdown.connect(_on_worker_process_shutdown, weak=False)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк пропускной способности /health (запросов в секунду).
+
+По умолчанию запросы выполняются внутри процесса через ASGI транспорт
+к приложению с тем же стеком middleware, что и в app.main, - так
+измеряются накладные расходы middleware без сети и воркеров uvicorn.
+С --legacy собирается прежний стек на BaseHTTPMiddleware (та же работа
+в dispatch, что и до перехода на чистый ASGI) - для сравнения.
+С --url запросы идут к запущенному серверу.
+
+Примеры:
+    PYTHONPATH=. python scripts/benchmark_health.py
+    PYTHONPATH=. python scripts/benchmark_health.py --bare
+    PYTHONPATH=. python scripts/benchmark_health.py --legacy
+    PYTHONPATH=. python scripts/benchmark_health.py --url http://localhost:8000 --requests 20000
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+import httpx
+from fastapi import FastAPI
+
+
+def add_legacy_middleware(app: FastAPI) -> None:
+    """
+    Прежний стек middleware на BaseHTTPMiddleware.
+
+    Заголовки безопасности, логирование времени запроса и метрики
+    Prometheus с нормализацией пути - как в dispatch до перехода
+    middleware на чистый ASGI.
+
+    Args:
+        app: Приложение
+    """
+    from starlette.middleware.base import BaseHTTPMiddleware
+
+    from app.core.logging import get_logger
+    from app.middleware.security import SECURITY_HEADERS
+    from app.utils.metrics import http_request_duration_seconds, http_requests_total
+
+    logger = get_logger("benchmark.legacy")
+
+    class LegacySecurityHeadersMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request, call_next):
+            response = await call_next(request)
+            for name, value in SECURITY_HEADERS:
+                response.headers[name.decode()] = value.decode()
+            return response
+
+    class LegacyQueryLoggerMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request, call_next):
+            start_time = time.time()
+            response = await call_next(request)
+            duration = time.time() - start_time
+            logger.debug(
+                "Request processed",
+                path=request.url.path,
+                method=request.method,
+                duration=duration,
+                status_code=response.status_code,
+            )
+            response.headers["X-Response-Time"] = f"{duration:.3f}s"
+            return response
+
+    class LegacyMetricsMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request, call_next):
+            start_time = time.time()
+            response = await call_next(request)
+            duration = time.time() - start_time
+            endpoint = "/".join(
+                "{id}" if part and (part.isdigit() or len(part) == 36) else part
+                for part in request.url.path.split("/")
+            )
+            http_requests_total.labels(
+                method=request.method, endpoint=endpoint, status_code=response.status_code
+            ).inc()
+            http_request_duration_seconds.labels(method=request.method, endpoint=endpoint).observe(duration)
+            return response
+
+    app.add_middleware(LegacySecurityHeadersMiddleware)
+    app.add_middleware(LegacyQueryLoggerMiddleware)
+    app.add_middleware(LegacyMetricsMiddleware)
+
+
+def build_app(bare: bool, rate_limit: bool, legacy: bool = False) -> FastAPI:
+    """
+    Приложение с /health и production стеком middleware.
+
+    Args:
+        bare: Без middleware (базовая линия)
+        rate_limit: Подключить rate limiting (нужен Redis)
+        legacy: Прежний стек на BaseHTTPMiddleware вместо текущего
+
+    Returns:
+        ASGI приложение
+    """
+    from app.core.logging import setup_logging
+    from app.middleware.metrics import MetricsMiddleware
+    from app.middleware.query_logger import QueryLoggerMiddleware
+    from app.middleware.rate_limit import RateLimitMiddleware
+    from app.middleware.security import SecurityHeadersMiddleware
+
+    setup_logging()
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "ok"}
+
+    if legacy:
+        add_legacy_middleware(app)
+    elif not bare:
+        if rate_limit:
+            app.add_middleware(RateLimitMiddleware, calls=10**9)
+        app.add_middleware(SecurityHeadersMiddleware)
+        app.add_middleware(QueryLoggerMiddleware)
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def run(client: httpx.AsyncClient, total: int, concurrency: int) -> float:
+    """
+    Выполнение запросов с заданной параллельностью.
+
+    Args:
+        client: HTTP клиент
+        total: Общее количество запросов
+        concurrency: Количество одновременных запросов
+
+    Returns:
+        Запросов в секунду
+    """
+    remaining = total
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            response = await client.get("/health")
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return total / (time.perf_counter() - started)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк RPS на /health")
+    parser.add_argument("--url", help="URL запущенного сервера (по умолчанию - внутри процесса)")
+    parser.add_argument("--requests", type=int, default=5000, help="Количество запросов")
+    parser.add_argument("--concurrency", type=int, default=50, help="Параллельность")
+    parser.add_argument("--bare", action="store_true", help="Без middleware (базовая линия)")
+    parser.add_argument("--legacy", action="store_true", help="Прежний стек на BaseHTTPMiddleware")
+    parser.add_argument("--rate-limit", action="store_true", help="С rate limiting (нужен Redis)")
+    args = parser.parse_args()
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url)
+    else:
+        app = build_app(args.bare, args.rate_limit, args.legacy)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+    # Лог каждого запроса клиента httpx исказил бы измерение
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    async with client:
+        # Прогрев
+        await run(client, min(500, args.requests), args.concurrency)
+        rps = await run(client, args.requests, args.concurrency)
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}: {rps:.0f} req/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,6 +3,10 @@
 Используется для создания начальных таблиц без миграций (для разработки).
 """
 import asyncio
+
+from alembic import command
+from alembic.config import Config
+
 from app.core.database import init_db, engine
 from app.models import *  # noqa: F401, F403
 
@@ -17,8 +21,5 @@ async def main():
 
 if __name__ == "__main__":
     asyncio.run(main())
-
-
-
-
-
+    # Таблицы созданы по текущим моделям - миграции считаются примененными
+    command.stamp(Config("alembic.ini"), "head")
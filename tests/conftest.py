@@ -1,6 +1,8 @@
 """
 Конфигурация для pytest.
 """
+from contextlib import contextmanager
+
 import pytest
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
@@ -10,7 +12,9 @@ from app.main import app
 from app.core.database import Base, get_db
 from app.core.redis import get_redis
 from app.models.user import User
+from app.utils.instrumentation import instrument_engine
 from app.utils.password import get_password_hash
+from app.utils.query_profiler import profile_queries
 
 
 # Тестовая БД (in-memory SQLite для тестов)
@@ -22,6 +26,9 @@ test_engine = create_async_engine(
     poolclass=StaticPool,
 )
 
+# Запросы тестовой БД учитываются профилировщиком (фикстура max_queries)
+instrument_engine(test_engine)
+
 TestSessionLocal = async_sessionmaker(
     test_engine,
     class_=AsyncSession,
@@ -94,3 +101,25 @@ async def test_user(db_session: AsyncSession) -> User:
     await db_session.refresh(user)
     return user
 
+
+
+@pytest.fixture
+def max_queries():
+    """
+    Проверка максимального количества SQL запросов блока.
+
+    Пример:
+        with max_queries(5):
+            await client.get("/api/v1/reports/", headers=headers)
+    """
+    @contextmanager
+    def _max_queries(limit: int):
+        with profile_queries() as stats:
+            yield stats
+        statement, repeats = stats.most_repeated()
+        assert stats.count <= limit, (
+            f"Выполнено {stats.count} SQL запросов при лимите {limit}; "
+            f"чаще всего ({repeats} раз): {statement}"
+        )
+
+    return _max_queries
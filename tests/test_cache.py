@@ -0,0 +1,370 @@
+"""
+Тесты для двухуровневого кеша.
+"""
+import json
+
+import pytest
+
+from app.services import cache as cache_module
+from app.services.cache import CacheService, LocalCache, apply_invalidation, local_cache
+from app.utils import cache_codec
+
+
+@pytest.fixture(autouse=True)
+def clear_local_cache():
+    """Очистка кеша процесса между тестами."""
+    local_cache.clear()
+    yield
+    local_cache.clear()
+
+
+def test_local_cache_evicts_least_recently_used():
+    """Тест вытеснения давно не использованных записей."""
+    cache = LocalCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" становится самой свежей записью
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_local_cache_expires_entries(monkeypatch):
+    """Тест истечения времени жизни записей."""
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+
+    cache = LocalCache(max_entries=10, ttl=30)
+    cache.set("short", "value", ttl=5)
+    cache.set("long", "value", ttl=3600)  # Ограничивается TTL кеша процесса
+
+    now[0] += 10
+    assert cache.get("short") is None
+    assert cache.get("long") == "value"
+
+    now[0] += 30
+    assert cache.get("long") is None
+
+
+def test_invalidation_message_removes_matching_keys():
+    """Тест применения сообщений pub/sub об инвалидации."""
+    local_cache.set("documents:user:1:page:1", "[]")
+    local_cache.set("documents:user:2:page:1", "[]")
+    local_cache.set("document:10:user:1", "{}")
+
+    apply_invalidation(json.dumps({"pattern": "documents:user:1:*"}))
+    apply_invalidation(json.dumps({"key": "document:10:user:1"}))
+
+    assert local_cache.get("documents:user:1:page:1") is None
+    assert local_cache.get("document:10:user:1") is None
+    assert local_cache.get("documents:user:2:page:1") == "[]"
+
+
+@pytest.mark.asyncio
+async def test_local_hit_does_not_touch_redis(monkeypatch):
+    """Тест чтения из кеша процесса без обращения к Redis."""
+    async def unavailable_redis():
+        raise AssertionError("Redis не должен вызываться при попадании в кеш процесса")
+
+    monkeypatch.setattr(cache_module, "get_redis", unavailable_redis)
+    local_cache.set("document:1:user:1", cache_codec.encode({"id": "1"}, cache_codec.get_codec("json"), 4096))
+
+    assert await CacheService.get("document:1:user:1") == {"id": "1"}
+
+
+class _MemoryRedis:
+    """Минимальная замена Redis для проверки счетчиков поколений."""
+
+    def __init__(self):
+        self.data = {}
+        self.published = []
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, "0")) + 1)
+        return int(self.data[key])
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+    async def publish(self, channel, message):
+        self.published.append((channel, json.loads(message)))
+
+
+@pytest.mark.asyncio
+async def test_bump_generation_changes_versioned_key(monkeypatch):
+    """Тест инвалидации списков увеличением поколения вместо перебора ключей."""
+    redis = _MemoryRedis()
+
+    async def get_redis():
+        return redis
+
+    monkeypatch.setattr(cache_module, "get_redis", get_redis)
+
+    first = await CacheService.versioned_key("documents:user:1", "page:1")
+    assert first == "documents:user:1:v0:page:1"
+
+    assert await CacheService.bump_generation("documents:user:1")
+    second = await CacheService.versioned_key("documents:user:1", "page:1")
+    assert second == "documents:user:1:v1:page:1"
+
+    # Остальные процессы сбрасывают закешированное поколение по pub/sub
+    assert redis.published[-1][1] == {"key": "cache:gen:documents:user:1"}
+
+
+@pytest.mark.parametrize("codec_name", ["json", "orjson", "msgpack"])
+def test_codec_roundtrip(codec_name):
+    """Тест кодеков (недоступные библиотеки заменяются стандартным json)."""
+    codec = cache_codec.get_codec(codec_name)
+    value = {"items": [{"id": "1", "name": "Выписка"}], "total": 1}
+
+    assert cache_codec.decode(cache_codec.encode(value, codec, 4096)) == value
+
+
+def test_large_values_are_compressed():
+    """Тест сжатия больших значений."""
+    value = {"text": "a" * 10000}
+    data = cache_codec.encode(value, cache_codec.get_codec("json"), 1024)
+
+    assert data[1:2] == cache_codec.COMPRESSED
+    assert len(data) < 1000
+    assert cache_codec.decode(data) == value
+
+
+def test_legacy_json_value_is_readable():
+    """Тест чтения значений, записанных до появления конверта кодека."""
+    assert cache_codec.decode(b'{"total": 3}') == {"total": 3}
+
+
+@pytest.mark.asyncio
+async def test_model_roundtrip_from_local_cache(monkeypatch):
+    """Тест быстрого пути для pydantic моделей."""
+    from datetime import datetime
+    from uuid import uuid4
+
+    from app.schemas.document import DocumentListResponse, DocumentResponse
+
+    redis = _MemoryBinaryRedis()
+
+    async def get_redis_binary():
+        return redis
+
+    monkeypatch.setattr(cache_module, "get_redis_binary", get_redis_binary)
+
+    document = DocumentResponse(
+        id=uuid4(),
+        user_id=uuid4(),
+        original_filename="scan.pdf",
+        stored_filename="blobs/ab/cd/hash",
+        file_size=10,
+        mime_type="application/pdf",
+        file_hash="hash",
+        status="pending",
+        created_at=datetime(2024, 1, 1),
+        updated_at=datetime(2024, 1, 1),
+    )
+    response = DocumentListResponse(items=[document], total=1, page=1, page_size=20, pages=1)
+
+    assert await CacheService.set_model("documents:user:1:v0:page:1", response, ttl=60)
+    local_cache.clear()
+
+    cached = await CacheService.get_model("documents:user:1:v0:page:1", DocumentListResponse)
+    assert cached == response
+    assert isinstance(cached.items[0], DocumentResponse)
+
+
+
+def _request(headers: dict = None):
+    """HTTP запрос с заданными заголовками."""
+    from starlette.requests import Request
+
+    raw_headers = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw_headers})
+
+
+@pytest.mark.asyncio
+async def test_cached_response_is_served_as_bytes_with_etag(monkeypatch):
+    """Тест отдачи готового тела ответа из кеша и 304 по If-None-Match."""
+    from app.schemas.document import DocumentListResponse
+    from app.utils.response_cache import cached_json_response
+
+    redis = _MemoryBinaryRedis()
+
+    async def get_redis_binary():
+        return redis
+
+    monkeypatch.setattr(cache_module, "get_redis_binary", get_redis_binary)
+
+    result = DocumentListResponse(items=[], total=0, page=1, page_size=20, pages=0)
+    renders = []
+
+    async def render(session):
+        renders.append(session)
+        return result
+
+    key = "documents:user:1:v0:page:1"
+    first = await cached_json_response(_request(), key, render, None, ttl=60)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    local_cache.clear()
+    cached = await cached_json_response(_request(), key, render, None, ttl=60)
+    assert cached.status_code == 200
+    assert cached.body == result.model_dump_json().encode()
+    assert cached.headers["etag"] == etag
+
+    not_modified = await cached_json_response(_request({"If-None-Match": etag}), key, render, None, ttl=60)
+    assert not_modified.status_code == 304
+    assert not_modified.body == b""
+    assert len(renders) == 1
+
+
+@pytest.mark.asyncio
+async def test_owned_response_is_served_only_to_owner(monkeypatch):
+    """Тест кеша детального ответа с проверкой владельца без обращения к БД."""
+    from uuid import uuid4
+
+    from app.schemas.document import DocumentListResponse
+    from app.utils.response_cache import get_owned_response, store_owned_response
+
+    redis = _MemoryBinaryRedis()
+
+    async def get_redis_binary():
+        return redis
+
+    monkeypatch.setattr(cache_module, "get_redis_binary", get_redis_binary)
+
+    owner_id, other_id = uuid4(), uuid4()
+    result = DocumentListResponse(items=[], total=0, page=1, page_size=20, pages=0)
+    key = f"report:{uuid4()}"
+    assert await get_owned_response(_request(), key, owner_id) is None
+
+    stored = await store_owned_response(_request(), key, owner_id, result, ttl=60)
+    local_cache.clear()
+
+    cached = await get_owned_response(_request(), key, owner_id)
+    assert cached.body == result.model_dump_json().encode()
+    assert cached.headers["etag"] == stored.headers["etag"]
+    assert await get_owned_response(_request(), key, other_id) is None
+
+    not_modified = await get_owned_response(_request({"If-None-Match": stored.headers["etag"]}), key, owner_id)
+    assert not_modified.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_report_view_stored_after_document_delete_is_not_served(monkeypatch):
+    """Тест: ответ, сохраненный после параллельного удаления документа, не отдается."""
+    from uuid import uuid4
+
+    from app.schemas.document import DocumentListResponse
+    from app.services.cache_invalidation import on_document_deleted, report_view_key
+    from app.services.events import DocumentDeleted
+    from app.utils.response_cache import get_owned_response, store_owned_response
+
+    redis, binary_redis = _MemoryRedis(), _MemoryBinaryRedis()
+
+    async def get_redis():
+        return redis
+
+    async def get_redis_binary():
+        return binary_redis
+
+    monkeypatch.setattr(cache_module, "get_redis", get_redis)
+    monkeypatch.setattr(cache_module, "get_redis_binary", get_redis_binary)
+
+    user_id, report_id = uuid4(), uuid4()
+    result = DocumentListResponse(items=[], total=0, page=1, page_size=20, pages=0)
+
+    # Запрос получил ключ и прочитал отчет, затем документ удален
+    key = await report_view_key(user_id, report_id)
+    await on_document_deleted(DocumentDeleted(user_id=user_id, document_id=uuid4(), report_ids=(report_id,)))
+    await store_owned_response(_request(), key, user_id, result, ttl=60)
+    local_cache.clear()
+
+    assert await get_owned_response(_request(), await report_view_key(user_id, report_id), user_id) is None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_compute_once(monkeypatch):
+    """Тест объединения одновременных промахов (single-flight)."""
+    import asyncio
+
+    redis = _MemoryBinaryRedis()
+
+    async def get_redis_binary():
+        return redis
+
+    monkeypatch.setattr(cache_module, "get_redis_binary", get_redis_binary)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return b"value"
+
+    results = await asyncio.gather(
+        *[CacheService.get_or_compute_raw("reports:user:1:v0:page:1", compute, ttl=60) for _ in range(10)]
+    )
+
+    assert results == [b"value"] * 10
+    assert len(calls) == 1
+    assert not redis.data.get("cache:lock:reports:user:1:v0:page:1")
+
+
+@pytest.mark.asyncio
+async def test_stale_value_is_served_while_revalidating(monkeypatch):
+    """Тест stale-while-revalidate: устаревшее значение отдается, обновление идет в фоне."""
+    import asyncio
+
+    redis = _MemoryBinaryRedis()
+
+    async def get_redis_binary():
+        return redis
+
+    monkeypatch.setattr(cache_module, "get_redis_binary", get_redis_binary)
+    key = "documents:user:1:v0:page:1"
+    await CacheService.set_raw(key, b"0|old", ttl=60)  # Время свежести давно прошло
+    refreshed = asyncio.Event()
+
+    async def compute():
+        raise AssertionError("Вычисление в запросе не ожидается")
+
+    async def refresh():
+        refreshed.set()
+        return b"new"
+
+    value = await CacheService.get_or_compute_raw(key, compute, ttl=60, stale_ttl=30, refresh=refresh)
+    assert value == b"old"
+
+    await asyncio.wait_for(refreshed.wait(), timeout=1)
+    await asyncio.sleep(0)
+    assert await CacheService.get_or_compute_raw(key, compute, ttl=60, stale_ttl=30) == b"new"
+
+
+class _MemoryBinaryRedis:
+    """Минимальная замена бинарного клиента Redis."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    async def set(self, key, value, nx=False, px=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def eval(self, script, numkeys, key, token):
+        if self.data.get(key) == token:
+            del self.data[key]
+            return 1
+        return 0
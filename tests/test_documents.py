@@ -4,12 +4,16 @@
 import io
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.document import Document, DocumentStatus
+from app.models.document import Document, DocumentStatus, MediaStatus
+from app.models.file_blob import FileBlob
 from app.models.user import User
 from app.services.document import DocumentService
 from app.schemas.document import DocumentFilterParams
+from app.services import document as document_service
+from app.utils.file import get_blob_filename, get_thumbnail_filename
 from app.utils.password import get_password_hash
 
 
@@ -43,6 +47,7 @@ async def test_upload_document_success(client: AsyncClient, test_user: User, db_
     assert data["file_size"] == len(file_content)
     assert data["mime_type"] == "application/pdf"
     assert data["status"] == "pending"
+    assert data["media_status"] == "ready"
 
 
 @pytest.mark.asyncio
@@ -332,31 +337,322 @@ async def test_document_service_get_by_user(db_session: AsyncSession, test_user:
 
 
 @pytest.mark.asyncio
-async def test_document_service_check_duplicate(db_session: AsyncSession, test_user: User):
-    """Тест проверки дубликатов."""
-    file_hash = "test_hash_123"
-
-    # Создаем первый документ
-    doc1 = await DocumentService.create_document(
+async def test_document_service_create_duplicate_returns_none(db_session: AsyncSession, test_user: User):
+    """Тест отклонения дубликата на уровне уникального ключа (user_id, file_hash)."""
+    first = await DocumentService.create_document(
         db=db_session,
         user_id=test_user.id,
         original_filename="test1.pdf",
         stored_filename="stored1.pdf",
         file_size=100,
         mime_type="application/pdf",
+        file_hash="same_hash",
+    )
+    assert first is not None
+
+    duplicate = await DocumentService.create_document(
+        db=db_session,
+        user_id=test_user.id,
+        original_filename="test2.pdf",
+        stored_filename="stored2.pdf",
+        file_size=100,
+        mime_type="application/pdf",
+        file_hash="same_hash",
+    )
+    assert duplicate is None
+
+
+@pytest.mark.asyncio
+async def test_blob_filename_is_sharded():
+    """Тест шардирования имени блоба по хешу."""
+    file_hash = "abcdef" + "0" * 58
+    assert get_blob_filename(file_hash) == f"blobs/ab/cd/{file_hash}"
+
+
+@pytest.mark.asyncio
+async def test_document_service_blob_ref_count(db_session: AsyncSession, test_user: User):
+    """Тест подсчета ссылок на общий блоб у разных пользователей."""
+    other_user = User(
+        email="other@example.com",
+        password_hash=get_password_hash("otherpassword123"),
+        is_active=True,
+    )
+    db_session.add(other_user)
+    await db_session.commit()
+
+    file_hash = "f" * 64
+    stored_filename = get_blob_filename(file_hash)
+    documents = []
+    for user in (test_user, other_user):
+        documents.append(
+            await DocumentService.create_document(
+                db=db_session,
+                user_id=user.id,
+                original_filename="form.pdf",
+                stored_filename=stored_filename,
+                file_size=100,
+                mime_type="application/pdf",
+                file_hash=file_hash,
+            )
+        )
+
+    blob = (await db_session.execute(select(FileBlob))).scalar_one()
+    await db_session.refresh(blob)
+    assert blob.ref_count == 2
+    assert all(doc.stored_filename == stored_filename for doc in documents)
+
+    await DocumentService.delete_document(db_session, documents[0].id, test_user.id)
+    await db_session.refresh(blob)
+    assert blob.ref_count == 1
+
+    await DocumentService.delete_document(db_session, documents[1].id, other_user.id)
+    remaining = (await db_session.execute(select(FileBlob))).scalar_one_or_none()
+    assert remaining is None
+
+
+@pytest.mark.asyncio
+async def test_blob_files_deleted_only_after_commit(
+    db_session: AsyncSession, test_user: User, monkeypatch
+):
+    """Тест сохранения файлов блоба при откате удаления документа."""
+    deleted = []
+
+    async def record_delete(stored_filename):
+        deleted.append(stored_filename)
+
+    monkeypatch.setattr(document_service, "delete_file", record_delete)
+
+    file_hash = "e" * 64
+    stored_filename = get_blob_filename(file_hash)
+    document = await DocumentService.create_document(
+        db=db_session,
+        user_id=test_user.id,
+        original_filename="form.pdf",
+        stored_filename=stored_filename,
+        file_size=100,
+        mime_type="application/pdf",
         file_hash=file_hash,
     )
+    document_id, user_id = document.id, test_user.id
+
+    async def failing_commit():
+        raise RuntimeError("commit failed")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(db_session, "commit", failing_commit)
+        with pytest.raises(RuntimeError):
+            await DocumentService.delete_document(db_session, document_id, user_id)
+    await db_session.rollback()
+    assert deleted == []
+
+    assert await DocumentService.delete_document(db_session, document_id, user_id)
+    assert deleted == [stored_filename, get_thumbnail_filename(file_hash)]
+    assert (await db_session.execute(select(FileBlob))).scalar_one_or_none() is None
+
+
+@pytest.mark.asyncio
+async def test_upload_document_with_media_pipeline(
+    client: AsyncClient, test_user: User, monkeypatch
+):
+    """Тест загрузки с фоновым конвейером обработки файла."""
+    from app.api.v1.endpoints import documents as documents_endpoint
+    from app.core.config import settings
+
+    scheduled = []
+    monkeypatch.setattr(settings, "MEDIA_PIPELINE_ENABLED", True)
+    monkeypatch.setattr(documents_endpoint, "start_media_pipeline", scheduled.append)
+
+    login_response = await client.post(
+        "/api/v1/auth/login",
+        json={
+            "email": test_user.email,
+            "password": "testpassword123",
+        },
+    )
+    access_token = login_response.json()["access_token"]
+
+    files = {"file": ("pipeline.pdf", io.BytesIO(b"Pipeline PDF content"), "application/pdf")}
+    response = await client.post(
+        "/api/v1/documents/upload",
+        headers={"Authorization": f"Bearer {access_token}"},
+        files=files,
+    )
+
+    assert response.status_code == 201
+    data = response.json()
+    assert data["media_status"] == "queued"
+    assert data["has_thumbnail"] is False
+    assert [str(document_id) for document_id in scheduled] == [data["id"]]
+
+
+@pytest.mark.asyncio
+async def test_document_service_update_media_status(db_session: AsyncSession, test_user: User):
+    """Тест обновления этапа обработки и результатов конвейера."""
+    document = await DocumentService.create_document(
+        db=db_session,
+        user_id=test_user.id,
+        original_filename="scan.pdf",
+        stored_filename="stored_scan.pdf",
+        file_size=100,
+        mime_type="application/pdf",
+        file_hash="media_hash",
+        media_status=MediaStatus.QUEUED,
+    )
+    assert document.media_status == MediaStatus.QUEUED
+
+    updated = await DocumentService.update_media_status(
+        db_session,
+        document.id,
+        MediaStatus.READY,
+        page_count=3,
+        media_metadata={"pdf_version": "1.7"},
+        thumbnail_filename="thumbnails/me/di/media_hash.jpg",
+    )
+
+    assert updated.media_status == MediaStatus.READY
+    assert updated.page_count == 3
+    assert updated.media_metadata == {"pdf_version": "1.7"}
+    assert updated.has_thumbnail
+
+
+@pytest.mark.asyncio
+async def test_replaced_content_keeps_upload_hash(
+    db_session: AsyncSession, test_user: User, monkeypatch
+):
+    """Тест: после оптимизации повторная загрузка исходного файла остается дубликатом."""
+    async def skip_delete(stored_filename):
+        pass
+
+    async def skip_save(stored_filename, file_content):
+        pass
+
+    monkeypatch.setattr(document_service, "delete_file", skip_delete)
+    monkeypatch.setattr(document_service, "save_blob", skip_save)
+
+    upload_hash, optimized_hash = "1" * 64, "2" * 64
+    document = await DocumentService.create_document(
+        db=db_session,
+        user_id=test_user.id,
+        original_filename="scan.jpg",
+        stored_filename=get_blob_filename(upload_hash),
+        file_size=1000,
+        mime_type="image/jpeg",
+        file_hash=upload_hash,
+    )
+    assert document.content_hash == upload_hash
 
-    # Проверяем дубликат
-    duplicate = await DocumentService.check_duplicate_by_hash(db_session, file_hash, test_user.id)
-    assert duplicate is not None
-    assert duplicate.id == doc1.id
+    await DocumentService.replace_document_content(
+        db_session, document, optimized_hash, get_blob_filename(optimized_hash), b"x" * 400
+    )
+    assert (document.file_hash, document.content_hash) == (upload_hash, optimized_hash)
+    assert document.stored_filename == get_blob_filename(optimized_hash)
 
-    # Проверяем другой хеш
-    no_duplicate = await DocumentService.check_duplicate_by_hash(db_session, "other_hash", test_user.id)
-    assert no_duplicate is None
+    blob = (await db_session.execute(select(FileBlob))).scalar_one()
+    assert blob.file_hash == optimized_hash
+
+    duplicate = await DocumentService.create_document(
+        db=db_session,
+        user_id=test_user.id,
+        original_filename="scan-again.jpg",
+        stored_filename=get_blob_filename(upload_hash),
+        file_size=1000,
+        mime_type="image/jpeg",
+        file_hash=upload_hash,
+    )
+    assert duplicate is None
 
 
+@pytest.mark.parametrize("purge_first", [True, False])
+@pytest.mark.asyncio
+async def test_replace_content_overlapping_purge(
+    db_session: AsyncSession, test_user: User, monkeypatch, purge_first: bool
+):
+    """Тест: удаление блоба без ссылок параллельно с заменой не оставляет документ без файла."""
+    files = set()
+
+    async def fake_save(stored_filename, file_content):
+        exists = stored_filename in files
+        if not purge_first:
+            # Удаление блоба без ссылок успевает между проверкой и записью файла
+            await DocumentService._purge_blob(db_session, optimized_hash, optimized_filename)
+        if not exists:
+            files.add(stored_filename)
+
+    async def fake_delete(stored_filename):
+        files.discard(stored_filename)
+
+    monkeypatch.setattr(document_service, "save_blob", fake_save)
+    monkeypatch.setattr(document_service, "delete_file", fake_delete)
+
+    upload_hash, optimized_hash = "3" * 64, "4" * 64
+    optimized_filename = get_blob_filename(optimized_hash)
+    document = await DocumentService.create_document(
+        db=db_session,
+        user_id=test_user.id,
+        original_filename="scan.jpg",
+        stored_filename=get_blob_filename(upload_hash),
+        file_size=1000,
+        mime_type="image/jpeg",
+        file_hash=upload_hash,
+    )
+
+    # Последняя ссылка на оптимизированное содержимое только что освобождена
+    db_session.add(FileBlob(
+        file_hash=optimized_hash,
+        stored_filename=optimized_filename,
+        file_size=400,
+        ref_count=0,
+    ))
+    await db_session.commit()
+    files.add(optimized_filename)
+    if purge_first:
+        await DocumentService._purge_blob(db_session, optimized_hash, optimized_filename)
+
+    await DocumentService.replace_document_content(
+        db_session, document, optimized_hash, optimized_filename, b"x" * 400
+    )
 
+    assert document.stored_filename == optimized_filename
+    assert optimized_filename in files
+    blob = (
+        await db_session.execute(select(FileBlob).where(FileBlob.file_hash == optimized_hash))
+    ).scalar_one()
+    assert blob.ref_count == 1
 
 
+@pytest.mark.asyncio
+async def test_replace_content_keeps_old_blob_when_save_fails(
+    db_session: AsyncSession, test_user: User, monkeypatch
+):
+    """Тест: при ошибке записи нового блоба документ остается со старым содержимым."""
+    deleted = []
+
+    async def failing_save(stored_filename, file_content):
+        raise OSError("storage unavailable")
+
+    async def record_delete(stored_filename):
+        deleted.append(stored_filename)
+
+    monkeypatch.setattr(document_service, "save_blob", failing_save)
+    monkeypatch.setattr(document_service, "delete_file", record_delete)
+
+    upload_hash, optimized_hash = "5" * 64, "6" * 64
+    document = await DocumentService.create_document(
+        db=db_session,
+        user_id=test_user.id,
+        original_filename="scan.jpg",
+        stored_filename=get_blob_filename(upload_hash),
+        file_size=1000,
+        mime_type="image/jpeg",
+        file_hash=upload_hash,
+    )
+
+    with pytest.raises(OSError):
+        await DocumentService.replace_document_content(
+            db_session, document, optimized_hash, get_blob_filename(optimized_hash), b"x" * 400
+        )
+
+    assert document.content_hash == upload_hash
+    assert get_blob_filename(upload_hash) not in deleted
+    blob = (await db_session.execute(select(FileBlob))).scalar_one()
+    assert (blob.file_hash, blob.ref_count) == (upload_hash, 1)
@@ -0,0 +1,127 @@
+"""
+Тесты для отдачи файлов с поддержкой Range и условных запросов.
+"""
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI, Request
+from httpx import AsyncClient
+
+from app.utils.download import build_etag, build_file_response, parse_range_header
+
+CONTENT = bytes(range(256)) * 4
+LAST_MODIFIED = datetime(2024, 1, 15, 12, 0, 0)
+ETAG = build_etag("a" * 64)
+
+
+@pytest.fixture
+def download_client(tmp_path):
+    """Клиент для приложения, отдающего один файл."""
+    path = tmp_path / "blob"
+    path.write_bytes(CONTENT)
+
+    app = FastAPI()
+
+    @app.get("/file")
+    async def get_file(request: Request):
+        return build_file_response(
+            request,
+            str(path),
+            len(CONTENT),
+            ETAG,
+            last_modified=LAST_MODIFIED,
+            media_type="application/pdf",
+            filename="отчет.pdf",
+        )
+
+    return AsyncClient(app=app, base_url="http://test")
+
+
+def test_parse_range_header():
+    """Тест разбора заголовка Range."""
+    assert parse_range_header("bytes=0-99", 1000) == (0, 99)
+    assert parse_range_header("bytes=900-", 1000) == (900, 999)
+    assert parse_range_header("bytes=-100", 1000) == (900, 999)
+    assert parse_range_header("bytes=500-5000", 1000) == (500, 999)
+    assert parse_range_header("bytes=1000-", 1000) is None
+    with pytest.raises(ValueError):
+        parse_range_header("bytes=0-1,5-6", 1000)
+    with pytest.raises(ValueError):
+        parse_range_header("items=0-1", 1000)
+
+
+@pytest.mark.asyncio
+async def test_full_download(download_client: AsyncClient):
+    """Тест полной отдачи файла с валидаторами кеша."""
+    response = await download_client.get("/file")
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["etag"] == ETAG
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["last-modified"] == "Mon, 15 Jan 2024 12:00:00 GMT"
+    assert response.headers["content-disposition"] == (
+        "attachment; filename=\"_____.pdf\"; filename*=UTF-8''%D0%BE%D1%82%D1%87%D0%B5%D1%82.pdf"
+    )
+
+
+@pytest.mark.asyncio
+async def test_range_download(download_client: AsyncClient):
+    """Тест частичной отдачи файла."""
+    response = await download_client.get("/file", headers={"Range": "bytes=100-199"})
+
+    assert response.status_code == 206
+    assert response.content == CONTENT[100:200]
+    assert response.headers["content-range"] == f"bytes 100-199/{len(CONTENT)}"
+    assert response.headers["content-length"] == "100"
+
+
+@pytest.mark.asyncio
+async def test_range_not_satisfiable(download_client: AsyncClient):
+    """Тест невыполнимого диапазона."""
+    response = await download_client.get("/file", headers={"Range": f"bytes={len(CONTENT)}-"})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+
+@pytest.mark.asyncio
+async def test_if_range_mismatch_returns_full_file(download_client: AsyncClient):
+    """Тест If-Range с устаревшим ETag: отдается файл целиком."""
+    response = await download_client.get(
+        "/file", headers={"Range": "bytes=0-9", "If-Range": '"stale"'}
+    )
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+@pytest.mark.asyncio
+async def test_conditional_requests(download_client: AsyncClient):
+    """Тест If-None-Match и If-Modified-Since."""
+    response = await download_client.get("/file", headers={"If-None-Match": ETAG})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    response = await download_client.get(
+        "/file", headers={"If-Modified-Since": "Mon, 15 Jan 2024 12:00:00 GMT"}
+    )
+    assert response.status_code == 304
+
+    response = await download_client.get(
+        "/file", headers={"If-Modified-Since": "Sun, 14 Jan 2024 12:00:00 GMT"}
+    )
+    assert response.status_code == 200
+
+    # Зона "-0000" дает naive datetime при разборе
+    response = await download_client.get(
+        "/file", headers={"If-Modified-Since": "Mon, 15 Jan 2024 12:00:00 -0000"}
+    )
+    assert response.status_code == 304
+
+    # If-None-Match имеет приоритет над If-Modified-Since
+    response = await download_client.get(
+        "/file",
+        headers={"If-None-Match": '"other"', "If-Modified-Since": "Mon, 15 Jan 2024 12:00:00 GMT"},
+    )
+    assert response.status_code == 200
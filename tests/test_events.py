@@ -0,0 +1,93 @@
+"""
+Тесты для доменных событий и инвалидации кеша.
+"""
+from uuid import uuid4
+
+import pytest
+
+from app.services import events
+from app.services.cache import CacheService
+from app.services.cache_invalidation import on_document_deleted, on_report_status_changed
+from app.services.events import DocumentDeleted, ReportStatusChanged, publish, subscribe
+
+
+@pytest.fixture
+def isolated_handlers(monkeypatch):
+    """Пустой реестр подписчиков на время теста."""
+    monkeypatch.setattr(events, "_handlers", {})
+
+
+@pytest.fixture
+def cache_calls(monkeypatch):
+    """Запись обращений к кешу вместо Redis."""
+    calls = []
+
+    async def delete(key):
+        calls.append(("delete", key))
+        return True
+
+    async def bump_generation(namespace):
+        calls.append(("bump", namespace))
+        return True
+
+    async def get_generation(namespace):
+        return 0
+
+    monkeypatch.setattr(CacheService, "delete", staticmethod(delete))
+    monkeypatch.setattr(CacheService, "bump_generation", staticmethod(bump_generation))
+    monkeypatch.setattr(CacheService, "get_generation", staticmethod(get_generation))
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_publish_calls_subscribers_and_isolates_errors(isolated_handlers):
+    """Тест доставки события и изоляции ошибок подписчиков."""
+    received = []
+
+    async def failing(event):
+        raise RuntimeError("boom")
+
+    async def recording(event):
+        received.append(event)
+
+    subscribe(ReportStatusChanged, failing)
+    subscribe(ReportStatusChanged, recording)
+    subscribe(ReportStatusChanged, recording)  # Повторная подписка игнорируется
+
+    event = ReportStatusChanged(user_id=uuid4(), report_id=uuid4(), document_id=uuid4(), status="completed")
+    await publish(event)
+    await publish(DocumentDeleted(user_id=uuid4(), document_id=uuid4()))
+
+    assert received == [event]
+
+
+@pytest.mark.asyncio
+async def test_report_status_change_evicts_affected_keys(cache_calls):
+    """Тест точечной инвалидации кеша при смене статуса отчета."""
+    user_id, report_id, document_id = uuid4(), uuid4(), uuid4()
+    await on_report_status_changed(
+        ReportStatusChanged(user_id=user_id, report_id=report_id, document_id=document_id, status="completed")
+    )
+
+    assert set(cache_calls) == {
+        ("bump", f"reports:user:{user_id}"),
+        ("delete", f"report_views:user:{user_id}:v0:report:{report_id}"),
+        ("delete", f"pdf_report:{report_id}"),
+        ("delete", f"document:{document_id}:user:{user_id}"),
+        ("bump", f"documents:user:{user_id}"),
+    }
+
+
+@pytest.mark.asyncio
+async def test_document_deleted_evicts_document_and_report_lists(cache_calls):
+    """Тест инвалидации кеша при удалении документа."""
+    user_id, document_id, report_id = uuid4(), uuid4(), uuid4()
+    await on_document_deleted(DocumentDeleted(user_id=user_id, document_id=document_id, report_ids=(report_id,)))
+
+    assert set(cache_calls) == {
+        ("delete", f"document:{document_id}:user:{user_id}"),
+        ("bump", f"documents:user:{user_id}"),
+        ("bump", f"reports:user:{user_id}"),
+        ("bump", f"report_views:user:{user_id}"),
+        ("delete", f"pdf_report:{report_id}"),
+    }
@@ -0,0 +1,69 @@
+"""
+Тесты для оптимизации изображений.
+"""
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from app.core.config import settings
+from app.utils.image_optimizer import (
+    needs_optimization,
+    optimize_image,
+    optimize_image_sync,
+    shutdown_image_executor,
+    start_image_executor,
+)
+
+
+def _make_jpeg(width: int, height: int) -> bytes:
+    """Создание JPEG с шумом (плохо сжимается, чтобы файл был большим)."""
+    image = Image.effect_noise((width, height), 64).convert("RGB")
+    output = BytesIO()
+    image.save(output, format="JPEG", quality=95)
+    return output.getvalue()
+
+
+def test_small_image_is_skipped(monkeypatch):
+    """Тест пропуска изображений меньше порога."""
+    monkeypatch.setattr(settings, "IMAGE_OPTIMIZE_MIN_BYTES", 10 * 1024 * 1024)
+    assert not needs_optimization(_make_jpeg(3000, 2000))
+
+
+def test_image_within_bounds_is_skipped(monkeypatch):
+    """Тест пропуска изображений, уже укладывающихся в габариты."""
+    monkeypatch.setattr(settings, "IMAGE_OPTIMIZE_MIN_BYTES", 0)
+    assert not needs_optimization(_make_jpeg(800, 600))
+    assert needs_optimization(_make_jpeg(3000, 2000))
+
+
+def test_optimize_image_sync_downscales_jpeg():
+    """Тест уменьшения JPEG до заданных габаритов."""
+    optimized = optimize_image_sync(_make_jpeg(3000, 2000))
+    with Image.open(BytesIO(optimized)) as image:
+        assert image.width <= 1920
+        assert image.height <= 1080
+
+
+@pytest.mark.asyncio
+async def test_optimize_image_returns_original_when_skipped(monkeypatch):
+    """Тест: пропущенное изображение возвращается без обработки в пуле процессов."""
+    monkeypatch.setattr(settings, "IMAGE_OPTIMIZE_MIN_BYTES", 10 * 1024 * 1024)
+    content = _make_jpeg(3000, 2000)
+    assert await optimize_image(content) is content
+
+
+@pytest.mark.asyncio
+async def test_optimize_image_runs_in_process_pool_without_fork(monkeypatch):
+    """Тест оптимизации в пуле процессов, запущенных без fork."""
+    monkeypatch.setattr(settings, "IMAGE_OPTIMIZE_MIN_BYTES", 0)
+    executor = start_image_executor()
+    try:
+        assert executor._mp_context.get_start_method() != "fork"
+        optimized = await optimize_image(_make_jpeg(3000, 2000))
+    finally:
+        shutdown_image_executor()
+
+    with Image.open(BytesIO(optimized)) as image:
+        assert image.width <= 1920
+        assert image.height <= 1080
@@ -0,0 +1,187 @@
+"""
+Тесты для метрик БД, Celery, отчетов и профилирования SQL запросов.
+"""
+import os
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from uuid import uuid4
+
+import httpx
+import prometheus_client
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.middleware import query_logger
+from app.middleware.query_logger import QueryLoggerMiddleware
+from app.models.audit_report import AuditReport, AuditReportStatus
+from app.services.events import ReportStatusChanged
+from app.services.report import ReportService
+from app.utils import instrumentation
+from app.utils.instrumentation import instrument_engine, query_type
+from app.utils.metrics import (
+    analysis_nlp_turnaround_seconds,
+    analysis_queue_wait_seconds,
+    celery_task_duration_seconds,
+    celery_tasks_total,
+    cleanup_dead_processes,
+    db_queries_total,
+    get_registry,
+    reports_generated_total,
+)
+from app.utils.query_profiler import profile_queries
+
+
+def _value(metric, **labels):
+    return metric.labels(**labels)._value.get()
+
+
+def test_query_type():
+    """Тест определения типа SQL запроса."""
+    assert query_type("SELECT 1") == "SELECT"
+    assert query_type("\n  insert into documents values (1)") == "INSERT"
+    assert query_type("WITH x AS (SELECT 1) SELECT * FROM x") == "OTHER"
+
+
+@pytest.mark.asyncio
+async def test_engine_queries_are_counted():
+    """Тест учета запросов движка БД."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    instrument_engine(engine)
+    instrument_engine(engine)  # Повторное подключение игнорируется
+    before = _value(db_queries_total, query_type="SELECT")
+
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+        await conn.execute(text("SELECT 2"))
+    await engine.dispose()
+
+    assert _value(db_queries_total, query_type="SELECT") == before + 2
+
+
+def test_celery_task_signals_record_metrics():
+    """Тест метрик задач по сигналам Celery."""
+    task = SimpleNamespace(name="tests.sample_task")
+    before = _value(celery_tasks_total, task_name=task.name, status="success")
+
+    instrumentation._on_task_prerun(task_id="task-1", task=task)
+    instrumentation._on_task_postrun(task_id="task-1", task=task, state="SUCCESS")
+
+    assert _value(celery_tasks_total, task_name=task.name, status="success") == before + 1
+    assert celery_task_duration_seconds.labels(task_name=task.name)._sum.get() >= 0
+    assert "task-1" not in instrumentation._task_start_times
+
+
+@pytest.mark.asyncio
+async def test_report_metrics_count_terminal_statuses_only():
+    """Тест учета только завершенных отчетов."""
+    before = _value(reports_generated_total, status="completed")
+
+    for status in ("pending", "processing", "completed"):
+        await instrumentation._on_report_status_changed(
+            ReportStatusChanged(user_id=uuid4(), report_id=uuid4(), document_id=uuid4(), status=status)
+        )
+
+    assert _value(reports_generated_total, status="completed") == before + 1
+
+
+def test_analysis_stages_are_recorded():
+    """Тест времени этапов анализа документа."""
+    report = AuditReport(status=AuditReportStatus.PENDING, created_at=datetime.utcnow() - timedelta(seconds=5))
+    waits_before = analysis_queue_wait_seconds._sum.get()
+    turnaround = analysis_nlp_turnaround_seconds.labels(status="completed")
+    turnaround_before = turnaround._sum.get()
+
+    ReportService.mark_processing_started(report)
+    started_at = report.processing_started_at
+    ReportService.mark_processing_started(report)  # Повторная попытка задачи
+    assert report.processing_started_at == started_at
+    assert analysis_queue_wait_seconds._sum.get() - waits_before >= 5
+
+    ReportService.mark_dispatched(report)
+    report.processing_started_at -= timedelta(seconds=40)
+    report.nlp_dispatched_at -= timedelta(seconds=30)
+    ReportService.mark_finished(report, AuditReportStatus.COMPLETED)
+
+    assert report.status == AuditReportStatus.COMPLETED
+    assert report.completed_at is not None
+    assert report.processing_duration_seconds == 40
+    assert turnaround._sum.get() - turnaround_before >= 30
+
+
+def test_cleanup_dead_processes_keeps_counters(tmp_path, monkeypatch):
+    """Тест удаления live gauge завершенных процессов в multiprocess режиме."""
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    dead_pid = 2 ** 22 + 1  # Больше pid_max Linux по умолчанию
+    live_pid = os.getpid()
+    for name in (
+        f"gauge_livesum_{dead_pid}.db",
+        f"counter_{dead_pid}.db",
+        f"gauge_livesum_{live_pid}.db",
+    ):
+        (tmp_path / name).write_bytes(b"")
+
+    cleanup_dead_processes()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        f"counter_{dead_pid}.db",
+        f"gauge_livesum_{live_pid}.db",
+    ]
+    assert get_registry() is not prometheus_client.REGISTRY
+
+
+@pytest.mark.asyncio
+async def test_profile_queries_counts_nested_blocks():
+    """Тест подсчета запросов во вложенных блоках профилирования."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    instrument_engine(engine)
+
+    async with engine.connect() as conn:
+        with profile_queries() as outer:
+            await conn.execute(text("SELECT 1"))
+            with profile_queries() as inner:
+                for _ in range(3):
+                    await conn.execute(text("SELECT 2"))
+        await conn.execute(text("SELECT 3"))
+    await engine.dispose()
+
+    assert (outer.count, inner.count) == (4, 3)
+    assert inner.most_repeated() == ("SELECT 2", 3)
+    assert outer.duration >= inner.duration
+
+
+@pytest.mark.asyncio
+async def test_query_headers_in_debug_mode(monkeypatch):
+    """Тест заголовков X-DB-Queries/X-DB-Time и предупреждения о N+1."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    instrument_engine(engine)
+    monkeypatch.setattr(settings, "DEBUG", True)
+    monkeypatch.setattr(settings, "DB_QUERY_REPEAT_THRESHOLD", 2)
+    warnings = []
+    monkeypatch.setattr(
+        query_logger.logger, "warning", lambda message, **kwargs: warnings.append((message, kwargs))
+    )
+
+    app = FastAPI()
+
+    @app.get("/items")
+    async def items():
+        async with engine.connect() as conn:
+            for _ in range(2):
+                await conn.execute(text("SELECT 1"))
+        return []
+
+    app.add_middleware(QueryLoggerMiddleware)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/items")
+    await engine.dispose()
+
+    assert response.headers["x-db-queries"] == "2"
+    assert response.headers["x-db-time"].endswith("ms")
+    [(message, details)] = warnings
+    assert message == "Possible N+1 queries"
+    assert details["endpoint"] == "/items"
+    assert details["most_repeated_count"] == 2
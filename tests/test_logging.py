@@ -0,0 +1,75 @@
+"""
+Тесты для настройки логирования.
+"""
+import json
+import logging
+import queue
+
+import pytest
+import structlog
+
+from app.core.config import settings
+from app.core.logging import DroppingQueueHandler, EventSampler, get_logger, setup_logging, shutdown_logging
+
+
+@pytest.fixture
+def restore_logging():
+    """Восстановление исходной настройки логирования после теста."""
+    config = structlog.get_config()
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield
+    shutdown_logging()
+    structlog.configure(**config)
+    root.handlers, root.level = handlers, level
+
+
+def test_event_sampler_drops_listed_info_events():
+    """Тест выборки частых INFO событий."""
+    sampler = EventSampler(0.0, ["File saved"])
+    with pytest.raises(structlog.DropEvent):
+        sampler(None, "info", {"event": "File saved"})
+    assert sampler(None, "warning", {"event": "File saved"}) == {"event": "File saved"}
+    assert sampler(None, "info", {"event": "Document deleted"}) == {"event": "Document deleted"}
+
+    assert EventSampler(1.0, ["File saved"])(None, "info", {"event": "File saved"}) == {"event": "File saved"}
+
+
+@pytest.mark.parametrize("serializer", ["json", "orjson"])
+def test_events_are_rendered_by_listener_thread(restore_logging, capsys, monkeypatch, serializer):
+    """Тест рендеринга JSON и фильтра уровня до рендеринга."""
+    monkeypatch.setattr(settings, "DEBUG", False)
+    monkeypatch.setattr(settings, "LOG_LEVEL", "INFO")
+    monkeypatch.setattr(settings, "LOG_JSON_SERIALIZER", serializer)
+    setup_logging()
+
+    logger = get_logger("tests.logging")
+    logger.debug("Hidden event")
+    logger.info("Document created", document_id="42")
+    logging.getLogger("tests.stdlib").warning("Plain %s", "record")
+    shutdown_logging()
+
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert records == [
+        {"document_id": "42", "event": "Document created", "level": "info"},
+        {"event": "Plain record", "level": "warning"},
+    ]
+
+
+def test_full_queue_drops_records_without_blocking():
+    """Тест отбрасывания записей при переполненной очереди."""
+    log_queue = queue.Queue(3)
+    handler = DroppingQueueHandler(log_queue)
+    for index in range(5):
+        handler.handle(logging.makeLogRecord({"msg": f"record {index}"}))
+    assert handler.dropped == 2
+
+    while not log_queue.empty():
+        log_queue.get_nowait()
+    handler.handle(logging.makeLogRecord({"msg": "after"}))
+
+    assert [log_queue.get_nowait().msg for _ in range(2)] == [
+        "after",
+        "2 log records dropped: logging queue is full",
+    ]
+    assert handler.dropped == 0
@@ -0,0 +1,105 @@
+"""
+Тесты для извлечения метаданных и построения превью.
+"""
+import zipfile
+from io import BytesIO
+from types import SimpleNamespace
+
+import pytest
+from celery.exceptions import Ignore
+from PIL import Image
+
+from app.tasks.media_tasks import DocumentNotFoundError, _run_step
+from app.utils.file import get_thumbnail_filename
+from app.utils.media import DOCX_MIME_TYPE, PDF_MIME_TYPE, extract_metadata, generate_thumbnail
+
+
+def _make_png(width: int, height: int) -> bytes:
+    output = BytesIO()
+    Image.new("RGBA", (width, height), (255, 0, 0, 128)).save(output, format="PNG")
+    return output.getvalue()
+
+
+def test_pdf_page_count():
+    """Тест подсчета страниц PDF по объектам /Page."""
+    content = (
+        b"%PDF-1.4\n"
+        b"1 0 obj << /Type /Catalog /Pages 2 0 R >> endobj\n"
+        b"2 0 obj << /Type /Pages /Kids [3 0 R 4 0 R] /Count 2 >> endobj\n"
+        b"3 0 obj << /Type /Page /Parent 2 0 R >> endobj\n"
+        b"4 0 obj << /Type/Page /Parent 2 0 R >> endobj\n"
+    )
+    metadata = extract_metadata(content, PDF_MIME_TYPE)
+    assert metadata == {"pdf_version": "1.4", "page_count": 2}
+
+
+def test_pdf_page_count_from_pages_tree():
+    """Тест подсчета страниц, когда объекты страниц сжаты в потоках."""
+    content = b"%PDF-1.7\n2 0 obj << /Type /Pages /Count 12 >> endobj\n"
+    assert extract_metadata(content, PDF_MIME_TYPE)["page_count"] == 12
+
+
+def test_docx_metadata():
+    """Тест чтения свойств DOCX."""
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr(
+            "docProps/app.xml",
+            '<Properties xmlns="http://schemas.openxmlformats.org/officeDocument/2006/extended-properties">'
+            "<Pages>5</Pages><Words>1200</Words></Properties>",
+        )
+        archive.writestr(
+            "docProps/core.xml",
+            '<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+            'xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            "<dc:title>Выписка</dc:title><dc:creator>Иванов</dc:creator></cp:coreProperties>",
+        )
+
+    metadata = extract_metadata(buffer.getvalue(), DOCX_MIME_TYPE)
+    assert metadata == {"page_count": 5, "word_count": 1200, "title": "Выписка", "author": "Иванов"}
+
+
+def test_invalid_content_has_no_page_count():
+    """Тест обработки поврежденного файла."""
+    assert extract_metadata(b"not a zip", DOCX_MIME_TYPE) == {"page_count": None}
+
+
+def test_image_metadata_and_thumbnail():
+    """Тест метаданных и превью изображения."""
+    content = _make_png(1200, 600)
+    metadata = extract_metadata(content, "image/png")
+    assert metadata["page_count"] == 1
+    assert (metadata["width"], metadata["height"]) == (1200, 600)
+
+    thumbnail = generate_thumbnail(content, "image/png", size=128)
+    with Image.open(BytesIO(thumbnail)) as image:
+        assert image.format == "JPEG"
+        assert image.size == (128, 64)
+
+
+def test_thumbnail_not_supported_for_pdf():
+    """Тест отсутствия превью для PDF."""
+    assert generate_thumbnail(b"%PDF-1.4", PDF_MIME_TYPE) is None
+
+
+def test_thumbnail_filename_is_sharded():
+    """Тест шардирования имени превью по хешу."""
+    file_hash = "abcdef" + "0" * 58
+    assert get_thumbnail_filename(file_hash) == f"thumbnails/ab/cd/{file_hash}.jpg"
+
+
+def test_deleted_document_stops_pipeline_without_retry():
+    """Тест: шаг для удаленного документа не повторяется и не считается ошибкой."""
+    retries = []
+    task = SimpleNamespace(
+        name="extract_document_metadata",
+        request=SimpleNamespace(retries=0),
+        retry=lambda **kwargs: retries.append(kwargs),
+    )
+
+    async def deleted_step(document_id):
+        raise DocumentNotFoundError(f"Документ {document_id} не найден")
+
+    with pytest.raises(Ignore):
+        _run_step(task, deleted_step, "00000000-0000-0000-0000-000000000001")
+    assert retries == []
@@ -0,0 +1,135 @@
+"""
+Тесты для ASGI middleware.
+"""
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from app.middleware import rate_limit
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.query_logger import QueryLoggerMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.middleware.security import SecurityHeadersMiddleware
+from app.utils.metrics import http_requests_total
+
+
+class _CounterRedis:
+    """Счетчики в памяти вместо Redis."""
+
+    def __init__(self):
+        self.values = {}
+        self.ttls = {}
+
+    async def incr(self, key):
+        self.values[key] = self.values.get(key, 0) + 1
+        return self.values[key]
+
+    async def expire(self, key, seconds):
+        self.ttls[key] = seconds
+        return True
+
+    async def ttl(self, key):
+        return self.ttls.get(key, -1)
+
+
+def _build_app(**rate_limit_options) -> FastAPI:
+    """Приложение со стеком middleware как в app.main."""
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "ok"}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            yield b"first"
+            yield b"second"
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    if rate_limit_options:
+        app.add_middleware(RateLimitMiddleware, **rate_limit_options)
+    app.add_middleware(SecurityHeadersMiddleware)
+    app.add_middleware(QueryLoggerMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    return app
+
+
+def _client(app: FastAPI) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_headers_and_metrics_are_added():
+    """Тест безопасных заголовков, времени ответа и метрик."""
+    before = http_requests_total.labels(method="GET", endpoint="/health", status_code=200)._value.get()
+
+    async with _client(_build_app()) as client:
+        response = await client.get("/health")
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+    assert response.headers["x-frame-options"] == "DENY"
+    assert response.headers["x-content-type-options"] == "nosniff"
+    assert response.headers["x-response-time"].endswith("s")
+    after = http_requests_total.labels(method="GET", endpoint="/health", status_code=200)._value.get()
+    assert after == before + 1
+
+
+@pytest.mark.asyncio
+async def test_streaming_response_passes_through():
+    """Тест прохождения потокового ответа через middleware."""
+    async with _client(_build_app()) as client:
+        response = await client.get("/stream")
+
+    assert response.status_code == 200
+    assert response.content == b"firstsecond"
+    assert response.headers["content-security-policy"].startswith("default-src 'self'")
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_returns_429(monkeypatch):
+    """Тест ответа 429 после исчерпания лимита."""
+    redis = _CounterRedis()
+
+    async def get_redis():
+        return redis
+
+    monkeypatch.setattr(rate_limit, "get_redis", get_redis)
+
+    async with _client(_build_app(calls=2, period=30)) as client:
+        statuses = [(await client.get("/health")).status_code for _ in range(3)]
+        response = await client.get("/health")
+
+    assert statuses == [200, 200, 429]
+    assert response.headers["retry-after"] == "30"
+    assert "Превышен лимит запросов" in response.json()["detail"]
+    # Ответ rate limiter тоже проходит через внешние middleware
+    assert response.headers["x-frame-options"] == "DENY"
+
+
+@pytest.mark.asyncio
+async def test_metrics_use_route_template_and_unmatched_bucket():
+    """Тест меток по шаблону маршрута и общей метки для неизвестных путей."""
+    app = _build_app()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        return {"id": item_id}
+
+    def count(endpoint, status_code):
+        return http_requests_total.labels(method="GET", endpoint=endpoint, status_code=status_code)._value.get()
+
+    before_item = count("/items/{item_id}", 200)
+    before_unmatched = count("unmatched", 404)
+
+    async with _client(app) as client:
+        await client.get("/items/abc")
+        await client.get("/items/12345")
+        await client.get("/wp-login.php")
+        await client.get("/.env")
+
+    assert count("/items/{item_id}", 200) == before_item + 2
+    assert count("unmatched", 404) == before_unmatched + 2
@@ -1,6 +1,9 @@
 """
 Тесты для интеграции с NLP-сервисом.
 """
+from datetime import datetime, timedelta
+
+import prometheus_client
 import pytest
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -35,10 +38,13 @@ async def test_nlp_callback_success(client: AsyncClient, test_user: User, db_ses
 
     # Создаем отчет
     request_id = uuid4()
+    started_at = datetime.utcnow() - timedelta(seconds=30)
     audit_report = AuditReport(
         document_id=document.id,
         request_id=request_id,
         status=AuditReportStatus.PROCESSING,
+        processing_started_at=started_at,
+        nlp_dispatched_at=started_at + timedelta(seconds=1),
     )
     db_session.add(audit_report)
     await db_session.commit()
@@ -82,6 +88,7 @@ async def test_nlp_callback_success(client: AsyncClient, test_user: User, db_ses
     await db_session.refresh(audit_report)
     assert audit_report.status == AuditReportStatus.COMPLETED
     assert audit_report.completed_at is not None
+    assert audit_report.processing_duration_seconds >= 30
 
     # Проверяем нарушения
     violations = await db_session.execute(
@@ -105,6 +112,73 @@ async def test_nlp_callback_success(client: AsyncClient, test_user: User, db_ses
     assert summary_obj.compliance_score == 4.0
 
 
+def _violations_detected(risk_level: RiskLevel) -> float:
+    """Текущее значение счетчика violations_detected_total для уровня риска."""
+    value = prometheus_client.REGISTRY.get_sample_value(
+        "violations_detected_total", {"risk_level": risk_level.value}
+    )
+    return value or 0.0
+
+
+@pytest.mark.asyncio
+async def test_nlp_callback_counts_violations_by_risk_level(
+    client: AsyncClient, test_user: User, db_session: AsyncSession
+):
+    """Тест учета нарушений всех уровней риска, включая критические, в метриках."""
+    document = Document(
+        user_id=test_user.id,
+        original_filename="metrics.pdf",
+        stored_filename="stored_metrics.pdf",
+        file_size=100,
+        mime_type="application/pdf",
+        file_hash="metrics_hash",
+        status=DocumentStatus.PROCESSING,
+    )
+    db_session.add(document)
+    await db_session.commit()
+    await db_session.refresh(document)
+
+    request_id = uuid4()
+    audit_report = AuditReport(
+        document_id=document.id,
+        request_id=request_id,
+        status=AuditReportStatus.PROCESSING,
+    )
+    db_session.add(audit_report)
+    await db_session.commit()
+
+    risk_levels = [RiskLevel.CRITICAL, RiskLevel.CRITICAL, RiskLevel.HIGH, RiskLevel.LOW]
+    before = {level: _violations_detected(level) for level in RiskLevel}
+
+    response = await client.post(
+        "/api/v1/nlp/callback",
+        json={
+            "request_id": str(request_id),
+            "document_id": str(document.id),
+            "status": "success",
+            "analysis_result": {
+                "violations": [
+                    {
+                        "code": f"1.{index}",
+                        "description": "Нарушение",
+                        "risk_level": level.value,
+                    }
+                    for index, level in enumerate(risk_levels)
+                ],
+                "summary": {"total_risks": 4, "critical_count": 2},
+            },
+        },
+    )
+
+    assert response.status_code == 200
+    assert {level: _violations_detected(level) - before[level] for level in RiskLevel} == {
+        RiskLevel.CRITICAL: 2,
+        RiskLevel.HIGH: 1,
+        RiskLevel.MEDIUM: 0,
+        RiskLevel.LOW: 1,
+    }
+
+
 @pytest.mark.asyncio
 async def test_nlp_callback_failed(client: AsyncClient, test_user: User, db_session: AsyncSession):
     """Тест неудачного callback от NLP-сервиса."""
@@ -185,8 +259,8 @@ async def test_nlp_service_build_file_url():
     document_id = uuid4()
     stored_filename = "test_file.pdf"
     url = NLPService.build_file_url(document_id, stored_filename)
-    assert str(document_id) in url
-    assert "download" in url
+    assert stored_filename in url
+    assert "signature" in url
 
 
 @pytest.mark.asyncio
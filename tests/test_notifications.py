@@ -0,0 +1,174 @@
+"""
+Тесты для уведомлений о смене статуса отчетов.
+"""
+import asyncio
+import json
+from uuid import uuid4
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.endpoints import events
+from app.models.user import User
+from app.services import notifications
+from app.services.events import ReportStatusChanged
+from app.services.notifications import CHANNEL_PREFIX, EventHub, format_sse, on_report_status_changed
+from app.utils.password import get_password_hash
+
+
+class _RecordingRedis:
+    """Запись публикаций вместо Redis."""
+
+    def __init__(self):
+        self.published = []
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+        return 1
+
+
+@pytest.mark.asyncio
+async def test_report_status_change_is_published_to_user_channel(monkeypatch):
+    """Тест публикации смены статуса в канал пользователя."""
+    redis = _RecordingRedis()
+
+    async def get_redis():
+        return redis
+
+    monkeypatch.setattr(notifications, "get_redis", get_redis)
+
+    event = ReportStatusChanged(
+        user_id=uuid4(), report_id=uuid4(), document_id=uuid4(), status="failed", error_message="timeout"
+    )
+    await on_report_status_changed(event)
+
+    [(channel, message)] = redis.published
+    assert channel == f"{CHANNEL_PREFIX}{event.user_id}"
+    payload = json.loads(message)
+    assert payload["type"] == "report_status"
+    assert payload["report_id"] == str(event.report_id)
+    assert payload["status"] == "failed"
+    assert payload["error_message"] == "timeout"
+
+
+@pytest.mark.asyncio
+async def test_event_hub_dispatches_only_to_user_streams(monkeypatch):
+    """Тест раздачи сообщений потокам нужного пользователя."""
+    hub = EventHub()
+
+    async def idle_listener():
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(hub, "_listen", idle_listener)
+
+    user_id, other_id = uuid4(), uuid4()
+    first = hub.subscribe(user_id)
+    second = hub.subscribe(user_id)
+    other = hub.subscribe(other_id)
+
+    hub.dispatch(f"{CHANNEL_PREFIX}{user_id}", '{"type": "report_status"}')
+
+    assert first.get_nowait() == second.get_nowait() == '{"type": "report_status"}'
+    assert other.empty()
+
+    hub.unsubscribe(user_id, first)
+    hub.unsubscribe(user_id, second)
+    assert str(user_id) not in hub._queues
+    await hub.stop()
+
+
+def test_format_sse_uses_message_type_as_event_name():
+    """Тест формата блока Server-Sent Events."""
+    message = '{"type": "report_status", "status": "completed"}'
+
+    assert format_sse(message) == f"event: report_status\ndata: {message}\n\n"
+
+
+async def _login(client: AsyncClient, email: str, password: str) -> str:
+    """Access token пользователя."""
+    response = await client.post("/api/v1/auth/login", json={"email": email, "password": password})
+    return response.json()["access_token"]
+
+
+async def _stream_token(client: AsyncClient, access_token: str) -> str:
+    """Токен подключения к потоку событий."""
+    response = await client.post(
+        "/api/v1/events/token",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    assert response.status_code == 200
+    return response.json()["token"]
+
+
+@pytest.fixture
+def finite_event_stream(monkeypatch):
+    """Поток событий, который сообщает пользователя и сразу завершается."""
+    async def event_stream(user_id):
+        yield f"data: {user_id}\n\n"
+
+    monkeypatch.setattr(events, "_event_stream", event_stream)
+
+
+@pytest.mark.asyncio
+async def test_event_stream_requires_authentication(client: AsyncClient, finite_event_stream):
+    """Тест отказа в подключении к потоку без учетных данных."""
+    response = await client.get("/api/v1/events/stream")
+    assert response.status_code == 401
+
+    response = await client.get("/api/v1/events/stream", params={"token": "invalid"})
+    assert response.status_code == 401
+
+    response = await client.post("/api/v1/events/token")
+    assert response.status_code in (401, 403)
+
+
+@pytest.mark.asyncio
+async def test_event_stream_token_for_event_source(
+    client: AsyncClient, test_user: User, finite_event_stream
+):
+    """Тест подключения EventSource по токену из query-параметра."""
+    access_token = await _login(client, test_user.email, "testpassword123")
+    stream_token = await _stream_token(client, access_token)
+
+    response = await client.get("/api/v1/events/stream", params={"token": stream_token})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text == f"data: {test_user.id}\n\n"
+
+    # Access token в URL не принимается, токен потока - в заголовке
+    response = await client.get("/api/v1/events/stream", params={"token": access_token})
+    assert response.status_code == 401
+    response = await client.get(
+        "/api/v1/documents/",
+        headers={"Authorization": f"Bearer {stream_token}"},
+    )
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_event_stream_token_is_bound_to_its_user(
+    client: AsyncClient, test_user: User, db_session: AsyncSession, finite_event_stream
+):
+    """Тест: токен другого пользователя открывает только его собственный поток."""
+    other_user = User(
+        email="other@example.com",
+        password_hash=get_password_hash("otherpassword123"),
+        is_active=True,
+    )
+    db_session.add(other_user)
+    await db_session.commit()
+    await db_session.refresh(other_user)
+
+    own_token = await _stream_token(
+        client, await _login(client, test_user.email, "testpassword123")
+    )
+    foreign_token = await _stream_token(
+        client, await _login(client, other_user.email, "otherpassword123")
+    )
+
+    own = await client.get("/api/v1/events/stream", params={"token": own_token})
+    foreign = await client.get("/api/v1/events/stream", params={"token": foreign_token})
+
+    assert own.text == f"data: {test_user.id}\n\n"
+    assert foreign.text == f"data: {other_user.id}\n\n"
@@ -0,0 +1,51 @@
+"""
+Тесты для статистического профилировщика.
+"""
+import asyncio
+import threading
+
+import pytest
+
+from app.utils.profiler import ProfilerBusyError, format_collapsed, profile
+
+
+def _busy_loop(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+@pytest.mark.asyncio
+async def test_profile_collects_collapsed_stacks():
+    """Тест выборки стеков рабочего потока."""
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_loop, args=(stop,), name="busy-worker")
+    worker.start()
+    try:
+        sampler = await profile(0.2, 0.005)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert sampler.samples > 0
+    output = format_collapsed(sampler.stacks)
+    busy = [line for line in output.splitlines() if line.startswith("busy-worker;")]
+    assert busy
+    assert any("_busy_loop (test_profiler.py:" in line for line in busy)
+    # Поток профилировщика в выборки не попадает
+    assert "stack-sampler" not in output
+    stack, count = busy[0].rsplit(" ", 1)
+    assert int(count) > 0
+
+
+@pytest.mark.asyncio
+async def test_profile_allows_one_run_per_process():
+    """Тест запрета параллельного профилирования."""
+    first = asyncio.create_task(profile(0.1, 0.01))
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(ProfilerBusyError):
+        await profile(0.1, 0.01)
+
+    await first
+    # После завершения профилирование снова доступно
+    await profile(0.01, 0.005)
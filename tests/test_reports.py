@@ -79,7 +79,9 @@ async def test_generate_report_document_not_found(client: AsyncClient, test_user
 
 
 @pytest.mark.asyncio
-async def test_get_reports_list(client: AsyncClient, test_user: User, db_session: AsyncSession):
+async def test_get_reports_list(
+    client: AsyncClient, test_user: User, db_session: AsyncSession, max_queries
+):
     """Тест получения списка отчетов."""
     login_response = await client.post(
         "/api/v1/auth/login",
@@ -113,11 +115,13 @@ async def test_get_reports_list(client: AsyncClient, test_user: User, db_session
         db_session.add(audit_report)
     await db_session.commit()
 
-    # Получаем список отчетов
-    response = await client.get(
-        "/api/v1/reports/",
-        headers={"Authorization": f"Bearer {access_token}"},
-    )
+    # Получаем список отчетов: пользователь, количество, страница,
+    # сводки и количество нарушений - без запросов на каждый отчет
+    with max_queries(5):
+        response = await client.get(
+            "/api/v1/reports/",
+            headers={"Authorization": f"Bearer {access_token}"},
+        )
 
     assert response.status_code == 200
     data = response.json()
@@ -462,3 +466,96 @@ async def test_export_report_pdf_not_completed(client: AsyncClient, test_user: U
 
 
 
+
+
+@pytest.mark.asyncio
+async def test_generate_report_reuses_identical_content(client: AsyncClient, test_user: User, db_session: AsyncSession):
+    """Тест переиспользования результата анализа для документа с идентичным содержимым."""
+    from app.core.config import settings
+
+    login_response = await client.post(
+        "/api/v1/auth/login",
+        json={
+            "email": test_user.email,
+            "password": "testpassword123",
+        },
+    )
+    access_token = login_response.json()["access_token"]
+
+    # Уже проанализированный документ другого пользователя с тем же хешем
+    other_user = User(
+        email="other@example.com",
+        password_hash=get_password_hash("otherpassword123"),
+        is_active=True,
+    )
+    db_session.add(other_user)
+    await db_session.commit()
+
+    source_document = Document(
+        user_id=other_user.id,
+        original_filename="form.pdf",
+        stored_filename="stored_form.pdf",
+        file_size=1024,
+        mime_type="application/pdf",
+        file_hash="shared_hash",
+        status=DocumentStatus.COMPLETED,
+    )
+    document = Document(
+        user_id=test_user.id,
+        original_filename="form_copy.pdf",
+        stored_filename="stored_form.pdf",
+        file_size=1024,
+        mime_type="application/pdf",
+        file_hash="shared_hash",
+        status=DocumentStatus.PENDING,
+    )
+    db_session.add_all([source_document, document])
+    await db_session.commit()
+
+    source_report = AuditReport(
+        document_id=source_document.id,
+        request_id=uuid4(),
+        status=AuditReportStatus.COMPLETED,
+        nlp_model_version=settings.NLP_MODEL_VERSION,
+        ruleset_version=settings.NLP_RULESET_VERSION,
+    )
+    db_session.add(source_report)
+    await db_session.commit()
+
+    db_session.add_all([
+        Violation(
+            audit_report_id=source_report.id,
+            code="2.13",
+            description="Test violation",
+            risk_level=RiskLevel.HIGH,
+        ),
+        AnalysisSummary(
+            audit_report_id=source_report.id,
+            total_risks=1,
+            critical_count=0,
+            high_count=1,
+            medium_count=0,
+            low_count=0,
+            compliance_score=4.0,
+        ),
+    ])
+    await db_session.commit()
+
+    response = await client.post(
+        "/api/v1/reports/generate",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json={"document_id": str(document.id)},
+    )
+
+    assert response.status_code == 201
+    data = response.json()
+    assert data["status"] == "completed"
+
+    report_response = await client.get(
+        f"/api/v1/reports/{data['id']}",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    report = report_response.json()
+    assert report["cloned_from_report_id"] == str(source_report.id)
+    assert len(report["violations"]) == 1
+    assert report["analysis_summary"]["compliance_score"] == 4.0
@@ -0,0 +1,100 @@
+"""
+Тесты для журнала SQL запросов.
+"""
+from datetime import datetime
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import asyncpg
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.core.dependencies import get_current_admin_user
+from app.models.audit_report import AuditReport
+from app.utils import slow_queries
+from app.utils.instrumentation import instrument_engine
+from app.utils.slow_queries import QueryLog, fingerprint, redact_parameters
+
+
+def test_fingerprint_strips_literals_and_parameters():
+    """Тест нормализации запросов, различающихся только значениями."""
+    first = fingerprint("SELECT * FROM documents WHERE id = $1 AND size > 10 AND name = 'a.pdf'")
+    second = fingerprint("SELECT *  FROM documents\n WHERE id = $2 AND size > 2048 AND name = 'it''s.pdf'")
+
+    assert first == second == "SELECT * FROM documents WHERE id = ? AND size > ? AND name = ?"
+    assert fingerprint("SELECT * FROM t1 WHERE id IN ($1, $2, $3)") == "SELECT * FROM t1 WHERE id IN (?+)"
+    assert fingerprint("SELECT * FROM t WHERE a = %(a_1)s") == "SELECT * FROM t WHERE a = ?"
+
+
+def test_fingerprint_collapses_asyncpg_in_lists():
+    """Тест: списки IN с приведением типов asyncpg дают один отпечаток."""
+    def compile_in(column, values):
+        statement = select(AuditReport.id).where(column.in_(values))
+        return str(statement.compile(dialect=asyncpg.dialect(), compile_kwargs={"render_postcompile": True}))
+
+    by_ids = {fingerprint(compile_in(AuditReport.id, [uuid4() for _ in range(size)])) for size in (2, 3, 5)}
+    assert len(by_ids) == 1
+    assert "IN (?+)" in by_ids.pop()
+
+    by_dates = {fingerprint(compile_in(AuditReport.created_at, [datetime(2026, 1, 1)] * size)) for size in (2, 4)}
+    assert len(by_dates) == 1
+    assert "IN (?+)" in by_dates.pop()
+
+
+def test_redact_parameters_keeps_only_types():
+    """Тест удаления значений параметров."""
+    assert redact_parameters(("secret@example.com", 42)) == ["str", "int"]
+    assert redact_parameters({"email": "secret@example.com"}) == {"email": "str"}
+
+
+def test_query_log_top_and_overflow():
+    """Тест отчета по суммарному времени и лимита отпечатков."""
+    log = QueryLog(max_fingerprints=2)
+    log.record("SELECT a FROM t WHERE id = 1", 0.5, slow=True)
+    log.record("SELECT a FROM t WHERE id = 2", 0.1, slow=False)
+    log.record("SELECT b FROM u", 0.2, slow=False)
+    log.record("UPDATE t SET a = 1", 0.05, slow=False)  # Сверх лимита
+
+    top = log.top(10)
+    assert [stats.fingerprint for stats in top] == ["SELECT a FROM t WHERE id = ?", "SELECT b FROM u", "<other>"]
+    assert (top[0].calls, top[0].slow_calls) == (2, 1)
+    assert top[0].max_time == 0.5
+
+    log.reset()
+    assert log.top(10) == []
+
+
+@pytest.mark.asyncio
+async def test_slow_statements_are_logged_without_values(monkeypatch):
+    """Тест логирования медленного запроса без значений параметров."""
+    monkeypatch.setattr(settings, "DB_SLOW_QUERY_THRESHOLD_MS", 0)
+    monkeypatch.setattr(slow_queries, "query_log", QueryLog(max_fingerprints=10))
+    logged = []
+    monkeypatch.setattr(slow_queries.logger, "warning", lambda message, **kwargs: logged.append(kwargs))
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    instrument_engine(engine)
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT :email"), {"email": "secret@example.com"})
+    await engine.dispose()
+
+    [entry] = [entry for entry in logged if entry["fingerprint"] == "SELECT ?"]
+    assert "secret@example.com" not in str(entry)
+    assert entry["parameters"] == ["str"]
+    assert slow_queries.query_log.top(1)[0].slow_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_admin_access_requires_configured_email(monkeypatch):
+    """Тест доступа к административным endpoints."""
+    monkeypatch.setattr(settings, "ADMIN_EMAILS", "Admin@example.com, ops@example.com")
+    admin = SimpleNamespace(id=uuid4(), email="admin@example.com")
+    user = SimpleNamespace(id=uuid4(), email="user@example.com")
+
+    assert await get_current_admin_user(admin) is admin
+    with pytest.raises(HTTPException) as exc_info:
+        await get_current_admin_user(user)
+    assert exc_info.value.status_code == 403
@@ -0,0 +1,136 @@
+"""
+Тесты для бэкендов хранилища файлов.
+"""
+import time
+from urllib.parse import urlsplit, parse_qs
+
+import httpx
+import pytest
+
+from app.services.storage import LocalStorageBackend, S3StorageBackend
+
+
+async def _stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+def _minio_transport(objects: dict) -> httpx.MockTransport:
+    """In-memory S3-совместимый сервер (упрощенная замена MinIO)."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        query = parse_qs(urlsplit(str(request.url)).query)
+        if "X-Amz-Signature" not in query or query["X-Amz-Algorithm"] != ["AWS4-HMAC-SHA256"]:
+            return httpx.Response(403)
+
+        key = request.url.path
+        if request.method == "PUT":
+            objects[key] = request.read()
+            return httpx.Response(200)
+        if key not in objects:
+            return httpx.Response(404)
+        if request.method == "DELETE":
+            del objects[key]
+            return httpx.Response(204)
+        data = objects[key]
+        if request.method == "HEAD":
+            return httpx.Response(200, headers={"Content-Length": str(len(data))})
+        if "range" in request.headers:
+            start, end = request.headers["range"].removeprefix("bytes=").split("-")
+            return httpx.Response(206, content=data[int(start):int(end) + 1])
+        return httpx.Response(200, content=data)
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.mark.asyncio
+async def test_local_storage_roundtrip(tmp_path):
+    """Тест записи, чтения и удаления в локальном хранилище."""
+    storage = LocalStorageBackend(str(tmp_path), "http://test", "secret")
+
+    await storage.put_stream("blobs/ab/cd/file", _stream(b"hello ", b"world"))
+    assert await storage.exists("blobs/ab/cd/file")
+    assert await storage.size("blobs/ab/cd/file") == 11
+    assert b"".join([c async for c in storage.get_stream("blobs/ab/cd/file")]) == b"hello world"
+    assert await storage.read_range("blobs/ab/cd/file", 6, 10) == b"world"
+
+    await storage.delete("blobs/ab/cd/file")
+    assert not await storage.exists("blobs/ab/cd/file")
+    await storage.delete("blobs/ab/cd/file")  # повторное удаление не ошибка
+
+
+@pytest.mark.asyncio
+async def test_local_storage_presign(tmp_path):
+    """Тест подписанных ссылок локального хранилища."""
+    storage = LocalStorageBackend(str(tmp_path), "http://test", "secret")
+
+    url = storage.presign("blobs/ab/cd/file", expires_in=60)
+    query = parse_qs(urlsplit(url).query)
+    expires, signature = int(query["expires"][0]), query["signature"][0]
+
+    assert urlsplit(url).path == "/api/v1/files/blobs/ab/cd/file"
+    assert storage.verify_signature("blobs/ab/cd/file", expires, signature)
+    assert not storage.verify_signature("blobs/ab/cd/other", expires, signature)
+    assert not storage.verify_signature("blobs/ab/cd/file", int(time.time()) - 1, storage.sign("blobs/ab/cd/file", int(time.time()) - 1))
+
+
+@pytest.mark.asyncio
+async def test_local_storage_rejects_path_traversal(tmp_path):
+    """Тест защиты от выхода за пределы каталога хранилища."""
+    storage = LocalStorageBackend(str(tmp_path), "http://test", "secret")
+    with pytest.raises(ValueError):
+        storage.local_path("../outside")
+
+
+@pytest.mark.asyncio
+async def test_s3_storage_roundtrip():
+    """Тест S3-хранилища против in-memory S3-совместимого сервера."""
+    objects = {}
+    storage = S3StorageBackend(
+        endpoint_url="http://minio:9000",
+        bucket="medaudit",
+        access_key="minio",
+        secret_key="minio123",
+        transport=_minio_transport(objects),
+    )
+
+    await storage.put_stream("blobs/ab/cd/file", _stream(b"hello world"), content_length=11)
+    assert "/medaudit/blobs/ab/cd/file" in objects
+    assert await storage.size("blobs/ab/cd/file") == 11
+    assert b"".join([c async for c in storage.get_stream("blobs/ab/cd/file")]) == b"hello world"
+    assert await storage.read_range("blobs/ab/cd/file", 0, 4) == b"hello"
+
+    url = storage.presign("blobs/ab/cd/file", filename="report.pdf")
+    assert url.startswith("http://minio:9000/medaudit/blobs/ab/cd/file?")
+    assert "response-content-disposition" in url
+
+    await storage.delete("blobs/ab/cd/file")
+    assert not await storage.exists("blobs/ab/cd/file")
+
+
+@pytest.mark.parametrize(
+    "filename, disposition",
+    [
+        (
+            "отчет.pdf",
+            "attachment; filename=\"_____.pdf\"; filename*=UTF-8''%D0%BE%D1%82%D1%87%D0%B5%D1%82.pdf",
+        ),
+        (
+            'a"b;c.pdf',
+            "attachment; filename=\"a_b_c.pdf\"; filename*=UTF-8''a%22b%3Bc.pdf",
+        ),
+    ],
+)
+def test_s3_presign_content_disposition(filename, disposition):
+    """Тест Content-Disposition в подписанной ссылке для небезопасных имен файлов."""
+    storage = S3StorageBackend(
+        endpoint_url="http://minio:9000",
+        bucket="medaudit",
+        access_key="minio",
+        secret_key="minio123",
+    )
+
+    url = storage.presign("blobs/ab/cd/file", filename=filename)
+
+    query = parse_qs(urlsplit(url).query)
+    assert query["response-content-disposition"] == [disposition]
@@ -0,0 +1,157 @@
+"""
+Тесты для трассировки запросов.
+"""
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.core.config import settings
+from app.middleware.tracing import TracingMiddleware
+from app.utils import tracing
+from app.utils.tracing import (
+    SPAN_KIND_SERVER,
+    STATUS_ERROR,
+    SpanContext,
+    current_traceparent,
+    load_trace_context,
+    otlp_payload,
+    parse_traceparent,
+    save_trace_context,
+    trace_span,
+)
+
+PARENT = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+
+class _Recorder:
+    """Обработчик, сохраняющий завершенные спаны вместо экспорта."""
+
+    def __init__(self):
+        self.spans = []
+
+    def submit(self, span):
+        self.spans.append(span)
+
+
+class _DictRedis:
+    """Хранилище ключей вместо Redis."""
+
+    def __init__(self):
+        self.values = {}
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    async def get(self, key):
+        return self.values.get(key)
+
+
+@pytest.fixture
+def recorder(monkeypatch):
+    monkeypatch.setattr(settings, "TRACING_ENABLED", True)
+    monkeypatch.setattr(settings, "TRACING_SAMPLE_RATE", 1.0)
+    recorder = _Recorder()
+    monkeypatch.setattr(tracing, "_processor", recorder)
+    return recorder
+
+
+def test_parse_traceparent():
+    """Тест разбора заголовка traceparent."""
+    context = parse_traceparent(PARENT)
+    assert context == SpanContext("0af7651916cd43dd8448eb211c80319c", "b7ad6b7169203331", True)
+    assert context.traceparent == PARENT
+    assert parse_traceparent("00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-00").sampled is False
+
+    assert parse_traceparent(None) is None
+    assert parse_traceparent("garbage") is None
+    assert parse_traceparent(f"00-{'0' * 32}-b7ad6b7169203331-01") is None
+
+
+def test_spans_nest_and_record_errors(recorder):
+    """Тест вложенности спанов и отметки ошибок."""
+    with trace_span("outer") as outer:
+        with pytest.raises(ValueError):
+            with trace_span("inner"):
+                raise ValueError("boom")
+    assert current_traceparent() is None
+
+    inner, finished_outer = recorder.spans
+    assert finished_outer is outer
+    assert inner.context.trace_id == outer.context.trace_id
+    assert inner.parent_span_id == outer.context.span_id
+    assert (inner.status, inner.status_message) == (STATUS_ERROR, "boom")
+
+    [resource] = otlp_payload(recorder.spans)["resourceSpans"]
+    assert [span["name"] for span in resource["scopeSpans"][0]["spans"]] == ["inner", "outer"]
+
+
+def test_disabled_tracing_creates_no_spans(monkeypatch):
+    """Тест отключенной трассировки."""
+    monkeypatch.setattr(settings, "TRACING_ENABLED", False)
+    with trace_span("noop") as span:
+        assert span is None
+        assert current_traceparent() is None
+
+
+@pytest.mark.asyncio
+async def test_http_span_continues_incoming_trace(recorder):
+    """Тест спана HTTP запроса с родителем из заголовка traceparent."""
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"traceparent": current_traceparent()}
+
+    app.add_middleware(TracingMiddleware)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/items/1", headers={"traceparent": PARENT})
+
+    [span] = recorder.spans
+    assert span.kind == SPAN_KIND_SERVER
+    assert span.name == "GET /items/{item_id}"
+    assert span.parent_span_id == "b7ad6b7169203331"
+    assert span.attributes["http.status_code"] == 200
+    assert response.json()["traceparent"] == span.context.traceparent
+
+
+def test_celery_task_continues_publisher_trace(recorder):
+    """Тест передачи контекста трассы через заголовки задачи Celery."""
+    headers = {}
+    with trace_span("request") as request_span:
+        tracing._on_before_task_publish(sender="process_document_with_nlp", headers=headers)
+
+    task = SimpleNamespace(name="process_document_with_nlp", request=SimpleNamespace(**headers))
+    tracing._on_task_prerun(task_id="task-1", task=task)
+    assert parse_traceparent(current_traceparent()).trace_id == request_span.context.trace_id
+    tracing._on_task_postrun(task_id="task-1", task=task, state="SUCCESS")
+    assert current_traceparent() is None
+
+    publish, _, run = recorder.spans
+    assert publish.parent_span_id == request_span.context.span_id
+    assert run.parent_span_id == publish.context.span_id
+
+
+@pytest.mark.asyncio
+async def test_callback_restores_saved_trace(recorder, monkeypatch):
+    """Тест продолжения трассы отправки документа при обработке callback."""
+    redis = _DictRedis()
+
+    async def get_redis():
+        return redis
+
+    monkeypatch.setattr(tracing, "get_redis", get_redis)
+
+    with trace_span("send") as send_span:
+        await save_trace_context("nlp:42")
+
+    with trace_span("callback request") as request_span:
+        parent = await load_trace_context("nlp:42")
+        with trace_span("nlp callback", parent=parent) as callback_span:
+            pass
+
+    assert callback_span.context.trace_id == send_span.context.trace_id
+    assert callback_span.parent_span_id == send_span.context.span_id
+    assert callback_span.links == [request_span.context]